@@ -1,46 +1,45 @@
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-import google.generativeai as genai
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 
-from bot_logic.config import GEMINI_API_KEY
-from bot_logic.interaction_history import interaction_history, handle_user_command
+from bot_logic.command_cache import command_cache
+from bot_logic.command_pipeline import (render_model, answer_body, apply_page_options, build_render_prompt,
+                                       get_bearer_token, parse_command, parse_commands, render_answer)
+from bot_logic.config import RESPONSE_RENDERING, BATCH_MAX_COMMANDS, BATCH_MAX_WORKERS, WARM_UP_ON_START
+from bot_logic.email_management import email_outbox
+from bot_logic.gemini import chunk_text
+from bot_logic.history_compactor import history_compactor
+from bot_logic.history_writer import history_writer
+from bot_logic.interaction_history import conversational_reply, handle_user_command
+from bot_logic.note_taking import export_notes, import_notes
+from bot_logic.response_renderer import render_response
+from bot_logic.session_store import get_client_key, session_store
+from bot_logic.task_management import export_tasks, import_tasks
 from bot_logic.voice_interaction import activate_module
+from bot_logic.warmup import warm_up
 
 # Initialize Flask app
 app = Flask(__name__)
 
-# Initialize chat history
-session_id, chat = interaction_history()
+# Firebase and Gemini are initialized on first use, or right away in the background
+if WARM_UP_ON_START:
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
 
-# Configure Gemini API
-genai.configure(api_key=GEMINI_API_KEY)
 
-# Create the model
-generation_config = {
-  "temperature": 1,
-  "top_p": 0.95,
-  "top_k": 40,
-  "max_output_tokens": 8192,
-  "response_mime_type": "text/plain",
-}
-
-model = genai.GenerativeModel(
-  model_name="gemini-2.0-flash-exp",
-  generation_config=generation_config,
-)
-
-# Function to get the bearer token from the request
-def get_bearer_token(request):
-    auth_header = request.headers.get('Authorization')
-    if auth_header and auth_header.startswith('Bearer '):
-        return auth_header[7:]  # Extract token
-    return None
+# Function to format a Server-Sent Event
+def sse_event(event, data):
+    return f"event: {event}\ndata: {app.json.dumps(data)}\n\n"
 
 
 @app.route("/command", methods=['POST'])
 def execute_command():
-    """Endpoint to execute user commands."""
+    """
+    Endpoint to execute user commands.
+    Note and task listings are paged: the body may carry "page_size", "fields" and the "cursor" returned as
+    "next_cursor" with the previous page.
+    """
     data = request.get_json()
 
     if not data or "command" not in data:
@@ -51,437 +50,257 @@ def execute_command():
 
     # Retrieve the Bearer token from the Authorization header
     token = get_bearer_token(request)
-
-    parsed_command_response = model.generate_content(f"""
-    Extract the required information from the following command and return a dictionary. The dictionary keys should match the expected fields for the Samigo Bot API commands, and the values should be extracted or inferred from the command. If a value is missing in the command, leave it.
-    Look out for any grammatical errors in the raw command and assume the correct word. If you don't understand the language send it over to the translate module.
-    
-        Here are the modules and their expected data inputs:
-        
-        1. **Task Management Module**:
-            - Commands: "add", "priority", "category", "upcoming", "delete"
-            - Expected Payload: 
-                - For "add": {{"description": string, "deadline": string (optional) }}
-                - For "priority": {{"priority": string (e.g., "high", "medium", "low") }}
-                - For "category": {{"category": string (e.g., "work", "personal") }}
-                - For "upcoming": {{"deadline": string (optional) }}
-                - For "delete": {{"title": string }}
-        
-        2. **Web Browsing Module**:
-            - Commands: "search", "summarize"
-            - Expected Payload:
-                - For "search": {{"query": string, "action": string ("summarize" if needed) }}
-        
-        3. **Note Management Module**:
-            - Commands: "add", "retrieve", "summarize", "delete", "edit"
-            - Expected Payload:
-                - For "add": {{"title": string, "content": string, "tags": list (optional) }}
-                - For "retrieve": {{"note_id": string (optional), "keyword": string (optional), "tag": string (optional), "date_range": string (optional) }}
-                - For "summarize": {{"note_id": string }}
-                - For "delete": {{"note_id": string }}
-                - For "edit": {{"note_id": string, "new_title": string, "new_content": string, "new_tags": list (optional) }}
-        
-        4. **Translation Module**:
-            - Commands: "translate"
-            - Expected Payload:
-                - For "translate": {{"text": string, "target_language": string (optional, default is "en") }}
-        
-        5. **Weather and News Module**:
-            - Commands: "weather", "news"
-            - Expected Payload:
-                - For "weather": {{"location": string (default is "Zurich") }}
-                - For "news": {{"category": string (e.g., "general", "business", etc.) }}
-        
-        6. **Email Management Module**:
-            - Commands: "fetch", "send", "summarize", "reply"
-            - Expected Payload:
-                - For "fetch": no additional data required 
-                - For "send": {{"to_email": string, "subject": string, "message_text": string }}
-                - For "summarize": {{"email_id": string }}
-                - For "reply": {{"email_id": string }}
-        
-        ### Task:
-        Please parse the user's natural language command and return a dictionary with the following structure:
-        {{
-    "module": string (e.g., "task", "web", "note", "translate", "weather", "news", "email"),
-          "command": string (specific command like "add", "fetch", "send", "weather"),
-          "payload": specific parameters required for the module and command as described above
-        }}
-        The "module" indicates which module the command belongs to (task management, web browsing, etc.), "command" specifies the action to be performed, and "payload" contains the necessary data.
-        
-        Please handle the natural language input and parse it accordingly. If the command is invalid or unclear, respond with a message indicating that the command is not recognized.
-        
-        ### Example Input and Output:
-        
-        1. **Command**: "Add a task with the description 'Finish report' and set the deadline to next Monday."
-            - **Parsed Output**: 
-            ```json
-            {{
-    "module": "task",
-              "command": "add",
-              "payload": {{
-    "description": "Finish report",
-                "deadline": "next Monday"
-              }}
-            }}
-            ```
-        
-        2. **Command**: "Show me the latest weather in Paris."
-            - **Parsed Output**:
-            ```json
-            {{
-    "module": "weather",
-              "command": "weather",
-              "payload": {{
-    "location": "Paris"
-              }}
-            }}
-            ```
-        
-        3. **Command**: "Please send an email to john.doe@example.com with the subject 'Meeting' and message 'Let's meet tomorrow'."
-            - **Parsed Output**:
-            ```json
-            {{
-    "module": "email",
-              "command": "send",
-              "payload": {{
-    "to_email": "john.doe@example.com",
-                "subject": "Meeting",
-                "message_text": "Let's meet tomorrow"
-              }}
-            }}
-            ```
-        
-        4. **Command**: "Get me the top 5 news headlines in the business category."
-            - **Parsed Output**:
-            ```json
-            {{
-    "module": "news",
-              "command": "news",
-              "payload": {{
-    "category": "business"
-              }}
-            }}
-            ```
-        
-        5. **Command**: "'Hola, ¿cómo estás?'"
-            - **Parsed Output**:
-            ```json
-            {{
-    "module": "translate",
-              "command": "translate",
-              "payload": {{
-    "text": "Hola, ¿cómo estás?",
-                "target_language": "en"
-              }}
-            }}
-            ```
-        
-        6. **Command**: "Please add a note titled 'Meeting Notes' with the content 'Discussed project updates' and tagged 'work'."
-            - **Parsed Output**:
-            ```json
-            {{
-    "module": "note",
-              "command": "add",
-              "payload": {{
-    "title": "Meeting Notes",
-                "content": "Discussed project updates",
-                "tags": ["work"]
-              }}
-            }}
-            ```
-        
-        7. **Command**: "Show me notes about 'project' from last week."
-            - **Parsed Output**:
-            ```json
-            {{
-    "module": "note",
-              "command": "retrieve",
-              "payload": {{
-    "keyword": "project",
-                "date_range": "last week"
-              }}
-            }}
-            ```
-        
-        8. **Command**: "Summarize the email with ID 12345."
-            - **Parsed Output**:
-            ```json
-            {{
-    "module": "email",
-              "command": "summarize",
-              "payload": {{
-    "email_id": "12345"
-              }}
-            }}
-            ```
-        
-        9. **Command**: "Delete the task titled 'Buy groceries'."
-            - **Parsed Output**:
-            ```json
-            {{
-    "module": "task",
-              "command": "delete",
-              "payload": {{
-    "title": "Buy groceries"
-              }}
-            }}
-            ```
-        
-        10. **Command**: "Fetch emails from my inbox."
-            - **Parsed Output**:
-            ```json
-            {{
-    "module": "email",
-              "command": "fetch",
-              "payload": {{}} 
-            }}
-            ```
-        
-        11. **Command**: "Show me the weather forecast for New York City tomorrow."
-            - **Parsed Output**:
-            ```json
-            {{
-    "module": "weather",
-              "command": "weather",
-              "payload": {{
-    "location": "New York City"
-              }}
-            }}
-            ```
-        
-        12. **Command**: "Summarize the web search results about 'artificial intelligence'."
-            - **Parsed Output**:
-            ```json
-            {{
-    "module": "web",
-              "command": "summarize",
-              "payload": {{
-    "query": "artificial intelligence",
-                "action": "summarize"
-              }}
-            }}
-            ```
-        
-        13. **Command**: "Translate 'Bonjour' into Spanish."
-            - **Parsed Output**:
-            ```json
-            {{
-    "module": "translate",
-              "command": "translate",
-              "payload": {{
-    "text": "Bonjour",
-                "target_language": "es"
-              }}
-            }}
-            ```
-        
-        14. **Command**: "Add a high-priority task to finish the report by Friday."
-            - **Parsed Output**:
-            ```json
-            {{
-    "module": "task",
-              "command": "priority",
-              "payload": {{
-    "priority": "high"
-              }}
-            }}
-            ```
-        
-        15. **Command**: "Fetch the top news in technology."
-            - **Parsed Output**:
-            ```json
-            {{
-    "module": "news",
-              "command": "news",
-              "payload": {{
-    "category": "technology"
-              }}
-            }}
-            ```
-            
-    If no module is selected, reply to the message as a conversational chat message :
-    
-        16. **Command**: "Hello, how are you today?"
-            - **Parsed Output**:
-            ```json
-            {{
-       "module": "", 
-    "message":  (reply to the message)
-                }}
-                ```
-            
-    
-            
-            
-Only provide the dictionary in the response. nothing more, nothing less. Don't even write anything or before the brackets.
-
-Now process the following command: "{raw_command}"
-"""
-
-                                                     )
+    client_key = get_client_key(request)
 
     try:
-        # Clean and parse the JSON
-        parsed_command_text = parsed_command_response.text.strip("```").strip("json").strip("\n").strip("```").strip()
-
+        session = session_store.get(client_key)
         try:
-            parsed_command = json.loads(parsed_command_text)
+            parsed_command = parse_command(raw_command)
         except json.JSONDecodeError as e:
             return jsonify({"error": f"Failed to parse the command: {e}"}), 400
 
+        parsed_command = apply_page_options(parsed_command, data)
         print(f"Parsed command: {parsed_command}")
         if parsed_command["module"] == "":
-            api_response = parsed_command["message"]
-            handle_user_command(session_id, raw_command,api_response, chat)
+            api_response = conversational_reply(session, raw_command, parsed_command["message"])
+            handle_user_command(session, raw_command, api_response)
             return jsonify({"response": api_response}), 200
         else:
             try:
                 api_response = activate_module(parsed_command, token)
-                handle_user_command(session_id, raw_command,api_response, chat)
+                handle_user_command(session, raw_command, api_response)
             except Exception as e:
                 return jsonify({"error": f"Failed to execute the command: {e}"}), 404
 
         if "status" in api_response:
             return jsonify(api_response), 200
 
-        natural_response = model.generate_content(f"""
-            You are a natural language processing model tasked with converting structured data output into natural language responses. Your goal is to generate user-friendly, conversational outputs that explain the results of various actions performed on different modules. 
-            
-            Here are the modules and the corresponding structured output you will convert into natural language:
-            
-            1. **Task Management Module**:
-                - Commands: "add", "priority", "category", "upcoming", "delete"
-                - Example Output:
-                    - For "add": {{ "status": "success", "task": {{ "description": "Finish report", "deadline": "next Monday" }} }}
-                    - For "priority": {{ "tasks": [ {{ "title": "Finish report", "priority": "high", "deadline": "next Monday" }}, ... ] }}
-                    - For "category": {{ "tasks": [ {{ "title": "Finish report", "category": "work", "deadline": "next Monday" }}, ... ] }}
-                    - For "upcoming": {{ "tasks": [ {{ "title": "Finish report", "deadline": "next Monday" }}, ... ] }}
-                    - For "delete": {{ "status": "success", "message": "Task 'Buy groceries' deleted successfully." }}
-                - Output Format:
-                    - "Task added successfully: '{{task_description}}', due by {{deadline}}."
-                    - "Here are your {{priority}} priority tasks:"
-                    - "You have {{num_tasks}} tasks in the {{category}} category."
-                    - "The following tasks are due by {{deadline}}:"
-                    - "Task '{{task_title}}' has been deleted successfully."
-            
-            2. **Web Browsing Module**:
-                - Commands: "search", "summarize"
-                - Example Output:
-                    - For "search": {{ "results": [ {{ "title": "AI in Healthcare", "link": "https://example.com" }}, ... ] }}
-                    - For "summarize": {{ "summary": "Artificial intelligence is transforming healthcare..." }}
-                - Output Format:
-                    - "Here are the top search results for '{{query}}':"
-                    - "Summary of the search results: {{summary}}"
-            
-            3. **Note Management Module**:
-                - Commands: "add", "retrieve", "summarize", "delete", "edit"
-                - Example Output:
-                    - For "add": {{ "status": "success", "note": {{ "title": "Meeting Notes", "content": "Discussed project updates" }} }}
-                    - For "retrieve": {{ "notes": [ {{ "title": "Meeting Notes", "content": "Discussed project updates" }}, ... ] }}
-                    - For "summarize": {{ "summary": "Discussed project updates..." }}
-                    - For "delete": {{ "status": "success", "message": "Note 'Meeting Notes' deleted successfully." }}
-                    - For "edit": {{ "status": "success", "message": "Note 'Meeting Notes' updated successfully." }}
-                - Output Format:
-                    - "Note '{{note_title}}' added successfully."
-                    - "Here are your notes containing '{{keyword}}':"
-                    - "Summary of note '{{note_title}}': {{summary}}"
-                    - "Note '{{note_title}}' deleted successfully."
-                    - "Note '{{note_title}}' has been updated successfully."
-            
-            4. **Translation Module**:
-                - Commands: "translate"
-                - Example Output:
-                    - For "translate": {{ "translated_text": "Hello, how are you?" }}
-                - Output Format:
-                    - "The translation of '{{text}}' to {{target_language}} is: {{translated_text}}"
-            
-            5. **Weather and News Module**:
-                - Commands: "weather", "news"
-                - Example Output:
-                    - For "weather": {{ "location": "Paris", "temperature": "18°C", "condition": "sunny", "humidity": "60%", "wind_speed": "15 km/h" }}
-                    - For "news": {{ "articles": [ {{ "title": "AI in Healthcare", "description": "AI is transforming healthcare..." }}, ... ] }}
-                - Output Format:
-                    - "The weather in {{location}} is {{temperature}}, with {{condition}}. Humidity is {{humidity}}% and wind speed is {{wind_speed}}."
-                    - "Here are the top {{num_articles}} news headlines:"
-                    - "{{article_title}}: {{article_description}}"
-            
-            6. **Email Management Module**:
-                - Commands: "fetch", "send", "summarize", "reply"
-                - Example Output:
-                    - For "fetch": {{ "emails": [ {{ "subject": "Meeting", "from": "john@example.com" }}, ... ] }}
-                    - For "send": {{ "status": "success", "message": "Email sent successfully to {{to_email}}" }}
-                    - For "summarize": {{ "summary": "Meeting with John about the new project." }}
-                    - For "reply": {{ "status": "success", "message": "Reply sent to email ID {{email_id}}" }}
-                - Output Format:
-                    - "You have {{num_emails}} new emails."
-                    - "Email sent successfully to {{to_email}} with subject '{{subject}}'."
-                    - "Summary of the email: {{summary}}"
-                    - "Reply sent to email ID {{email_id}}."
-            
-            ### Task:
-            Please convert the structured output data into natural language responses that can be easily understood by users.
-            
-            ### Example Input and Output:
-            
-            1. **Input**: {{ "status": "success", "task": {{ "description": "Finish report", "deadline": "next Monday" }} }}
-                - **Output**: "Task added successfully: 'Finish report', due by next Monday."
-            
-            2. **Input**: {{ "results": [ {{ "title": "AI in Healthcare", "link": "https://example.com" }} ] }}
-                - **Output**: "Here are the top search results for 'AI in Healthcare':\n1. AI in Healthcare - [Link](https://example.com)"
-            
-            3. **Input**: {{ "notes": [ {{ "title": "Meeting Notes", "content": "Discussed project updates" }} ] }}
-                - **Output**: "Here are your notes containing 'project':\n1. Meeting Notes: Discussed project updates"
-            
-            4. **Input**: {{ "translated_text": "Hello, how are you?" }}
-                - **Output**: "The translation of 'Hola, ¿cómo estás?' to English is: Hello, how are you?"
-            
-            5. **Input**: {{ "location": "Paris", "temperature": "18°C", "condition": "sunny", "humidity": "60%", "wind_speed": "15 km/h" }}
-                - **Output**: "The weather in Paris is 18°C, with sunny conditions. Humidity is 60% and wind speed is 15 km/h."
-            
-            6. **Input**: {{ "emails": [ {{ "subject": "Meeting", "from": "john@example.com" }} ] }}
-                - **Output**: "You have 1 new email.\nSubject: Meeting\nFrom: john@example.com"
-            
-            7. **Input**: {{ "status": "success", "message": "Email sent successfully to john.doe@example.com" }}
-                - **Output**: "Email sent successfully to john.doe@example.com."
-            
-            8. **Input**: {{ "summary": "AI in healthcare is improving patient outcomes and streamlining medical processes." }}
-                - **Output**: "Summary of the search results: AI in healthcare is improving patient outcomes and streamlining medical processes."
-            
-            9. **Input**: {{ "status": "success", "message": "Task 'Buy groceries' deleted successfully." }}
-                - **Output**: "Task 'Buy groceries' has been deleted successfully."
-            
-            10. **Input**: {{ "summary": "Discussed project updates with the team. Everyone is on track for deadlines." }}
-                - **Output**: "Summary of note 'Meeting Notes': Discussed project updates with the team. Everyone is on track for deadlines."
-            
-            11. **Input**: {{ "location": "New York City", "temperature": "10°C", "condition": "cloudy", "humidity": "75%", "wind_speed": "20 km/h" }}
-                - **Output**: "The weather in New York City is 10°C, with cloudy conditions. Humidity is 75% and wind speed is 20 km/h."
-            
-            12. **Input**: {{ "status": "success", "message": "Note 'Meeting Notes' updated successfully." }}
-                - **Output**: "Note 'Meeting Notes' has been updated successfully."
-            
-            13. **Input**: {{ "summary": "Project updates discussed, deadlines confirmed." }}
-                - **Output**: "Summary of note 'Project Meeting': Project updates discussed, deadlines confirmed."
-            
-            14. **Input**: {{ "status": "success", "message": "Reply sent to email ID 12345" }}
-                - **Output**: "Reply sent to email ID 12345."
-            
-             ---            
-
-            ### Inputs:
-            **Raw Command**: "{raw_command}"
-            **API Response**: {api_response}
-
-            ### Answer:
-        """)
-
-        natural_response_text = natural_response.text.strip()
-
-        return jsonify({"response": natural_response_text}), 200
+        natural_response_text = render_answer(raw_command, parsed_command, api_response,
+                                              data.get("render", RESPONSE_RENDERING))
+
+        return jsonify(answer_body(natural_response_text, api_response)), 200
     except Exception as e:
         print(f"Error: {e}")
         return jsonify({"error": "Internal server error."}), 500
 
 
+@app.route("/command/stream", methods=['POST'])
+def stream_command():
+    """
+    Endpoint to execute user commands with a Server-Sent Events response.
+    Emits a "parsed" event with the parsed command, a "result" event with the module response,
+    "token" events with the answer as it is generated, and a final "done" event with the full answer.
+    Failures are reported as a single "error" event.
+    """
+    data = request.get_json()
+
+    if not data or "command" not in data:
+        return jsonify({"error": "Command is required."}), 400
+
+    raw_command = data["command"].strip()
+    print(f"Received streaming command: {raw_command}")
+
+    token = get_bearer_token(request)
+    client_key = get_client_key(request)
+    render_mode = data.get("render", RESPONSE_RENDERING)
+
+    def generate():
+        try:
+            session = session_store.get(client_key)
+            try:
+                parsed_command = parse_command(raw_command)
+            except json.JSONDecodeError as e:
+                yield sse_event("error", {"error": f"Failed to parse the command: {e}"})
+                return
+            parsed_command = apply_page_options(parsed_command, data)
+            yield sse_event("parsed", parsed_command)
+
+            if parsed_command["module"] == "":
+                api_response = conversational_reply(session, raw_command, parsed_command["message"])
+                handle_user_command(session, raw_command, api_response)
+                yield sse_event("token", {"text": api_response})
+                yield sse_event("done", {"response": api_response})
+                return
+
+            try:
+                api_response = activate_module(parsed_command, token)
+            except Exception as e:
+                yield sse_event("error", {"error": f"Failed to execute the command: {e}"})
+                return
+            yield sse_event("result", api_response)
+            handle_user_command(session, raw_command, api_response)
+
+            if "status" in api_response:
+                yield sse_event("done", api_response)
+                return
+
+            natural_response_text = None
+            if render_mode != "llm":
+                natural_response_text = render_response(parsed_command, api_response)
+            if natural_response_text is not None:
+                yield sse_event("token", {"text": natural_response_text})
+            else:
+                chunks = []
+                render_prompt = build_render_prompt(raw_command, api_response)
+                for chunk in render_model.generate_content(render_prompt, stream=True):
+                    text = chunk_text(chunk)
+                    if text:
+                        chunks.append(text)
+                        yield sse_event("token", {"text": text})
+                natural_response_text = "".join(chunks).strip()
+
+            yield sse_event("done", answer_body(natural_response_text, api_response))
+        except Exception as e:
+            print(f"Error: {e}")
+            yield sse_event("error", {"error": "Internal server error."})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Function to execute one parsed command of a batch
+def execute_batch_item(session, raw_command, parsed_command, token, render_mode):
+    if parsed_command["module"] == "":
+        api_response = conversational_reply(session, raw_command, parsed_command["message"])
+        handle_user_command(session, raw_command, api_response)
+        return {"command": raw_command, "response": api_response}
+
+    try:
+        api_response = activate_module(parsed_command, token)
+        handle_user_command(session, raw_command, api_response)
+    except Exception as e:
+        return {"command": raw_command, "error": f"Failed to execute the command: {e}"}
+
+    if "status" in api_response:
+        return {"command": raw_command, **api_response}
+
+    try:
+        natural_response_text = render_answer(raw_command, parsed_command, api_response, render_mode)
+        return {"command": raw_command, **answer_body(natural_response_text, api_response)}
+    except Exception as e:
+        print(f"Error: {e}")
+        return {"command": raw_command, "error": "Internal server error."}
+
+
+@app.route("/commands", methods=['POST'])
+def execute_commands():
+    """
+    Endpoint to execute a batch of user commands.
+    Commands are parsed with a single Gemini call and executed concurrently; the response holds one
+    result per command, in order, each with either a "response" or an "error".
+    """
+    data = request.get_json()
+
+    if not data or not isinstance(data.get("commands"), list) or not data["commands"]:
+        return jsonify({"error": "A non-empty list of commands is required."}), 400
+    if len(data["commands"]) > BATCH_MAX_COMMANDS:
+        return jsonify({"error": f"A batch can hold at most {BATCH_MAX_COMMANDS} commands."}), 400
+    if not all(isinstance(command, str) for command in data["commands"]):
+        return jsonify({"error": "Every command must be a string."}), 400
+
+    raw_commands = [command.strip() for command in data["commands"]]
+    print(f"Received {len(raw_commands)} commands")
+
+    token = get_bearer_token(request)
+    client_key = get_client_key(request)
+    render_mode = data.get("render", RESPONSE_RENDERING)
+
+    try:
+        session = session_store.get(client_key)
+        parsed_commands = parse_commands(raw_commands)
+    except Exception as e:
+        print(f"Error: {e}")
+        return jsonify({"error": "Internal server error."}), 500
+
+    results = [None] * len(raw_commands)
+    with ThreadPoolExecutor(max_workers=min(BATCH_MAX_WORKERS, len(raw_commands))) as executor:
+        futures = {}
+        for index, (raw_command, (parsed_command, error)) in enumerate(zip(raw_commands, parsed_commands)):
+            if error:
+                results[index] = {"command": raw_command, "error": error}
+            else:
+                futures[index] = executor.submit(execute_batch_item, session, raw_command, parsed_command, token,
+                                                 render_mode)
+        for index, future in futures.items():
+            results[index] = future.result()
+
+    return jsonify({"results": results}), 200
+
+
+# Function to read a boolean query parameter
+def flag(name):
+    return request.args.get(name, "false").lower() in ("1", "true", "yes")
+
+
+# Function to stream NDJSON lines as a file download
+def ndjson_response(lines, filename):
+    return Response(
+        stream_with_context(lines),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@app.route("/notes/import", methods=['POST'])
+def notes_import():
+    """
+    Endpoint to import notes from an NDJSON request body, one note per line.
+    With ?summarize=true the imported notes are also summarized in the background.
+    """
+    return jsonify(import_notes(request.stream, summarize=flag("summarize"))), 200
+
+
+@app.route("/tasks/import", methods=['POST'])
+def tasks_import():
+    """
+    Endpoint to import tasks from an NDJSON request body, one task per line.
+    With ?infer=true Gemini infers the priority and category of tasks that have none.
+    """
+    return jsonify(import_tasks(request.stream, infer=flag("infer"))), 200
+
+
+@app.route("/notes/export", methods=['GET'])
+def notes_export():
+    """Endpoint to stream every note as NDJSON."""
+    return ndjson_response(export_notes(), "notes.ndjson")
+
+
+@app.route("/tasks/export", methods=['GET'])
+def tasks_export():
+    """Endpoint to stream every task as NDJSON."""
+    return ndjson_response(export_tasks(), "tasks.ndjson")
+
+
+@app.route("/warmup", methods=['GET', 'POST'])
+def warmup():
+    """Endpoint to initialize Firebase and Gemini ahead of the first command."""
+    report = warm_up()
+    status = 500 if any("error" in step for step in report.values()) else 200
+    return jsonify(report), status
+
+
+@app.route("/cache/stats", methods=['GET'])
+def cache_stats():
+    """Endpoint to report parsed command cache counters."""
+    return jsonify(command_cache.stats()), 200
+
+
+@app.route("/history/stats", methods=['GET'])
+def history_stats():
+    """Endpoint to report interaction history write queue and compaction counters."""
+    stats = history_writer.stats()
+    stats["compaction"] = history_compactor.stats()
+    return jsonify(stats), 200
+
+
+@app.route("/outbox/stats", methods=['GET'])
+def outbox_stats():
+    """Endpoint to report email outbox sender counters and message states."""
+    return jsonify(email_outbox.stats()), 200
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,87 @@
+import json
+
+from quart import Quart, request, jsonify
+
+from bot_logic.async_utils import close_http_client, run_blocking
+from bot_logic.command_pipeline import (answer_body, apply_page_options, get_bearer_token, parse_command_async,
+                                       render_answer_async)
+from bot_logic.config import RESPONSE_RENDERING, WARM_UP_ON_START
+from bot_logic.interaction_history import conversational_reply, handle_user_command
+from bot_logic.session_store import get_client_key, session_store
+from bot_logic.voice_interaction import activate_module_async
+from bot_logic.warmup import warm_up
+
+# Async counterpart of app.py: serve with an ASGI server, e.g. `uvicorn asgi:app`.
+# Gemini and HTTP waits are awaited on the event loop, so one process can hold many commands in flight.
+app = Quart(__name__)
+
+
+@app.before_serving
+async def startup():
+    # Firebase and Gemini are initialized on first use, or right away without delaying startup
+    if WARM_UP_ON_START:
+        app.add_background_task(run_blocking, warm_up)
+
+
+@app.after_serving
+async def shutdown():
+    await close_http_client()
+
+
+@app.route("/warmup", methods=['GET', 'POST'])
+async def warmup():
+    """Endpoint to initialize Firebase and Gemini ahead of the first command."""
+    report = await run_blocking(warm_up)
+    status = 500 if any("error" in step for step in report.values()) else 200
+    return jsonify(report), status
+
+
+@app.route("/command", methods=['POST'])
+async def execute_command():
+    """
+    Endpoint to execute user commands.
+    Note and task listings are paged: the body may carry "page_size", "fields" and the "cursor" returned as
+    "next_cursor" with the previous page.
+    """
+    data = await request.get_json()
+
+    if not data or "command" not in data:
+        return jsonify({"error": "Command is required."}), 400
+
+    raw_command = data["command"].strip()
+    print(f"Received command: {raw_command}")
+
+    # Retrieve the Bearer token from the Authorization header
+    token = get_bearer_token(request)
+    client_key = get_client_key(request)
+
+    try:
+        session = await run_blocking(session_store.get, client_key)
+        try:
+            parsed_command = await parse_command_async(raw_command)
+        except json.JSONDecodeError as e:
+            return jsonify({"error": f"Failed to parse the command: {e}"}), 400
+
+        parsed_command = apply_page_options(parsed_command, data)
+        print(f"Parsed command: {parsed_command}")
+        if parsed_command["module"] == "":
+            api_response = await run_blocking(conversational_reply, session, raw_command, parsed_command["message"])
+            handle_user_command(session, raw_command, api_response)
+            return jsonify({"response": api_response}), 200
+        else:
+            try:
+                api_response = await activate_module_async(parsed_command, token)
+                handle_user_command(session, raw_command, api_response)
+            except Exception as e:
+                return jsonify({"error": f"Failed to execute the command: {e}"}), 404
+
+        if "status" in api_response:
+            return jsonify(api_response), 200
+
+        natural_response_text = await render_answer_async(raw_command, parsed_command, api_response,
+                                                          data.get("render", RESPONSE_RENDERING))
+
+        return jsonify(answer_body(natural_response_text, api_response)), 200
+    except Exception as e:
+        print(f"Error: {e}")
+        return jsonify({"error": "Internal server error."}), 500
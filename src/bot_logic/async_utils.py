@@ -0,0 +1,40 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from .config import BLOCKING_IO_WORKERS, HTTP_TIMEOUT_SECONDS
+
+# Firestore, Gmail and googletrans only ship synchronous clients, so their calls run on a bounded pool
+blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_IO_WORKERS, thread_name_prefix="samigo-io")
+
+_http_client = None
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Runs a blocking call on the shared I/O pool without blocking the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, functools.partial(func, *args, **kwargs))
+
+
+def get_http_client():
+    """
+    Returns the shared async HTTP client, creating it on first use.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=HTTP_TIMEOUT_SECONDS)
+    return _http_client
+
+
+async def close_http_client():
+    """
+    Closes the shared async HTTP client, if one was created.
+    """
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
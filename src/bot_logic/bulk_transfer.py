@@ -0,0 +1,133 @@
+import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from itertools import islice
+
+from .config import IMPORT_WORKERS, IMPORT_MAX_ERRORS, EXPORT_PAGE_SIZE
+from .firebase_initializer import db
+from .pagination import DOCUMENT_ID
+
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_WRITES = 500
+
+
+class ImportReport:
+    """Counts what an import wrote and keeps the first max_errors problems, with the line they came from."""
+
+    def __init__(self, max_errors=IMPORT_MAX_ERRORS):
+        self.max_errors = max_errors
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def succeed(self, count):
+        with self._lock:
+            self.imported += count
+
+    def fail(self, line, error, count=1):
+        with self._lock:
+            self.failed += count
+            if len(self.errors) < self.max_errors:
+                self.errors.append({"line": line, "error": str(error)})
+
+    def as_dict(self):
+        return {"imported": self.imported, "failed": self.failed, "errors": self.errors}
+
+
+def read_ndjson(lines, report):
+    """
+    Yields (line number, record) for each JSON object of an NDJSON stream of bytes or text lines.
+    Blank lines are skipped; lines that are not a JSON object are recorded on the report.
+    """
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            report.fail(number, f"Invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            report.fail(number, "Each line must be a JSON object.")
+            continue
+        yield number, record
+
+
+def chunked(items, size):
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def write_chunks(chunks, write_chunk, report, workers=IMPORT_WORKERS):
+    """
+    Writes chunks of (line number, record) pairs with write_chunk, at most workers at a time.
+
+    write_chunk builds and commits the batch of one chunk and returns the number of records it wrote; records
+    it rejects itself are recorded on the report. Reading stops while workers chunks are in flight, so memory
+    stays bounded however long the input is. A chunk whose commit fails is counted as failed as a whole.
+    """
+    in_flight = deque()
+
+    def settle(chunk, future):
+        try:
+            report.succeed(future.result())
+        except Exception as e:
+            report.fail(chunk[0][0], f"Batch starting at this line failed: {e}", len(chunk))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-import") as executor:
+        for chunk in chunks:
+            if len(in_flight) >= workers:
+                settle(*in_flight.popleft())
+            in_flight.append((chunk, executor.submit(write_chunk, chunk)))
+        while in_flight:
+            settle(*in_flight.popleft())
+    return report
+
+
+def parse_datetime(value):
+    """
+    Reads the ISO timestamps written by export, returning None for anything else. Stored timestamps are naive
+    local wall times that Firestore labels as UTC, so the zone is dropped rather than converted, as wall_time does.
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def to_ndjson(record):
+    return json.dumps(record, default=_json_default, ensure_ascii=False) + "\n"
+
+
+def export_collection(collection, page_size=EXPORT_PAGE_SIZE, transform=None):
+    """
+    Yields every document of a collection as an NDJSON line, reading it in pages ordered by document ID so
+    only one page is held in memory at a time.
+    """
+    query = db.collection(collection).order_by(DOCUMENT_ID).limit(page_size)
+    last = None
+    while True:
+        page = list((query.start_after(last) if last is not None else query).stream())
+        for snapshot in page:
+            record = snapshot.to_dict()
+            yield to_ndjson(transform(record) if transform else record)
+        if len(page) < page_size:
+            return
+        last = page[-1]
@@ -0,0 +1,143 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .config import (COMMAND_CACHE_PATH, COMMAND_CACHE_MAX_ENTRIES, COMMAND_CACHE_MAX_DISK_ENTRIES,
+                     COMMAND_CACHE_TTL_SECONDS)
+from .intent_router import normalize_command
+
+# Punctuation that is not inside a word ("what's" and "john.doe@example.com" keep theirs)
+LOOSE_PUNCTUATION = re.compile(r"(?<![\w@])[^\w\s]+|[^\w\s]+(?![\w@])")
+
+
+def cache_key(raw_command):
+    """
+    Normalizes a command so that differences in case, whitespace and punctuation share one cache entry.
+
+    Parameters:
+        raw_command (str): The command received by the /command endpoint.
+
+    Returns:
+        str: The normalized cache key.
+    """
+    command = normalize_command(raw_command).casefold()
+    return " ".join(LOOSE_PUNCTUATION.sub(" ", command).split())
+
+
+class CommandCache:
+    """
+    Two-tier cache of parsed commands.
+
+    The first tier is an in-process LRU with a TTL. The second tier is a SQLite file that is shared by every
+    worker on the host and survives restarts; hits there are promoted into the first tier.
+    """
+
+    def __init__(self, path, max_entries=1024, max_disk_entries=50000, ttl_seconds=86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "disk_errors": 0}
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS parsed_commands "
+                "(key TEXT PRIMARY KEY, parsed TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _remember(self, key, parsed_text, expires_at):
+        with self._lock:
+            self._entries[key] = (parsed_text, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, raw_command):
+        """Returns the cached parse of a command, or None on a miss."""
+        key = cache_key(raw_command)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return json.loads(entry[0])
+                del self._entries[key]
+
+        try:
+            row = self._connection().execute(
+                "SELECT parsed, expires_at FROM parsed_commands WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Command cache read failed: {e}")
+            self._count("disk_errors")
+            row = None
+
+        if row is None:
+            self._count("misses")
+            return None
+
+        self._remember(key, row[0], row[1])
+        self._count("disk_hits")
+        return json.loads(row[0])
+
+    def put(self, raw_command, parsed_command):
+        """Stores the parse of a command in both tiers."""
+        key = cache_key(raw_command)
+        parsed_text = json.dumps(parsed_command)
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, parsed_text, expires_at)
+        self._count("stores")
+
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO parsed_commands (key, parsed, expires_at) VALUES (?, ?, ?)",
+                    (key, parsed_text, expires_at),
+                )
+                # Expired rows go first, then the oldest ones beyond the size cap
+                connection.execute("DELETE FROM parsed_commands WHERE expires_at <= ?", (time.time(),))
+                connection.execute(
+                    "DELETE FROM parsed_commands WHERE key IN (SELECT key FROM parsed_commands "
+                    "ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+        except sqlite3.Error as e:
+            print(f"Command cache write failed: {e}")
+            self._count("disk_errors")
+
+    def stats(self):
+        """Returns hit/miss counters and the current size of the in-process tier."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._entries)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+command_cache = CommandCache(
+    COMMAND_CACHE_PATH,
+    max_entries=COMMAND_CACHE_MAX_ENTRIES,
+    max_disk_entries=COMMAND_CACHE_MAX_DISK_ENTRIES,
+    ttl_seconds=COMMAND_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,281 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+import google.generativeai as genai
+from google.generativeai import caching
+
+from .command_cache import command_cache
+from .config import GEMINI_MODEL_NAME, GEMINI_CONTEXT_CACHING, GEMINI_CACHE_MODEL_NAME, GEMINI_CACHE_TTL_MINUTES
+from .gemini import configure_gemini
+from .intent_router import route_command
+from .prompts import PARSE_INSTRUCTIONS, RENDER_INSTRUCTIONS
+from .response_renderer import render_response
+
+# Create the model
+generation_config = {
+  "temperature": 1,
+  "top_p": 0.95,
+  "top_k": 40,
+  "max_output_tokens": 8192,
+  "response_mime_type": "text/plain",
+}
+
+
+class InstructionModel:
+    """
+    A Gemini model whose static instructions are sent once instead of with every request.
+
+    With GEMINI_CONTEXT_CACHING enabled the instructions are uploaded as cached content and the model is
+    rebuilt from a fresh cache shortly before it expires; otherwise, or if caching is rejected (e.g. the
+    model does not support it or the instructions are below its minimum size), they become the model's
+    system instruction.
+    """
+
+    def __init__(self, system_instruction):
+        self.system_instruction = system_instruction
+        self._model = None
+        self._expires_at = None
+        self._lock = threading.Lock()
+
+    def _create_cached_model(self):
+        ttl = timedelta(minutes=GEMINI_CACHE_TTL_MINUTES)
+        cached_content = caching.CachedContent.create(
+            model=GEMINI_CACHE_MODEL_NAME,
+            system_instruction=self.system_instruction,
+            ttl=ttl,
+        )
+        # Refresh a minute early so no request reaches an expired cache
+        self._expires_at = datetime.now() + ttl - timedelta(minutes=1)
+        return genai.GenerativeModel.from_cached_content(cached_content, generation_config=generation_config)
+
+    def _create_model(self):
+        configure_gemini()
+        if GEMINI_CONTEXT_CACHING:
+            try:
+                return self._create_cached_model()
+            except Exception as e:
+                print(f"Context caching unavailable, using a system instruction instead: {e}")
+        self._expires_at = None
+        return genai.GenerativeModel(
+            model_name=GEMINI_MODEL_NAME,
+            generation_config=generation_config,
+            system_instruction=self.system_instruction,
+        )
+
+    def get(self):
+        """Returns the model, creating or refreshing it as needed."""
+        with self._lock:
+            if self._model is None or (self._expires_at is not None and datetime.now() >= self._expires_at):
+                self._model = self._create_model()
+            return self._model
+
+    def generate_content(self, prompt, **kwargs):
+        return self.get().generate_content(prompt, **kwargs)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        return await self.get().generate_content_async(prompt, **kwargs)
+
+
+# Request body fields that select a page of a note or task listing
+PAGE_OPTIONS = ("page_size", "cursor", "fields")
+
+parse_model = InstructionModel(PARSE_INSTRUCTIONS)
+render_model = InstructionModel(RENDER_INSTRUCTIONS)
+
+
+# Function to get the bearer token from the request
+def get_bearer_token(request):
+    auth_header = request.headers.get('Authorization')
+    if auth_header and auth_header.startswith('Bearer '):
+        return auth_header[7:]  # Extract token
+    return None
+
+
+# Function to build the prompt that parses a natural language command
+def build_parse_prompt(raw_command):
+    """
+    Returns the per-request part of the parse prompt; the static part is the model's system instruction.
+    """
+    return f'Now process the following command: "{raw_command}"'
+
+
+# Function to build the prompt that turns a module response into natural language
+def build_render_prompt(raw_command, api_response):
+    """
+    Returns the per-request part of the render prompt; the static part is the model's system instruction.
+    """
+    return f"""### Inputs:
+**Raw Command**: "{raw_command}"
+**API Response**: {api_response}
+
+### Answer:
+"""
+
+
+# Function to build the prompt that parses several commands in one call
+def build_batch_parse_prompt(raw_commands):
+    """
+    Returns the per-request prompt that asks for one parsed dictionary per command, as a JSON array.
+    """
+    numbered_commands = "\n".join(
+        f'{index}. "{raw_command}"' for index, raw_command in enumerate(raw_commands, start=1)
+    )
+    return (
+        f"Process each of the following {len(raw_commands)} commands independently. Return a JSON array with "
+        f"exactly one dictionary per command, in the same order, and nothing else.\n\n{numbered_commands}"
+    )
+
+
+def _load_parsed_command(parsed_command_response):
+    # Clean and parse the JSON
+    parsed_command_text = parsed_command_response.text.strip("```").strip("json").strip("\n").strip("```").strip()
+    return json.loads(parsed_command_text)
+
+
+# Function to parse a command with Gemini when the local router is not confident
+def parse_command_with_gemini(raw_command):
+    """
+    Parses a natural language command into a module/command/payload dictionary using Gemini.
+    Raises json.JSONDecodeError if the model does not answer with a valid dictionary.
+    """
+    return _load_parsed_command(parse_model.generate_content(build_parse_prompt(raw_command)))
+
+
+async def parse_command_with_gemini_async(raw_command):
+    """
+    Async variant of parse_command_with_gemini.
+    """
+    return _load_parsed_command(await parse_model.generate_content_async(build_parse_prompt(raw_command)))
+
+
+# Function to parse a command through the local router, the cache and finally Gemini
+def parse_command(raw_command):
+    """
+    Returns the parsed module/command/payload dictionary for a raw command.
+    Raises json.JSONDecodeError if Gemini had to parse it and answered with an invalid dictionary.
+    """
+    # Unambiguous commands are parsed locally; everything else goes to the cache and then to Gemini
+    parsed_command = route_command(raw_command) or command_cache.get(raw_command)
+    if parsed_command is None:
+        parsed_command = parse_command_with_gemini(raw_command)
+        # Conversational replies are not cached so small talk does not repeat itself
+        if parsed_command.get("module"):
+            command_cache.put(raw_command, parsed_command)
+    return parsed_command
+
+
+async def parse_command_async(raw_command):
+    """
+    Async variant of parse_command.
+    """
+    parsed_command = route_command(raw_command) or command_cache.get(raw_command)
+    if parsed_command is None:
+        parsed_command = await parse_command_with_gemini_async(raw_command)
+        if parsed_command.get("module"):
+            command_cache.put(raw_command, parsed_command)
+    return parsed_command
+
+
+# Function to parse a batch of commands, sending everything the router and cache cannot answer to Gemini at once
+def parse_commands(raw_commands):
+    """
+    Parses several commands with at most one Gemini call.
+
+    Returns:
+        list: One (parsed_command, error) tuple per command, in order; exactly one of the two is None.
+    """
+    results = [None] * len(raw_commands)
+    pending = []
+    for index, raw_command in enumerate(raw_commands):
+        parsed_command = route_command(raw_command) or command_cache.get(raw_command)
+        if parsed_command is None:
+            pending.append(index)
+        else:
+            results[index] = (parsed_command, None)
+
+    if pending:
+        pending_commands = [raw_commands[index] for index in pending]
+        try:
+            batch_response = parse_model.generate_content(build_batch_parse_prompt(pending_commands))
+            parsed_commands = _load_parsed_command(batch_response)
+            if not isinstance(parsed_commands, list) or len(parsed_commands) != len(pending):
+                raise ValueError(f"expected {len(pending)} parsed commands")
+        except (json.JSONDecodeError, ValueError) as e:
+            for index in pending:
+                results[index] = (None, f"Failed to parse the command: {e}")
+            return results
+
+        for index, parsed_command in zip(pending, parsed_commands):
+            if not isinstance(parsed_command, dict) or "module" not in parsed_command:
+                results[index] = (None, "Failed to parse the command.")
+                continue
+            if parsed_command["module"]:
+                command_cache.put(raw_commands[index], parsed_command)
+            results[index] = (parsed_command, None)
+
+    return results
+
+
+# Function to add the paging options of a request to a parsed command
+def apply_page_options(parsed_command, data):
+    """
+    Copies "page_size", "cursor" and "fields" from the request body into the payload, so a client can ask for
+    the next page of a listing by sending the command again with its next_cursor. Parsed commands may come
+    from the cache, so the command is copied rather than changed.
+    """
+    options = {option: data[option] for option in PAGE_OPTIONS if data.get(option) is not None}
+    if not options or not parsed_command.get("module"):
+        return parsed_command
+    return {**parsed_command, "payload": {**(parsed_command.get("payload") or {}), **options}}
+
+
+# Function to build the body of a command response
+def answer_body(answer, api_response):
+    """Returns the response body for an answer, with the cursor of the next page when the listing has one."""
+    body = {"response": answer}
+    if isinstance(api_response, dict) and api_response.get("next_cursor"):
+        body["next_cursor"] = api_response["next_cursor"]
+    return body
+
+
+# Function to render a module response with Gemini when no template fits
+def render_response_with_gemini(raw_command, api_response):
+    """
+    Converts the structured module response into a natural language answer using Gemini.
+    """
+    natural_response = render_model.generate_content(build_render_prompt(raw_command, api_response))
+    return natural_response.text.strip()
+
+
+async def render_response_with_gemini_async(raw_command, api_response):
+    """
+    Async variant of render_response_with_gemini.
+    """
+    natural_response = await render_model.generate_content_async(build_render_prompt(raw_command, api_response))
+    return natural_response.text.strip()
+
+
+# Function to produce the natural language answer for a module response
+def render_answer(raw_command, parsed_command, api_response, render_mode="template"):
+    """
+    Known response shapes are rendered from templates; Gemini renders the rest or when render_mode is "llm".
+    """
+    natural_response_text = None
+    if render_mode != "llm":
+        natural_response_text = render_response(parsed_command, api_response)
+    if natural_response_text is None:
+        natural_response_text = render_response_with_gemini(raw_command, api_response)
+    return natural_response_text
+
+
+async def render_answer_async(raw_command, parsed_command, api_response, render_mode="template"):
+    """
+    Async variant of render_answer.
+    """
+    natural_response_text = None
+    if render_mode != "llm":
+        natural_response_text = render_response(parsed_command, api_response)
+    if natural_response_text is None:
+        natural_response_text = await render_response_with_gemini_async(raw_command, api_response)
+    return natural_response_text
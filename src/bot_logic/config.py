@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -29,9 +30,108 @@ GMAIL_REDIRECT_URI = os.getenv("GMAIL_REDIRECT_URI")
 
 GMAIL_TOKEN_PATH = os.getenv("GMAIL_TOKEN_PATH")
 
+# Validated Gmail credentials are cached per access token; Gmail services are cached per token and thread
+GMAIL_CREDENTIAL_CACHE_SIZE = int(os.getenv("GMAIL_CREDENTIAL_CACHE_SIZE", "256"))
+GMAIL_SERVICES_PER_THREAD = int(os.getenv("GMAIL_SERVICES_PER_THREAD", "16"))
+
+# Local mailbox index kept current through Gmail's history feed
+MAILBOX_INDEX_MAX_USERS = int(os.getenv("MAILBOX_INDEX_MAX_USERS", "100"))
+MAILBOX_INDEX_MAX_MESSAGES = int(os.getenv("MAILBOX_INDEX_MAX_MESSAGES", "500"))
+MAILBOX_SYNC_INTERVAL_SECONDS = float(os.getenv("MAILBOX_SYNC_INTERVAL_SECONDS", "15"))
+
+# Number of emails a fetch returns by default and at most
+EMAIL_FETCH_DEFAULT_RESULTS = int(os.getenv("EMAIL_FETCH_DEFAULT_RESULTS", "10"))
+EMAIL_FETCH_MAX_RESULTS = int(os.getenv("EMAIL_FETCH_MAX_RESULTS", "100"))
+
+# Long emails and threads are summarized in chunks of this many characters, up to a total cap
+EMAIL_SUMMARY_CHUNK_CHARS = int(os.getenv("EMAIL_SUMMARY_CHUNK_CHARS", "6000"))
+EMAIL_SUMMARY_MAX_CHARS = int(os.getenv("EMAIL_SUMMARY_MAX_CHARS", "60000"))
+EMAIL_SUMMARY_WORKERS = int(os.getenv("EMAIL_SUMMARY_WORKERS", "4"))
+
+# Durable outbox for sent emails and replies, delivered in the background
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", os.path.join(tempfile.gettempdir(), "samigo_outbox.sqlite3"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "1.0"))
+OUTBOX_BACKOFF_BASE_SECONDS = float(os.getenv("OUTBOX_BACKOFF_BASE_SECONDS", "2"))
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "300"))
+
 # News API key
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 
 # Weather API configuration
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
 WEATHER_API_HOST = os.getenv("WEATHER_API_HOST")
+
+# Parsed command cache configuration
+COMMAND_CACHE_PATH = os.getenv("COMMAND_CACHE_PATH", os.path.join(tempfile.gettempdir(), "samigo_command_cache.sqlite3"))
+COMMAND_CACHE_MAX_ENTRIES = int(os.getenv("COMMAND_CACHE_MAX_ENTRIES", "1024"))
+COMMAND_CACHE_MAX_DISK_ENTRIES = int(os.getenv("COMMAND_CACHE_MAX_DISK_ENTRIES", "50000"))
+COMMAND_CACHE_TTL_SECONDS = int(os.getenv("COMMAND_CACHE_TTL_SECONDS", "86400"))
+
+# Response rendering: "template" renders known response shapes locally, "llm" always asks Gemini
+RESPONSE_RENDERING = os.getenv("RESPONSE_RENDERING", "template")
+
+# Async execution configuration
+BLOCKING_IO_WORKERS = int(os.getenv("BLOCKING_IO_WORKERS", "32"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+
+# Gemini model used by the command pipeline, and optional context caching of its static instructions
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-2.0-flash-exp")
+GEMINI_CONTEXT_CACHING = os.getenv("GEMINI_CONTEXT_CACHING", "false").lower() == "true"
+GEMINI_CACHE_MODEL_NAME = os.getenv("GEMINI_CACHE_MODEL_NAME", "models/gemini-1.5-flash-002")
+GEMINI_CACHE_TTL_MINUTES = int(os.getenv("GEMINI_CACHE_TTL_MINUTES", "60"))
+
+# Batch command endpoint limits
+BATCH_MAX_COMMANDS = int(os.getenv("BATCH_MAX_COMMANDS", "50"))
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "8"))
+
+# Interaction history write-behind queue
+HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", "10000"))
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "100"))
+HISTORY_FLUSH_INTERVAL_SECONDS = float(os.getenv("HISTORY_FLUSH_INTERVAL_SECONDS", "1.0"))
+HISTORY_MAX_ATTEMPTS = int(os.getenv("HISTORY_MAX_ATTEMPTS", "3"))
+
+# Number of session/note IDs each process leases from Firestore at a time
+ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "100"))
+
+# Initialize Firebase, Gemini and the chat session in the background as soon as the app starts
+WARM_UP_ON_START = os.getenv("WARM_UP_ON_START", "false").lower() == "true"
+
+# Per-client session store
+SESSION_MAX_CLIENTS = int(os.getenv("SESSION_MAX_CLIENTS", "1000"))
+SESSION_IDLE_SECONDS = int(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+SESSION_HISTORY_TOKEN_BUDGET = int(os.getenv("SESSION_HISTORY_TOKEN_BUDGET", "2000"))
+# X-Session-Id of the one client that takes over the conversation kept before sessions were per client
+LEGACY_HISTORY_SESSION_ID = os.getenv("LEGACY_HISTORY_SESSION_ID", "")
+
+# Rolling summary of older turns: how many recent turns stay verbatim and how long the summary may grow
+HISTORY_VERBATIM_TURNS = int(os.getenv("HISTORY_VERBATIM_TURNS", "6"))
+HISTORY_SUMMARY_MAX_CHARS = int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", "2000"))
+HISTORY_COMPACTION_WORKERS = int(os.getenv("HISTORY_COMPACTION_WORKERS", "2"))
+
+# Local full-text index of notes used for keyword retrieval
+NOTE_INDEX_PATH = os.getenv("NOTE_INDEX_PATH", os.path.join(tempfile.gettempdir(), "samigo_note_index.sqlite3"))
+# Keyword matches beyond this many are not ranked or paged through
+NOTE_SEARCH_LIMIT = int(os.getenv("NOTE_SEARCH_LIMIT", "200"))
+# Notes written by other processes reach this process's indexes at most this many seconds later
+NOTE_INDEX_SYNC_INTERVAL_SECONDS = float(os.getenv("NOTE_INDEX_SYNC_INTERVAL_SECONDS", "5"))
+
+# Similar-note search and near-duplicate detection
+NOTE_VECTOR_DIMS = int(os.getenv("NOTE_VECTOR_DIMS", "512"))
+NOTE_DUPLICATE_THRESHOLD = float(os.getenv("NOTE_DUPLICATE_THRESHOLD", "0.8"))
+
+# Summarize newly added notes of at least this many characters in the background
+NOTE_PRESUMMARIZE = os.getenv("NOTE_PRESUMMARIZE", "false").lower() == "true"
+NOTE_PRESUMMARIZE_MIN_CHARS = int(os.getenv("NOTE_PRESUMMARIZE_MIN_CHARS", "1500"))
+
+# Note and task listings are returned in pages of this many items, with a cursor for the next page
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "20"))
+LIST_MAX_PAGE_SIZE = int(os.getenv("LIST_MAX_PAGE_SIZE", "100"))
+
+# Bulk NDJSON import and export of notes and tasks
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "4"))
+IMPORT_INFERENCE_WORKERS = int(os.getenv("IMPORT_INFERENCE_WORKERS", "4"))
+IMPORT_MAX_PENDING_SUMMARIES = int(os.getenv("IMPORT_MAX_PENDING_SUMMARIES", "100"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "50"))
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
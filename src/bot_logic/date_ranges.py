@@ -0,0 +1,85 @@
+import re
+from datetime import date, datetime, timedelta
+
+import dateparser
+
+RELATIVE_DAYS = re.compile(r"(?:last|past) (\d+) days?")
+SINCE = re.compile(r"(?:since|after) (.+)")
+BETWEEN = re.compile(r"(?:between|from) (.+?) (?:and|to|until) (.+)")
+
+
+def _day_start(value):
+    return datetime.combine(value, datetime.min.time())
+
+
+def _parse_day(text):
+    parsed = dateparser.parse(text, settings={"PREFER_DATES_FROM": "past"})
+    return parsed.date() if parsed else None
+
+
+def resolve_date_range(value, today=None):
+    """
+    Resolves a date range into a (start, end) pair of naive datetimes, start inclusive and end exclusive.
+
+    Parameters:
+        value: A phrase such as "today", "last week", "this month", "past 7 days", "since March 3",
+            "between May 1 and May 5" or a single date, or an explicit (start, end) pair of dates or datetimes.
+        today (date): The reference day, defaults to the current day.
+
+    Returns:
+        tuple: (start, end), or None if the phrase is not understood.
+    """
+    today = today or date.today()
+
+    if isinstance(value, (list, tuple)) and len(value) == 2:
+        start, end = value
+        start = _parse_day(start) if isinstance(start, str) else start
+        end = _parse_day(end) if isinstance(end, str) else end
+        if start is None or end is None:
+            return None
+        start = start if isinstance(start, datetime) else _day_start(start)
+        # An end given as a day covers that whole day
+        end = end if isinstance(end, datetime) else _day_start(end) + timedelta(days=1)
+        return start, end
+
+    if not isinstance(value, str):
+        return None
+    phrase = " ".join(value.lower().split())
+    week_start = today - timedelta(days=today.weekday())
+
+    if phrase == "today":
+        start, end = today, today
+    elif phrase == "yesterday":
+        start = end = today - timedelta(days=1)
+    elif phrase == "this week":
+        start, end = week_start, today
+    elif phrase == "last week":
+        start, end = week_start - timedelta(days=7), week_start - timedelta(days=1)
+    elif phrase in ("past week", "last 7 days"):
+        start, end = today - timedelta(days=6), today
+    elif phrase == "this month":
+        start, end = today.replace(day=1), today
+    elif phrase == "last month":
+        end = today.replace(day=1) - timedelta(days=1)
+        start = end.replace(day=1)
+    elif phrase == "past month":
+        start, end = today - timedelta(days=29), today
+    elif phrase == "this year":
+        start, end = today.replace(month=1, day=1), today
+    elif phrase == "last year":
+        start, end = date(today.year - 1, 1, 1), date(today.year - 1, 12, 31)
+    elif phrase == "past year":
+        start, end = today - timedelta(days=364), today
+    elif RELATIVE_DAYS.fullmatch(phrase):
+        start, end = today - timedelta(days=int(RELATIVE_DAYS.fullmatch(phrase).group(1)) - 1), today
+    elif SINCE.fullmatch(phrase):
+        start, end = _parse_day(SINCE.fullmatch(phrase).group(1)), today
+    elif BETWEEN.fullmatch(phrase):
+        match = BETWEEN.fullmatch(phrase)
+        start, end = _parse_day(match.group(1)), _parse_day(match.group(2))
+    else:
+        start = end = _parse_day(phrase)
+
+    if start is None or end is None or start > end:
+        return None
+    return _day_start(start), _day_start(end) + timedelta(days=1)
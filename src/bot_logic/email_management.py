@@ -1,23 +1,31 @@
+import atexit
 import base64
 import datetime
 from email.mime.text import MIMEText
 
-import google.generativeai as genai  # Ensure Gemini API client is imported
 import requests
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-from .config import GEMINI_API_KEY, GMAIL_CLIENT_SECRET, GMAIL_CLIENT_ID
+from .async_utils import run_blocking
+from .config import (GMAIL_CLIENT_SECRET, GMAIL_CLIENT_ID, EMAIL_FETCH_DEFAULT_RESULTS, EMAIL_FETCH_MAX_RESULTS,
+                     OUTBOX_PATH, OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS, OUTBOX_POLL_SECONDS,
+                     OUTBOX_BACKOFF_BASE_SECONDS, OUTBOX_BACKOFF_MAX_SECONDS)
+from .date_ranges import resolve_date_range
+from .email_summarizer import message_context, summarize_message, summarize_thread
+from .gemini import LazyModel
+from .gmail_batch import MAX_BATCH_REQUESTS, METADATA_HEADERS, iter_messages
+from .gmail_cache import credential_cache, get_gmail_service
+from .mailbox_index import email_summary, mailbox_indexes, message_entry
+from .outbox import Outbox
 
 # Define the Gmail API scope
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly',
           'https://www.googleapis.com/auth/gmail.send']
 
-# Initialize Gemini API
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel("gemini-1.5-flash")
+# Gemini model, created on first use
+model = LazyModel("gemini-1.5-flash")
 
 
 def construct_gmail_credentials(access_token, client_id, client_secret, scopes):
@@ -37,7 +45,7 @@ def construct_gmail_credentials(access_token, client_id, client_secret, scopes):
             client_secret=client_secret,
             scopes=scopes,
         )
-        creds.expiry = datetime.datetime.fromtimestamp(int(token_info["exp"]))
+        creds.expiry = datetime.datetime.utcfromtimestamp(int(token_info["exp"]))
         return {"status": "success", "creds": creds}
 
     return {"status": "error", "message": "Invalid access token."}
@@ -51,6 +59,9 @@ def authenticate_gmail(token=None):
 
     # Check for access_token in payload to dynamically construct credentials
     if token:
+        creds = credential_cache.get(token)
+
+    if token and creds is None:
         access_token = token
         creds_response = construct_gmail_credentials(
             access_token,
@@ -60,6 +71,7 @@ def authenticate_gmail(token=None):
         )
         if creds_response["status"] == "success":
             creds = creds_response["creds"]
+            credential_cache.put(token, creds)
         else:
             return creds_response
 
@@ -73,79 +85,216 @@ def authenticate_gmail(token=None):
     return creds
 
 
-def fetch_emails(service, max_results=5):
+def date_range_query(date_range, today=None):
+    """
+    Converts a spoken date range ("today", "this week", "last month", "last 7 days", ...) into Gmail after:/before:
+    search operators. Returns None for ranges it does not know.
+    """
+    resolved = resolve_date_range(date_range, today)
+    if resolved is None:
+        return None
+    start, end = resolved
+    # before: is exclusive, like the end of the resolved range
+    return f"after:{start:%Y/%m/%d} before:{end:%Y/%m/%d}"
+
+
+def build_gmail_query(payload):
+    """Builds a Gmail search query from the fetch payload's query, sender, subject and date_range fields."""
+    terms = []
+    if payload.get("query"):
+        terms.append(payload["query"].strip())
+    if payload.get("sender"):
+        terms.append(f"from:{payload['sender'].strip()}")
+    if payload.get("subject"):
+        terms.append(f'subject:"{payload["subject"].strip()}"')
+    if payload.get("date_range"):
+        date_query = date_range_query(payload["date_range"])
+        if date_query:
+            terms.append(date_query)
+    return " ".join(terms) or None
+
+
+def fetch_emails(service, max_results=5, query=None):
     """
-    Fetches the most recent emails from the user's inbox.
+    Fetches the most recent emails from the user's inbox, optionally only those matching a Gmail search query.
+    Results are paged and hydrated lazily, so only max_results messages are ever downloaded however many match.
     Returns a list of email data dictionaries.
     """
     try:
-        results = service.users().messages().list(userId='me', maxResults=max_results).execute()
-        messages = results.get('messages', [])
-        if not messages:
-            return []
-
-        emails = []
-        for msg in messages:
-            message = service.users().messages().get(userId='me', id=msg['id']).execute()
-            headers = {header['name']: header['value'] for header in message['payload']['headers']}
-            email_data = {
-                "id": message['id'],
-                "from": headers.get("From", "Unknown Sender"),
-                "to": headers.get("To", "Unknown Receiver"),
-                "subject": headers.get("Subject", "No Subject"),
-                "snippet": message['snippet']
-            }
-            emails.append(email_data)
-        return emails
+        return [email_summary(message_entry(message))
+                for message in iter_messages(service, query=query, limit=max_results)]
     except HttpError as error:
         return {"error": str(error)}
 
 
-def send_email(service, to_email, subject, message_text):
+def _fetch_limit(payload):
+    try:
+        limit = int(payload.get("limit") or EMAIL_FETCH_DEFAULT_RESULTS)
+    except (TypeError, ValueError):
+        limit = EMAIL_FETCH_DEFAULT_RESULTS
+    return max(1, min(limit, EMAIL_FETCH_MAX_RESULTS))
+
+
+def fetch_inbox(service, token, payload):
+    """
+    Serves a fetch command. Plain listings and sender/subject lookups come from the local mailbox index; when the
+    index may not reach back far enough, or the command has a date range or raw query, Gmail is searched instead.
+    """
+    limit = _fetch_limit(payload)
+    query = build_gmail_query(payload)
+
+    index = None if payload.get("query") or payload.get("date_range") else get_synced_index(service, token)
+    if index is None:
+        return fetch_emails(service, limit, query)
+
+    emails = [email_summary(entry) for entry in index.recent(limit, payload.get("sender"), payload.get("subject"))]
+    # The index only holds the newest messages; older matches come from a server-side search
+    if len(emails) < limit and not index.holds_whole_inbox():
+        older = fetch_emails(service, limit, query)
+        if isinstance(older, list):
+            seen = {email["id"] for email in emails}
+            emails.extend([email for email in older if email["id"] not in seen][:limit - len(emails)])
+    return emails
+
+
+def _raw_message(to_email, subject, message_text):
+    message = MIMEText(message_text)
+    message['To'] = to_email
+    message['Subject'] = subject
+    return {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()}
+
+
+def queue_email(account, to_email, subject, message_text):
+    """
+    Puts an email in the outbox and returns at once; the outbox sender delivers it in the background.
+    """
+    if not to_email:
+        return {"error": "A recipient is required to send an email."}
+    outbox_id = email_outbox.enqueue(account, "send", to_email, subject, message_text)
+    return {"message": "Email queued for delivery", "outbox_id": outbox_id, "delivery": "queued"}
+
+
+def queue_reply(account, email_id):
     """
-    Sends an email with the specified recipient, subject, and body.
+    Puts a reply to an email in the outbox; the reply is written and sent by the outbox sender.
     """
+    if not email_id:
+        return {"error": "An email ID is required to reply."}
+    outbox_id = email_outbox.enqueue(account, "reply", reply_to_id=email_id)
+    return {"message": "Reply queued for delivery", "outbox_id": outbox_id, "delivery": "queued"}
+
+
+def outbox_status(account, outbox_id=None):
+    """
+    Reports the delivery state of one queued email, or of the account's latest ones.
+    """
+    if outbox_id in (None, ""):
+        return {"outbox": email_outbox.recent(account)}
     try:
-        message = MIMEText(message_text)
-        message['To'] = to_email
-        message['Subject'] = subject
-        raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
-        send_message = {'raw': raw_message}
-        sent_message = service.users().messages().send(userId='me', body=send_message).execute()
-        return {"message": "Message sent", "id": sent_message['id']}
-    except HttpError as error:
-        return {"error": str(error)}
+        status = email_outbox.status(int(outbox_id), account)
+    except (TypeError, ValueError):
+        status = None
+    if status is None:
+        return {"error": f"No queued email with ID {outbox_id}."}
+    return {"outbox": [status]}
 
 
-def summarize_email(service, email_id):
+def _get_message_entry(service, email_id, index=None):
+    """Headers and snippet of a message, from the mailbox index when it has the message."""
+    entry = index.get(email_id) if index is not None else None
+    if entry is None:
+        message = service.users().messages().get(userId='me', id=email_id, format='metadata',
+                                                 metadataHeaders=METADATA_HEADERS).execute()
+        entry = message_entry(message)
+    return entry
+
+
+def summarize_email(service, email_id, index=None, whole_thread=False):
     """
-    Summarizes the content of an email by its ID using Gemini.
-    Returns the summary text.
+    Summarizes the full content of an email, or of its whole thread, by its ID using Gemini.
+    Long bodies are summarized in chunks and the partial summaries combined.
+    Returns the summary text. Message summaries are cached in the mailbox index when one is given.
     """
     try:
-        message = service.users().messages().get(userId='me', id=email_id).execute()
-        snippet = message.get('snippet', '')
-        summary = model.generate_content(f"Summarize this email: {snippet}")
-        return {"summary": summary.text}
+        if whole_thread:
+            thread_id = _get_message_entry(service, email_id, index)['thread_id'] or email_id
+            return {"summary": summarize_thread(service, thread_id)}
+
+        if index is not None and index.get_summary(email_id) is not None:
+            return {"summary": index.get_summary(email_id)}
+        summary = summarize_message(service, email_id)
+        if index is not None:
+            index.store_summary(email_id, summary)
+        return {"summary": summary}
     except HttpError as error:
         return {"error": str(error)}
 
 
-def send_email_with_generated_response(service, email_id):
+def compose_reply(service, email_id, index=None):
+    """
+    Writes a reply to an email using Gemini, from the full body or from its summary when the body is long.
+    Returns (to_email, subject, message_text).
+    """
+    entry = _get_message_entry(service, email_id, index)
+    response = model.generate_content(f"Reply to this email: {message_context(service, email_id)}")
+    return entry["from"], "Re: " + entry["subject"], response.text
+
+
+def deliver_outbox_messages(account, messages):
     """
-    Generates and sends a response to an email using Gemini.
-    Returns the status of the sent email.
+    Outbox delivery callback: writes any pending replies, then sends every message of the account in one Gmail
+    batch request. Returns {outbox_id: ("sent", gmail_id) or ("error", reason)}.
     """
+    token = email_outbox.token(account)
+    creds = authenticate_gmail(token) if token else "auth_required"
+    if not isinstance(creds, Credentials):
+        return {message["id"]: ("error", "Gmail authorization required.") for message in messages}
+    service = get_gmail_service(token, creds)
     try:
-        message = service.users().messages().get(userId='me', id=email_id).execute()
-        snippet = message.get('snippet', '')
-        response = model.generate_content(f"Reply to this email: {snippet}")
-        headers = {header['name']: header['value'] for header in message['payload']['headers']}
-        sender_email = headers.get("From", "Unknown")
-        subject = "Re: " + headers.get("Subject", "No Subject")
-        return send_email(service, sender_email, subject, response.text)
+        account = mailbox_indexes.address(service, token)
     except HttpError as error:
-        return {"error": str(error)}
+        return {message["id"]: ("error", str(error)) for message in messages}
+    # Lets the outbox sender deliver this account's queued emails
+    email_outbox.register_token(account, token, creds.expiry)
+
+    results = {}
+    ready = []
+    for message in messages:
+        if message["body"] is None:
+            try:
+                content = compose_reply(service, message["reply_to_id"], mailbox_indexes.get(service, token))
+            except Exception as e:
+                results[message["id"]] = ("error", f"Could not write the reply: {e}")
+                continue
+            email_outbox.set_content(message["id"], *content)
+            message = dict(message, to_email=content[0], subject=content[1], body=content[2])
+        ready.append(message)
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            results[int(request_id)] = ("error", str(exception))
+        else:
+            results[int(request_id)] = ("sent", response['id'])
+
+    for start in range(0, len(ready), MAX_BATCH_REQUESTS):
+        batch = service.new_batch_http_request(callback=collect)
+        for message in ready[start:start + MAX_BATCH_REQUESTS]:
+            batch.add(service.users().messages().send(
+                userId='me', body=_raw_message(message["to_email"], message["subject"], message["body"])),
+                request_id=str(message["id"]))
+        batch.execute()
+    return results
+
+
+def get_synced_index(service, token):
+    """Returns the user's mailbox index brought up to date, or None if Gmail could not be reached for it."""
+    try:
+        index = mailbox_indexes.get(service, token)
+        index.sync(service)
+        return index
+    except HttpError as error:
+        print(f"Mailbox index sync failed: {error}")
+        return None
 
 
 def email_voice_interaction(data, token=None):
@@ -158,33 +307,59 @@ def email_voice_interaction(data, token=None):
     if creds == "auth_required":
         return {"status": "auth_required"}
 
-    service = build('gmail', 'v1', credentials=creds)
+    service = get_gmail_service(token, creds)
+    try:
+        account = mailbox_indexes.address(service, token)
+    except HttpError as error:
+        return {"error": str(error)}
+    # Lets the outbox sender deliver this account's queued emails
+    email_outbox.register_token(account, token, creds.expiry)
 
     command = data.get("command", "")
     payload = data.get("payload", {})
 
     if "fetch" in command:
-        emails = fetch_emails(service, 10)
-        response = {"emails": emails}
+        response = {"emails": fetch_inbox(service, token, payload)}
 
     elif "send" in command:
         to_email = payload.get("to_email", "").strip()
         subject = payload.get("subject", "").strip()
         message_text = payload.get("message_text", "").strip()
-        send_result = send_email(service, to_email, subject, message_text)
-        response = send_result
+        response = queue_email(account, to_email, subject, message_text)
 
     elif "summarize" in command:
         email_id = payload.get("email_id", "").strip()
-        summary = summarize_email(service, email_id)
+        summary = summarize_email(service, email_id, get_synced_index(service, token), bool(payload.get("thread")))
         response = summary
 
     elif "reply" in command:
         email_id = payload.get("email_id", "").strip()
-        send_result = send_email_with_generated_response(service, email_id)
-        response = send_result
+        response = queue_reply(account, email_id)
+
+    elif "status" in command:
+        response = outbox_status(account, payload.get("outbox_id"))
 
     else:
         response = {"error": "Command not recognized. Please try again."}
 
     return response
+
+
+email_outbox = Outbox(
+    OUTBOX_PATH,
+    deliver=deliver_outbox_messages,
+    batch_size=OUTBOX_BATCH_SIZE,
+    max_attempts=OUTBOX_MAX_ATTEMPTS,
+    poll_interval=OUTBOX_POLL_SECONDS,
+    backoff_base=OUTBOX_BACKOFF_BASE_SECONDS,
+    backoff_max=OUTBOX_BACKOFF_MAX_SECONDS,
+)
+atexit.register(email_outbox.stop)
+
+
+async def email_voice_interaction_async(data, token=None):
+    """
+    Async variant of email_voice_interaction.
+    The Gmail and Gemini clients are synchronous, so the call runs on the shared blocking I/O pool.
+    """
+    return await run_blocking(email_voice_interaction, data, token)
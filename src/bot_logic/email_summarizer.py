@@ -0,0 +1,139 @@
+import base64
+import html
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import EMAIL_SUMMARY_CHUNK_CHARS, EMAIL_SUMMARY_MAX_CHARS, EMAIL_SUMMARY_WORKERS
+from .gemini import LazyModel
+
+# Gemini model, created on first use
+model = LazyModel("gemini-1.5-flash")
+
+MAP_PROMPT = "Summarize this part of an email conversation. Keep names, dates, requests and decisions:\n\n{text}"
+REDUCE_PROMPT = "Combine these partial summaries of one email conversation into a single concise summary:\n\n{text}"
+
+TAG = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+
+summary_executor = ThreadPoolExecutor(max_workers=EMAIL_SUMMARY_WORKERS, thread_name_prefix="email-summary")
+
+
+def _decode(data):
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4)).decode("utf-8", errors="replace")
+
+
+def _html_to_text(markup):
+    return " ".join(html.unescape(TAG.sub(" ", markup)).split())
+
+
+def _text_parts(part):
+    """
+    Yields the text parts of a MIME tree in reading order. Attachments are skipped, and of the alternatives in a
+    multipart/alternative only the plain text one is kept when there is one.
+    """
+    mime_type = part.get('mimeType', '')
+    children = part.get('parts', [])
+    if mime_type == 'multipart/alternative' and children:
+        plain = [child for child in children if child.get('mimeType') == 'text/plain']
+        yield from _text_parts(plain[0] if plain else children[-1])
+    elif children:
+        for child in children:
+            yield from _text_parts(child)
+    elif mime_type in ('text/plain', 'text/html') and not part.get('filename'):
+        yield part
+
+
+def iter_message_text(service, message):
+    """
+    Yields the decoded text of a message fetched in full format, one MIME part at a time. Parts too large to be
+    inlined by Gmail are downloaded on demand, so nothing beyond the text parts is ever decoded.
+    """
+    headers = {header['name']: header['value'] for header in message.get('payload', {}).get('headers', [])}
+    yield f"From: {headers.get('From', 'Unknown Sender')}\nSubject: {headers.get('Subject', 'No Subject')}\n"
+    for part in _text_parts(message.get('payload', {})):
+        body = part.get('body', {})
+        data = body.get('data')
+        if data is None and body.get('attachmentId'):
+            data = service.users().messages().attachments().get(
+                userId='me', messageId=message['id'], id=body['attachmentId']).execute().get('data')
+        if not data:
+            continue
+        text = _decode(data)
+        yield _html_to_text(text) if part.get('mimeType') == 'text/html' else text
+
+
+def iter_thread_text(service, thread_id):
+    """Yields the text of every message in a thread, fetching the messages one at a time."""
+    thread = service.users().threads().get(userId='me', id=thread_id, format='minimal').execute()
+    for message_ref in thread.get('messages', []):
+        message = service.users().messages().get(userId='me', id=message_ref['id'], format='full').execute()
+        yield from iter_message_text(service, message)
+
+
+def iter_chunks(pieces, chunk_chars=6000, max_chars=60000):
+    """
+    Regroups a stream of text pieces into chunks of at most chunk_chars characters, cut at whitespace where
+    possible. Stops after max_chars characters in total, so memory and token use stay bounded.
+    """
+    buffer = ""
+    total = 0
+    for piece in pieces:
+        piece = piece[:max_chars - total]
+        total += len(piece)
+        buffer += piece if not buffer else "\n" + piece
+        while len(buffer) >= chunk_chars:
+            cut = buffer.rfind(" ", chunk_chars // 2, chunk_chars)
+            cut = cut if cut > 0 else chunk_chars
+            yield buffer[:cut]
+            buffer = buffer[cut:].lstrip()
+        if total >= max_chars:
+            break
+    if buffer.strip():
+        yield buffer
+
+
+def _generate(prompt):
+    return model.generate_content(prompt).text.strip()
+
+
+def map_reduce_summary(pieces, chunk_chars=EMAIL_SUMMARY_CHUNK_CHARS, max_chars=EMAIL_SUMMARY_MAX_CHARS):
+    """
+    Summarizes a stream of text pieces: each chunk is summarized concurrently on the bounded summary pool, then
+    the partial summaries are combined, in groups that fit a chunk, until one summary is left.
+    """
+    chunks = list(iter_chunks(pieces, chunk_chars, max_chars))
+    if not chunks:
+        return ""
+    if len(chunks) == 1:
+        return _generate(MAP_PROMPT.format(text=chunks[0]))
+
+    summaries = list(summary_executor.map(lambda chunk: _generate(MAP_PROMPT.format(text=chunk)), chunks))
+    while len(summaries) > 1:
+        groups = list(iter_chunks(summaries, chunk_chars, max_chars))
+        if len(groups) == 1:
+            return _generate(REDUCE_PROMPT.format(text=groups[0]))
+        summaries = list(summary_executor.map(lambda group: _generate(REDUCE_PROMPT.format(text=group)), groups))
+    return summaries[0]
+
+
+def summarize_message(service, email_id):
+    """Summarizes the full body of one message."""
+    message = service.users().messages().get(userId='me', id=email_id, format='full').execute()
+    return map_reduce_summary(iter_message_text(service, message))
+
+
+def summarize_thread(service, thread_id):
+    """Summarizes every message of a thread."""
+    return map_reduce_summary(iter_thread_text(service, thread_id))
+
+
+def message_context(service, email_id, max_chars=EMAIL_SUMMARY_CHUNK_CHARS):
+    """
+    The text a reply is written from: the message itself when it fits in one chunk, otherwise its summary.
+    """
+    message = service.users().messages().get(userId='me', id=email_id, format='full').execute()
+    chunks = iter_chunks(iter_message_text(service, message), max_chars, EMAIL_SUMMARY_MAX_CHARS)
+    first = next(chunks, "")
+    second = next(chunks, None)
+    if second is None:
+        return first
+    return map_reduce_summary([first, second, *chunks])
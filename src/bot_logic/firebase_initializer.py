@@ -1,16 +1,41 @@
+import threading
+
 import firebase_admin
 from firebase_admin import credentials, firestore
 
 from .config import PROJECT_ID, FIREBASE_PRIVATE_KEY, FIREBASE_CLIENT_EMAIL, TOKEN_URI
 
-# Initialize Firebase
-cred = credentials.Certificate({
-    "type": "service_account",
-    "project_id": PROJECT_ID,
-    "private_key": FIREBASE_PRIVATE_KEY,
-    "client_email": FIREBASE_CLIENT_EMAIL,
-    "token_uri": TOKEN_URI
-})
-firebase_admin.initialize_app(cred)
-
-db = firestore.client()
+_client = None
+_lock = threading.Lock()
+
+
+def get_db():
+    """
+    Returns the Firestore client, initializing Firebase on first use instead of at import time.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                # Initialize Firebase
+                cred = credentials.Certificate({
+                    "type": "service_account",
+                    "project_id": PROJECT_ID,
+                    "private_key": FIREBASE_PRIVATE_KEY,
+                    "client_email": FIREBASE_CLIENT_EMAIL,
+                    "token_uri": TOKEN_URI
+                })
+                if not firebase_admin._apps:
+                    firebase_admin.initialize_app(cred)
+                _client = firestore.client()
+    return _client
+
+
+class _LazyFirestoreClient:
+    """Stands in for the Firestore client so modules can keep using `db` without initializing it on import."""
+
+    def __getattr__(self, name):
+        return getattr(get_db(), name)
+
+
+db = _LazyFirestoreClient()
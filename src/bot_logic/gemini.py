@@ -0,0 +1,47 @@
+import threading
+
+import google.generativeai as genai
+
+from .config import GEMINI_API_KEY
+
+_configured = False
+_models = {}
+_lock = threading.Lock()
+
+
+def configure_gemini():
+    """Configures the Gemini client once, on first use."""
+    global _configured
+    with _lock:
+        if not _configured:
+            genai.configure(api_key=GEMINI_API_KEY)
+            _configured = True
+
+
+def get_model(model_name):
+    """Returns the shared GenerativeModel for model_name, creating it on first use."""
+    configure_gemini()
+    with _lock:
+        if model_name not in _models:
+            _models[model_name] = genai.GenerativeModel(model_name)
+        return _models[model_name]
+
+
+class LazyModel:
+    """Stands in for a GenerativeModel so modules can keep a module-level `model` without creating it on import."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def __getattr__(self, name):
+        return getattr(get_model(self.model_name), name)
+
+
+def chunk_text(chunk):
+    """
+    The text of a streamed response chunk. Chunks without text parts, such as the final or a safety chunk, give
+    "" where chunk.text would raise ValueError.
+    """
+    if not chunk.candidates:
+        return ""
+    return "".join(part.text for part in chunk.candidates[0].content.parts if part.text)
@@ -0,0 +1,78 @@
+# Only these headers are needed to list emails, so messages are fetched in metadata format
+METADATA_HEADERS = ["From", "To", "Subject"]
+METADATA_FIELDS = "id,threadId,snippet,internalDate,payload/headers"
+
+# Gmail accepts at most 100 calls in one batch request
+MAX_BATCH_REQUESTS = 100
+
+# Gmail caps messages().list pages at 500 IDs
+MAX_PAGE_SIZE = 500
+
+
+def get_messages_metadata(service, message_ids):
+    """
+    Fetches the From/To/Subject headers and snippet of several messages through the Gmail batch endpoint, so
+    up to MAX_BATCH_REQUESTS messages cost one round-trip instead of one each.
+    Returns the messages in the order of message_ids, skipping any that failed.
+    """
+    messages = {}
+    errors = []
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            errors.append(exception)
+        else:
+            messages[request_id] = response
+
+    for start in range(0, len(message_ids), MAX_BATCH_REQUESTS):
+        batch = service.new_batch_http_request(callback=collect)
+        for message_id in message_ids[start:start + MAX_BATCH_REQUESTS]:
+            batch.add(service.users().messages().get(userId='me', id=message_id, format='metadata',
+                                                     metadataHeaders=METADATA_HEADERS,
+                                                     fields=METADATA_FIELDS),
+                      request_id=message_id)
+        batch.execute()
+
+    # A partial result is still useful; only fail if nothing came back
+    if errors and not messages:
+        raise errors[0]
+    return [messages[message_id] for message_id in message_ids if message_id in messages]
+
+
+def iter_message_ids(service, query=None, label_ids=("INBOX",), page_size=100, limit=None):
+    """
+    Yields message IDs matching a Gmail search query, newest first, following nextPageToken one page at a time.
+    Each page asks for no more IDs than are still needed, and nothing more is listed once limit IDs are out.
+    """
+    page_token = None
+    remaining = limit
+    while remaining is None or remaining > 0:
+        page = service.users().messages().list(
+            userId='me', q=query or None, labelIds=list(label_ids) or None, pageToken=page_token,
+            maxResults=min(page_size, MAX_PAGE_SIZE, remaining or MAX_PAGE_SIZE),
+            fields='messages/id,nextPageToken').execute()
+        for message in page.get('messages', []):
+            yield message['id']
+            if remaining is not None:
+                remaining -= 1
+                if remaining == 0:
+                    return
+        page_token = page.get('nextPageToken')
+        if not page_token:
+            return
+
+
+def iter_messages(service, query=None, label_ids=("INBOX",), page_size=100, limit=None, hydrate_size=20):
+    """
+    Yields messages in metadata format for a Gmail search query without loading the whole result set.
+    Headers are fetched lazily, hydrate_size messages per batch request, so a caller that stops iterating early
+    never pays for the messages it did not reach.
+    """
+    pending = []
+    for message_id in iter_message_ids(service, query, label_ids, page_size, limit):
+        pending.append(message_id)
+        if len(pending) >= hydrate_size:
+            yield from get_messages_metadata(service, pending)
+            pending = []
+    if pending:
+        yield from get_messages_metadata(service, pending)
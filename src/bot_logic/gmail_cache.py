@@ -0,0 +1,110 @@
+import datetime
+import hashlib
+import threading
+from collections import OrderedDict
+
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from .config import GMAIL_CREDENTIAL_CACHE_SIZE, GMAIL_SERVICES_PER_THREAD
+
+# Cached entries are dropped this long before the token itself expires
+EXPIRY_MARGIN = datetime.timedelta(seconds=60)
+
+
+def token_key(access_token):
+    """Cache key for an access token, so raw tokens are never kept as dictionary keys."""
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+
+def _expired(creds):
+    return creds.expiry is None or creds.expiry - EXPIRY_MARGIN <= datetime.datetime.utcnow()
+
+
+class CredentialCache:
+    """
+    LRU cache of validated Gmail credentials per access token. An entry lives until its token expires, so a
+    repeat command from the same user skips the tokeninfo round-trip.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+
+    def get(self, access_token):
+        key = token_key(access_token)
+        with self._lock:
+            creds = self._entries.get(key)
+            if creds is not None and _expired(creds):
+                del self._entries[key]
+                creds = None
+            if creds is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return creds
+
+    def put(self, access_token, creds):
+        with self._lock:
+            self._entries[token_key(access_token)] = creds
+            self._entries.move_to_end(token_key(access_token))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+        return stats
+
+
+_discovery_document = None
+_discovery_lock = threading.Lock()
+
+
+def get_discovery_document():
+    """The Gmail v1 discovery document, loaded once from the copy bundled with google-api-python-client."""
+    global _discovery_document
+    with _discovery_lock:
+        if _discovery_document is None:
+            _discovery_document = get_static_doc("gmail", "v1")
+        return _discovery_document
+
+
+def build_gmail_service(creds):
+    document = get_discovery_document()
+    if document is None:
+        return build('gmail', 'v1', credentials=creds)
+    return build_from_document(document, credentials=creds)
+
+
+# Service objects wrap an httplib2 connection, which is not thread-safe, so each thread keeps its own
+_thread_services = threading.local()
+
+
+def get_gmail_service(access_token, creds):
+    """
+    Returns this thread's Gmail service for the token, building it from the cached discovery document the first
+    time. Services are dropped when their token expires and each thread keeps at most GMAIL_SERVICES_PER_THREAD.
+    """
+    services = getattr(_thread_services, "services", None)
+    if services is None:
+        services = _thread_services.services = OrderedDict()
+
+    key = token_key(access_token)
+    service = services.get(key)
+    if service is not None and not _expired(creds):
+        services.move_to_end(key)
+        return service
+
+    service = build_gmail_service(creds)
+    services[key] = service
+    while len(services) > GMAIL_SERVICES_PER_THREAD:
+        services.popitem(last=False)
+    return service
+
+
+credential_cache = CredentialCache(max_entries=GMAIL_CREDENTIAL_CACHE_SIZE)
@@ -0,0 +1,92 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import HISTORY_SUMMARY_MAX_CHARS, HISTORY_COMPACTION_WORKERS
+from .gemini import LazyModel
+from .history_writer import session_ref
+from .prompts import COMPACTION_PROMPT
+
+# Gemini model, created on first use
+model = LazyModel("gemini-1.5-flash")
+
+
+def summary_history(summary):
+    """Returns the rolling summary as a user/model exchange to put in front of the verbatim turns."""
+    if not summary:
+        return []
+    return [
+        {"role": "user", "parts": f"Summary of our earlier conversation: {summary}"},
+        {"role": "model", "parts": "Understood, I will keep that in mind."},
+    ]
+
+
+def build_compaction_prompt(summary, turns, max_chars):
+    lines = []
+    for command, response in turns:
+        lines.append(f"User: {command}")
+        lines.append(f"Samigo: {response}")
+    return COMPACTION_PROMPT.format(max_chars=max_chars, summary=summary or "(empty)", turns="\n".join(lines))
+
+
+def fold_turns(summary, turns, max_chars):
+    """Asks Gemini to fold turns into summary. The result is cut to max_chars so the prompt size stays fixed."""
+    response = model.generate_content(build_compaction_prompt(summary, turns, max_chars))
+    return response.text.strip()[:max_chars]
+
+
+class HistoryCompactor:
+    """
+    Folds the turns that leave a session's verbatim window into the session's rolling summary.
+
+    Compaction runs on a small thread pool so requests never wait on the summarizing call, and at most one
+    compaction per session is in flight. The summary and the sequence number of the last turn it covers are
+    persisted on the session document.
+    """
+
+    def __init__(self, max_summary_chars=2000, max_workers=2):
+        self.max_summary_chars = max_summary_chars
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="history-compactor")
+        self._lock = threading.Lock()
+        self._counters = {"scheduled": 0, "compacted": 0, "failed": 0}
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def schedule(self, session):
+        """Starts compacting the session in the background, unless it has nothing to fold or already is."""
+        work = session.begin_compaction()
+        if work is None:
+            return False
+        self._count("scheduled")
+        self._executor.submit(self._compact, session, *work)
+        return True
+
+    def _compact(self, session, summary, turns):
+        try:
+            new_summary = fold_turns(summary, [(command, response) for _, command, response in turns],
+                                     self.max_summary_chars)
+            summarized_through = turns[-1][0]
+            if summarized_through is not None:
+                session_ref(session.session_id).set(
+                    {"summary": new_summary, "summarized_through": summarized_through}, merge=True)
+        except Exception as e:
+            print(f"History compaction failed for session {session.session_id}: {e}")
+            self._count("failed")
+            session.abort_compaction(turns)
+            return
+
+        self._count("compacted")
+        session.finish_compaction(new_summary)
+        # Turns that left the window while this compaction ran are folded next
+        self.schedule(session)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+
+history_compactor = HistoryCompactor(
+    max_summary_chars=HISTORY_SUMMARY_MAX_CHARS,
+    max_workers=HISTORY_COMPACTION_WORKERS,
+)
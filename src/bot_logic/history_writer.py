@@ -0,0 +1,156 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+
+from .config import HISTORY_QUEUE_SIZE, HISTORY_BATCH_SIZE, HISTORY_FLUSH_INTERVAL_SECONDS, HISTORY_MAX_ATTEMPTS
+from .firebase_initializer import db
+
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_WRITES = 500
+
+# Turn documents are named by zero-padded sequence number so they also sort by name
+TURN_ID_WIDTH = 8
+
+
+def session_ref(session_id):
+    """The session document: turn_count and updated_at, with one document per turn in its turns subcollection."""
+    return db.collection("interaction_history").document(str(session_id))
+
+
+def turn_ref(session_id, seq):
+    return session_ref(session_id).collection("turns").document(str(seq).zfill(TURN_ID_WIDTH))
+
+
+class HistoryWriter:
+    """
+    Write-behind queue for interaction history.
+
+    Messages are queued by the request thread and written by a background thread, which writes each message as
+    its own turn document, updates each session document once per flush and commits everything in batches.
+    Every write is a fixed size, so its cost does not grow with the length of the session. A flush happens when
+    batch_size messages are pending, when flush_interval seconds have passed, and on shutdown. When the queue
+    is full new messages are dropped and counted rather than blocking the request.
+    """
+
+    def __init__(self, max_queue=10000, batch_size=100, flush_interval=1.0, max_attempts=3):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._counters = {"enqueued": 0, "dropped": 0, "written": 0, "failed": 0, "batches": 0}
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, session_id, seq, command, response):
+        """
+        Queues exchange number seq of the session. Returns False if the queue is full and the message was dropped.
+        """
+        message = {"seq": seq, "timestamp": datetime.now(), "command": command, "response": response}
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((str(session_id), message))
+        except queue.Full:
+            self._count("dropped")
+            print(f"History queue is full, dropping message for session {session_id}")
+            return False
+        self._count("enqueued")
+        return True
+
+    def _write(self, pending):
+        """Writes {session_id: [messages]} in as few batches as possible."""
+        writes = []
+        for session_id, messages in pending.items():
+            for message in messages:
+                writes.append((turn_ref(session_id, message["seq"]), message, False))
+            latest = max(messages, key=lambda message: message["seq"])
+            writes.append((session_ref(session_id),
+                           {"turn_count": latest["seq"] + 1, "updated_at": latest["timestamp"]}, True))
+
+        for start in range(0, len(writes), MAX_BATCH_WRITES):
+            batch = db.batch()
+            for ref, data, merge in writes[start:start + MAX_BATCH_WRITES]:
+                batch.set(ref, data, merge=merge)
+            batch.commit()
+            self._count("batches")
+
+    def _flush_pending(self, pending):
+        count = sum(len(messages) for messages in pending.values())
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self._write(pending)
+                self._count("written", count)
+                return
+            except Exception as e:
+                print(f"History write failed (attempt {attempt}/{self.max_attempts}): {e}")
+                time.sleep(min(2 ** attempt * 0.1, 2))
+        self._count("failed", count)
+
+    def _run(self):
+        pending = {}
+        pending_count = 0
+        deadline = None
+
+        while True:
+            # An idle writer still wakes up every interval to notice stop()
+            timeout = self.flush_interval if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                session_id, message = self._queue.get(timeout=timeout)
+                pending.setdefault(session_id, []).append(message)
+                pending_count += 1
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            except queue.Empty:
+                pass
+
+            # While stopping, keep draining until the queue is empty before the final write
+            if pending and (pending_count >= self.batch_size or time.monotonic() >= deadline
+                            or (self._stopping.is_set() and self._queue.empty())):
+                self._flush_pending(pending)
+                for _ in range(pending_count):
+                    self._queue.task_done()
+                pending = {}
+                pending_count = 0
+                deadline = None
+
+            if self._stopping.is_set() and self._queue.empty() and not pending:
+                return
+
+    def flush(self):
+        """Blocks until every message queued so far has been written or given up on."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def stop(self, timeout=10):
+        """Flushes the queue and stops the background thread."""
+        self._stopping.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def stats(self):
+        """Returns queue counters and the current backlog."""
+        with self._lock:
+            stats = dict(self._counters)
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+
+history_writer = HistoryWriter(
+    max_queue=HISTORY_QUEUE_SIZE,
+    batch_size=HISTORY_BATCH_SIZE,
+    flush_interval=HISTORY_FLUSH_INTERVAL_SECONDS,
+    max_attempts=HISTORY_MAX_ATTEMPTS,
+)
+atexit.register(history_writer.stop)
@@ -0,0 +1,71 @@
+import os
+import threading
+
+from firebase_admin import firestore
+
+from .config import ID_BLOCK_SIZE
+from .firebase_initializer import db
+
+
+@firestore.transactional
+def _lease_block(transaction, counter_ref, size):
+    """Advances the counter by size inside a transaction and returns the leased (first, last) IDs."""
+    snapshot = counter_ref.get(transaction=transaction)
+    current_id = snapshot.to_dict().get("count", 0) if snapshot.exists else 0
+    transaction.set(counter_ref, {"count": current_id + size})
+    return current_id + 1, current_id + size
+
+
+class BlockIdAllocator:
+    """
+    Hands out unique numeric IDs from a Firestore counter document in metadata.
+
+    Instead of one read and one write per ID, each process transactionally leases a block of block_size IDs
+    and serves them from memory, so most allocations make no network call. The counter keeps its meaning
+    (the highest ID handed out by any process); IDs left in a block when a process exits are never reused.
+    """
+
+    def __init__(self, counter_name, block_size=100):
+        self.counter_name = counter_name
+        self.block_size = block_size
+        self._next_id = 1
+        self._last_id = 0
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _lease(self, size):
+        counter_ref = db.collection("metadata").document(self.counter_name)
+        return _lease_block(db.transaction(), counter_ref, size)
+
+    def _reset_after_fork(self):
+        # A forked worker must not hand out the IDs its parent already leased
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._next_id, self._last_id = 1, 0
+
+    def next_id(self):
+        """Returns the next unique ID."""
+        with self._lock:
+            self._reset_after_fork()
+            if self._next_id > self._last_id:
+                self._next_id, self._last_id = self._lease(self.block_size)
+            allocated_id = self._next_id
+            self._next_id += 1
+            return allocated_id
+
+    def next_ids(self, count):
+        """Returns count unique IDs, leasing a larger block when the request does not fit in one."""
+        with self._lock:
+            self._reset_after_fork()
+            ids = list(range(self._next_id, min(self._last_id, self._next_id + count - 1) + 1))
+            self._next_id += len(ids)
+            if len(ids) < count:
+                needed = count - len(ids)
+                first_id, last_id = self._lease(max(needed, self.block_size))
+                ids.extend(range(first_id, first_id + needed))
+                self._next_id, self._last_id = first_id + needed, last_id
+            return ids
+
+
+session_id_allocator = BlockIdAllocator("session_counter", block_size=ID_BLOCK_SIZE)
+note_id_allocator = BlockIdAllocator("note_counter", block_size=ID_BLOCK_SIZE)
@@ -0,0 +1,400 @@
+import re
+
+# Quote characters are normalized to plain ASCII quotes before matching
+QUOTE_TRANSLATION = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+# Politeness and wake-word prefixes/suffixes that carry no intent
+FILLER_PREFIX = re.compile(
+    r"^(?:(?:hey |hi |ok |okay )?samigo[,:]?\s+|please,?\s+|(?:can|could|would|will) you(?: please)?\s+|i want you to\s+)",
+    re.IGNORECASE,
+)
+FILLER_SUFFIX = re.compile(r"(?:,?\s+please|,?\s+for me)$", re.IGNORECASE)
+
+NEWS_CATEGORIES = {
+    "business": "business",
+    "entertainment": "entertainment",
+    "general": "general",
+    "health": "health",
+    "science": "science",
+    "sport": "sports",
+    "sports": "sports",
+    "tech": "technology",
+    "technology": "technology",
+}
+
+LANGUAGE_CODES = {
+    "arabic": "ar",
+    "chinese": "zh-cn",
+    "dutch": "nl",
+    "english": "en",
+    "french": "fr",
+    "german": "de",
+    "greek": "el",
+    "hindi": "hi",
+    "italian": "it",
+    "japanese": "ja",
+    "korean": "ko",
+    "polish": "pl",
+    "portuguese": "pt",
+    "russian": "ru",
+    "spanish": "es",
+    "swedish": "sv",
+    "turkish": "tr",
+    "urdu": "ur",
+}
+
+
+def _quoted(name):
+    """Regex fragment for a value wrapped in matching single or double quotes."""
+    return rf"(?P<{name}_q>[\"'])(?P<{name}>.+?)(?P={name}_q)"
+
+
+NEWS_CATEGORY_PATTERN = "|".join(NEWS_CATEGORIES)
+LANGUAGE_PATTERN = "|".join(LANGUAGE_CODES)
+SHOW = r"(?:(?:show|list|get|give|display|find|retrieve|what are)(?: me)? )?"
+OWNER = r"(?:all )?(?:(?:my|the|of my) )?"
+NUMBER_REF = r"(?:#|no\.? |number |id |with (?:the )?id )?"
+
+WEATHER = re.compile(
+    r"(?:(?:show|tell|give|get|check)(?: me)? |what(?:'s| is) |how(?:'s| is) )?(?:the )?"
+    r"(?:current |latest |today's )?weather(?: forecast| like| report)?"
+    r"(?: (?:in|for|at) (?P<location>[^\d\"'].*?))?"
+    r"(?: (?:today|tomorrow|now|right now|this (?:morning|afternoon|evening|week)))?",
+    re.IGNORECASE,
+)
+NEWS = re.compile(
+    r"(?:(?:show|tell|give|get|fetch|read)(?: me)? |what(?:'s| is| are) )?(?:the )?"
+    r"(?:(?:top|latest|today's|recent) )*(?:(?:\d+|five|ten) )?"
+    rf"(?:(?P<category>{NEWS_CATEGORY_PATTERN}) )?(?:news headlines|headlines|news)"
+    rf"(?: (?:in|on|about|for) (?:the )?(?P<category_after>{NEWS_CATEGORY_PATTERN})(?: category| news)?)?"
+    r"(?: today)?",
+    re.IGNORECASE,
+)
+
+EMAIL_FETCH = re.compile(
+    r"(?:(?:fetch|get|show|check|read|list|open)(?: me)? (?:(?:all|my|the) )*(?:(?:latest|recent|new|unread) )?"
+    r"(?:e-?mails|inbox|mail|messages)(?: (?:from|in) (?:my )?inbox)?"
+    r"|do i have (?:any )?(?:new )?e-?mails)",
+    re.IGNORECASE,
+)
+EMAIL_DATE_RANGE = r"today|yesterday|(?:this|last) (?:week|month)|this year|last \d+ days"
+EMAIL_FETCH_FILTERED = re.compile(
+    r"(?:(?:fetch|get|show|check|read|list|find)(?: me)? )?(?:(?:all|any|my|the) )*"
+    r"(?:(?:last|latest|recent|new|unread) )?(?:(?P<limit>\d+) )?(?:(?:latest|recent|new|unread) )?"
+    r"(?:e-?mails|mail|messages)"
+    r"(?: from (?!(?:my |the )?inbox\b)(?P<sender>[\w.@+-]+))?"
+    rf"(?: (?:received |sent )?(?:from )?(?P<date_range>{EMAIL_DATE_RANGE}))?"
+    r"(?: (?:about|with (?:the )?subject) (?P<subject>.+?))?"
+    rf"(?: (?:from )?(?P<date_range_after>{EMAIL_DATE_RANGE}))?",
+    re.IGNORECASE,
+)
+EMAIL_ID = r"(?P<email_id>(?=[\w-]*\d)[\w-]+)"
+EMAIL_SUMMARIZE = re.compile(
+    rf"summari[sz]e (?:the |my |this )?e-?mail {NUMBER_REF}{EMAIL_ID}",
+    re.IGNORECASE,
+)
+EMAIL_REPLY = re.compile(
+    rf"(?:reply|respond) to (?:the |this )?e-?mail {NUMBER_REF}{EMAIL_ID}",
+    re.IGNORECASE,
+)
+EMAIL_STATUS = re.compile(
+    r"(?:(?:check|show|get|what is|what's)(?: me)? )?(?:the )?(?:delivery )?status of (?:my )?(?:queued |sent )?"
+    r"(?:e-?mails?|outbox|replies)(?: (?:with )?(?:outbox )?(?:id |number |#)?(?P<outbox_id>\d+))?"
+    r"|(?:check|show)(?: me)? (?:my )?outbox",
+    re.IGNORECASE,
+)
+EMAIL_SEND = re.compile(
+    r"send (?:an |a )?e-?mail to (?P<to_email>[\w.+-]+@[\w-]+(?:\.[\w-]+)+),?"
+    rf"(?: with)?(?: the)? subject {_quoted('subject')},?"
+    rf"(?: and)?(?: with)?(?: the)? (?:message|body|text)(?: of)? {_quoted('message_text')}",
+    re.IGNORECASE,
+)
+
+# Deadlines are only split off when they start like a date, so "add task go by the bank" stays whole
+DEADLINE = (
+    r"(?P<deadline>(?:today|tonight|tomorrow|next|this|end of|the end of|\d|"
+    r"(?:mon|tues|wednes|thurs|fri|satur|sun)day|jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[^\"']*)"
+)
+# Without a "by"/"due" in front only a closing relative day counts, so "remind me to call mom tomorrow" splits
+# but "add task plan next week's menu" does not
+WEEKDAY = r"(?:mon|tues|wednes|thurs|fri|satur|sun)day"
+TRAILING_DEADLINE = (
+    r"(?:on )?(?P<trailing_deadline>(?:today|tonight|tomorrow|(?:this |next )?" + WEEKDAY + r"|next (?:week|month)|"
+    r"this (?:weekend|week|month))(?: (?:morning|afternoon|evening|night))?(?: at \d{1,2}(?::\d{2})? ?(?:am|pm)?)?)"
+)
+TASK_ADD = re.compile(
+    r"(?:(?:add|create)(?: a| an)?(?: new)? task(?::| to| called| titled| named)?|remind me to) "
+    rf"(?!with )(?:(?:the )?description )?(?P<description>.+?)"
+    rf"(?:,? (?:and )?(?:by|due(?: by| on)?|before|(?:set )?(?:the )?deadline (?:to|of|is)) {DEADLINE}"
+    rf"|,? {TRAILING_DEADLINE})?",
+    re.IGNORECASE,
+)
+TASK_ADD_DESCRIBED = re.compile(
+    rf"(?:add|create)(?: a| an)?(?: new)? task with (?:the )?description {_quoted('description')}"
+    rf"(?:,? (?:and )?(?:set )?(?:the )?deadline (?:to|of|is|by) {DEADLINE})?",
+    re.IGNORECASE,
+)
+TASK_PRIORITY = re.compile(
+    rf"{SHOW}{OWNER}(?P<priority>high|medium|low)[ -]priority tasks",
+    re.IGNORECASE,
+)
+TASK_CATEGORY = re.compile(
+    rf"{SHOW}{OWNER}(?P<category>work|personal) tasks",
+    re.IGNORECASE,
+)
+TASK_UPCOMING = re.compile(
+    rf"(?:{SHOW}{OWNER}(?:upcoming|pending) tasks|what tasks are due|what(?:'s| is) due)"
+    r"(?: (?:due )?(?:by|before|until) (?P<deadline>.+))?",
+    re.IGNORECASE,
+)
+TASK_DELETE = re.compile(
+    r"(?:delete|remove)(?: the)? task(?: titled| called| named)? (?P<title>.+)",
+    re.IGNORECASE,
+)
+
+NOTE_DATE_RANGE = r"(?: (?:from|in|during) (?P<date_range>today|yesterday|(?:this|last|past) (?:week|month|year)|(?:last|past) \d+ days))?"
+NOTE_ADD = re.compile(
+    rf"(?:add|create|make|take)(?: a| an)?(?: new)? note (?:titled|called|named) {_quoted('title')},?"
+    rf"(?: and| with)*(?: the)? (?:content|text|body)(?: of)? {_quoted('content')}"
+    r"(?:,?(?: and)? (?:tagged(?: as)?|with (?:the )?tags?) (?P<tags>.+))?",
+    re.IGNORECASE,
+)
+NOTE_LIST = re.compile(
+    rf"{SHOW}{OWNER}notes{NOTE_DATE_RANGE}",
+    re.IGNORECASE,
+)
+NOTE_KEYWORD = re.compile(
+    rf"{SHOW}{OWNER}notes (?:about|containing|on|mentioning|with) "
+    rf"(?:{_quoted('quoted_keyword')}|(?P<keyword>[\w-]+)){NOTE_DATE_RANGE}",
+    re.IGNORECASE,
+)
+NOTE_TAG = re.compile(
+    rf"{SHOW}{OWNER}notes (?:tagged(?: as| with)?|with (?:the )?tag) "
+    rf"(?:{_quoted('quoted_tag')}|(?P<tag>[\w-]+)){NOTE_DATE_RANGE}",
+    re.IGNORECASE,
+)
+NOTE_ID = r"(?P<note_id>\d+)"
+NOTE_SIMILAR = re.compile(
+    rf"{SHOW}(?:notes?|anything) (?:like|similar to) (?:(?:the |my )?note {NUMBER_REF}{NOTE_ID}|"
+    rf"(?P<text>(?!(?:the |my )?note \d)(?:{_quoted('quoted_text')}|.+)))",
+    re.IGNORECASE,
+)
+NOTE_SHOW = re.compile(rf"(?:show|open|get|read|display)(?: me)? note {NUMBER_REF}{NOTE_ID}", re.IGNORECASE)
+NOTE_SUMMARIZE = re.compile(rf"summari[sz]e (?:the |my )?note {NUMBER_REF}{NOTE_ID}", re.IGNORECASE)
+NOTE_DELETE = re.compile(rf"(?:delete|remove) (?:the |my )?note {NUMBER_REF}{NOTE_ID}", re.IGNORECASE)
+
+WEB_SUMMARIZE = re.compile(
+    r"summari[sz]e (?:the )?(?:web |google )?search results (?:about|for|on) (?P<query>.+)",
+    re.IGNORECASE,
+)
+WEB_SEARCH = re.compile(
+    r"(?:search|google|look up)(?: the web| online| google| the internet)?(?: for)? "
+    r"(?!(?:my|the) (?:e-?mails?|inbox|notes?|tasks?)\b)(?P<query>.+?)"
+    r"(?P<summarize> and summari[sz]e(?: it| them| the results)?)?",
+    re.IGNORECASE,
+)
+
+# Queries that only point back at earlier conversation; the model has the history to resolve them
+REFERENCE_ONLY = re.compile(
+    r"(?:it|this|that|these|those|them|they|he|him|she|her)(?: one| ones| again| up)?|the same(?: thing)?",
+    re.IGNORECASE,
+)
+
+TRANSLATE_QUOTED = re.compile(
+    rf"translate {_quoted('text')}(?: (?:in)?to (?P<language>[\w-]+))?",
+    re.IGNORECASE,
+)
+TRANSLATE_PLAIN = re.compile(
+    rf"(?:translate (?P<text>.+?)|how do (?:you|i) say (?P<say_text>.+?)) (?:in|into|to) (?P<language>{LANGUAGE_PATTERN})",
+    re.IGNORECASE,
+)
+
+
+def normalize_command(raw_command):
+    """
+    Strips fillers and trailing punctuation that do not change the intent of a command.
+
+    Parameters:
+        raw_command (str): The command as typed or transcribed.
+
+    Returns:
+        str: The command reduced to its meaningful part, with the original casing.
+    """
+    command = " ".join(raw_command.translate(QUOTE_TRANSLATION).split())
+    previous = None
+    while command != previous:
+        previous = command
+        command = FILLER_PREFIX.sub("", command)
+        command = FILLER_SUFFIX.sub("", command)
+        command = command.rstrip(" .!?")
+    return command
+
+
+def _unquote(value):
+    value = value.strip()
+    if len(value) > 1 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1].strip()
+    return value
+
+
+def _refers_back(value):
+    return REFERENCE_ONLY.fullmatch(value) is not None
+
+
+def _language_code(language):
+    language = language.lower()
+    if language in LANGUAGE_CODES:
+        return LANGUAGE_CODES[language]
+    if language in LANGUAGE_CODES.values():
+        return language
+    return None
+
+
+def _parsed(module, command, payload=None):
+    return {"module": module, "command": command, "payload": payload or {}}
+
+
+def _weather(match):
+    location = match.group("location")
+    return _parsed("weather", "weather", {"location": location.strip()} if location else {})
+
+
+def _news(match):
+    category = match.group("category") or match.group("category_after")
+    return _parsed("news", "news", {"category": NEWS_CATEGORIES[category.lower()]} if category else {})
+
+
+def _email_send(match):
+    return _parsed("email", "send", {
+        "to_email": match.group("to_email"),
+        "subject": match.group("subject"),
+        "message_text": match.group("message_text"),
+    })
+
+
+def _email_fetch_filtered(match):
+    payload = {}
+    if match.group("sender"):
+        payload["sender"] = match.group("sender")
+    if match.group("subject"):
+        payload["subject"] = _unquote(match.group("subject"))
+    date_range = match.group("date_range") or match.group("date_range_after")
+    if date_range:
+        payload["date_range"] = date_range.lower()
+    if match.group("limit"):
+        payload["limit"] = int(match.group("limit"))
+    return _parsed("email", "fetch", payload) if payload else None
+
+
+def _task_add(match):
+    payload = {"description": _unquote(match.group("description"))}
+    deadline = match.group("deadline") or match.groupdict().get("trailing_deadline")
+    if deadline:
+        payload["deadline"] = deadline.strip()
+    return _parsed("task", "add", payload)
+
+
+def _task_upcoming(match):
+    deadline = match.group("deadline")
+    return _parsed("task", "upcoming", {"deadline": deadline.strip()} if deadline else {})
+
+
+def _note_add(match):
+    payload = {"title": match.group("title"), "content": match.group("content")}
+    if match.group("tags"):
+        tags = re.split(r",\s*|\s+and\s+", match.group("tags"))
+        payload["tags"] = [_unquote(tag) for tag in tags if _unquote(tag)]
+    return _parsed("note", "add", payload)
+
+
+def _note_retrieve(match, **payload):
+    date_range = match.groupdict().get("date_range")
+    if date_range:
+        payload["date_range"] = date_range.lower()
+    return _parsed("note", "retrieve", payload)
+
+
+def _note_similar(match):
+    if match.group("note_id"):
+        return _parsed("note", "similar", {"note_id": int(match.group("note_id"))})
+    text = match.group("quoted_text") or match.group("text")
+    if _refers_back(text):
+        return None
+    return _parsed("note", "similar", {"text": text})
+
+
+def _web_search(match, summarize=False):
+    query = _unquote(match.group("query"))
+    if _refers_back(query):
+        return None
+    if summarize or match.groupdict().get("summarize"):
+        return _parsed("web", "summarize", {"query": query, "action": "summarize"})
+    return _parsed("web", "search", {"query": query})
+
+
+def _translate(match):
+    target_language = "en"
+    if match.group("language"):
+        target_language = _language_code(match.group("language"))
+        if target_language is None:
+            return None
+    text = _unquote(match.groupdict().get("say_text") or match.group("text"))
+    if _refers_back(text):
+        return None
+    return _parsed("translate", "translate", {"text": text, "target_language": target_language})
+
+
+# Ordered (pattern, builder) rules; more specific shapes come before the general ones they overlap with
+RULES = [
+    (EMAIL_SEND, _email_send),
+    (EMAIL_STATUS, lambda m: _parsed("email", "status",
+                                     {"outbox_id": int(m.group("outbox_id"))} if m.group("outbox_id") else {})),
+    (EMAIL_SUMMARIZE, lambda m: _parsed("email", "summarize", {"email_id": m.group("email_id")})),
+    (EMAIL_REPLY, lambda m: _parsed("email", "reply", {"email_id": m.group("email_id")})),
+    (EMAIL_FETCH, lambda m: _parsed("email", "fetch")),
+    (EMAIL_FETCH_FILTERED, _email_fetch_filtered),
+    (NOTE_ADD, _note_add),
+    (NOTE_SUMMARIZE, lambda m: _parsed("note", "summarize", {"note_id": int(m.group("note_id"))})),
+    (NOTE_DELETE, lambda m: _parsed("note", "delete", {"note_id": int(m.group("note_id"))})),
+    (NOTE_SIMILAR, _note_similar),
+    (NOTE_SHOW, lambda m: _note_retrieve(m, note_id=int(m.group("note_id")))),
+    (NOTE_KEYWORD, lambda m: _note_retrieve(m, keyword=m.group("quoted_keyword") or m.group("keyword"))),
+    (NOTE_TAG, lambda m: _note_retrieve(m, tag=m.group("quoted_tag") or m.group("tag"))),
+    (NOTE_LIST, _note_retrieve),
+    (TASK_PRIORITY, lambda m: _parsed("task", "priority", {"priority": m.group("priority").lower()})),
+    (TASK_CATEGORY, lambda m: _parsed("task", "category", {"category": m.group("category").lower()})),
+    (TASK_UPCOMING, _task_upcoming),
+    (TASK_DELETE, lambda m: _parsed("task", "delete", {"title": _unquote(m.group("title"))})),
+    (TASK_ADD_DESCRIBED, _task_add),
+    (TASK_ADD, _task_add),
+    (WEATHER, _weather),
+    (NEWS, _news),
+    (WEB_SUMMARIZE, lambda m: _web_search(m, summarize=True)),
+    (TRANSLATE_QUOTED, _translate),
+    (TRANSLATE_PLAIN, _translate),
+    (WEB_SEARCH, _web_search),
+]
+
+
+def route_command(raw_command):
+    """
+    Parses the unambiguous, high-frequency command shapes without calling the language model.
+
+    Parameters:
+        raw_command (str): The command received by the /command endpoint.
+
+    Returns:
+        dict: A parsed command in the same {"module", "command", "payload"} shape the Gemini parser
+        produces, or None when no rule matches confidently and the model should decide.
+    """
+    command = normalize_command(raw_command)
+    if not command:
+        return None
+
+    for pattern, build in RULES:
+        match = pattern.fullmatch(command)
+        if match:
+            parsed_command = build(match)
+            if parsed_command is not None:
+                return parsed_command
+    return None
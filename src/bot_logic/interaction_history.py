@@ -1,73 +1,159 @@
+import threading
 from datetime import datetime
 
-import google.generativeai as genai
 from firebase_admin import firestore
 
-from .config import GEMINI_API_KEY
 # Initialize Firestore
 from .firebase_initializer import db
+from .config import HISTORY_VERBATIM_TURNS
+from .gemini import get_model
+from .history_writer import history_writer, session_ref, turn_ref
+from .id_allocator import session_id_allocator
 
-# Configure GEMINI API
-genai.configure(api_key=GEMINI_API_KEY)
+_legacy_session_id = None
+_legacy_checked = False
+_legacy_lock = threading.Lock()
 
 
 # Function to get and increment session ID
 def get_next_session_id():
     """
-    Retrieve and increment the session ID from a dedicated counter document in Firestore.
+    Allocate a session ID from the block of IDs this process leased from the session counter in Firestore.
     """
-    counter_ref = db.collection("metadata").document("session_counter")
-    counter_doc = counter_ref.get()
-    current_id = counter_doc.to_dict().get("count", 0) if counter_doc.exists else 0
-    next_id = current_id + 1
-    counter_ref.set({"count": next_id})  # Update the counter in Firestore
-    return next_id  # Use plain numeric ID
+    return session_id_allocator.next_id()  # Use plain numeric ID
 
 
-# Retrieve Latest Session's History by ID
-def get_last_session_history():
+# Retrieve the most recent turns of a session, newest first in Firestore and oldest first in the result
+def get_session_turns(session_id, limit=20, before=None):
     """
-    Retrieve the chat history from the latest session in Firestore.
+    Reads at most limit turns of a session, most recent first, from its turns subcollection.
+
+    Parameters:
+        session_id: The session to read.
+        limit (int): Maximum number of turns to read.
+        before (int): Cursor from a previous call; only turns with a lower sequence number are read.
+
+    Returns:
+        tuple: (turns in chronological order, cursor for the next older page or None when there are no more).
     """
-    # Fetch the latest session document by ordering by ID in descending order
-    sessions = db.collection("interaction_history").order_by("__name__", direction=firestore.Query.DESCENDING).limit(
-        1).stream()
-    history = []
+    query = session_ref(session_id).collection("turns").order_by("seq", direction=firestore.Query.DESCENDING)
+    if before is not None:
+        query = query.where("seq", "<", before)
+    turns = [turn.to_dict() for turn in query.limit(limit).stream()]
+    turns.reverse()
+
+    cursor = turns[0]["seq"] if len(turns) == limit and turns[0]["seq"] > 0 else None
+    return turns, cursor
+
 
-    # Get messages from the latest session
-    for session in sessions:
-        messages = session.to_dict().get("messages", [])
-        for message in messages:
-            if "command" in message and "response" in message:
-                history.append({"role": "user", "parts": message["command"]})
-                history.append({"role": "model", "parts":  message["response"] if not(isinstance(message["response"], list)) else "returned dictionary of notes or tasks" })
+# The latest session of each client, so a new session can pick the conversation up where it left off
+def client_ref(client_key):
+    return db.collection("interaction_clients").document(client_key)
+
+
+# Find the latest session written before sessions had a turns subcollection
+def latest_legacy_session_id():
+    """
+    Legacy session documents keep every message in one "messages" array and have no turn_count. The latest of
+    them is looked up once per deployment and remembered in metadata/history_migration.
+    """
+    global _legacy_session_id, _legacy_checked
+    with _legacy_lock:
+        if not _legacy_checked:
+            meta_ref = db.collection("metadata").document("history_migration")
+            meta = meta_ref.get()
+            if meta.exists:
+                _legacy_session_id = meta.to_dict().get("legacy_session_id")
+            else:
+                legacy_ids = [int(session.id) for session in
+                              db.collection("interaction_history").select(["turn_count"]).stream()
+                              if session.id.isdigit() and "turn_count" not in (session.to_dict() or {})]
+                _legacy_session_id = max(legacy_ids, default=None)
+                meta_ref.set({"legacy_session_id": _legacy_session_id})
+            _legacy_checked = True
+        return _legacy_session_id
+
+
+# Retrieve the latest turns of the client's previous session
+def load_client_history(client_key, limit=HISTORY_VERBATIM_TURNS, include_legacy=False):
+    """
+    Reads the rolling summary and the most recent turns of the client's previous session, the turns with the
+    turns cursor reader. A client that has no session yet starts with an empty history; with include_legacy it
+    continues the latest legacy session instead. Once its new session is saved the client has a session of its
+    own, so the legacy session is read only once.
 
-    return history
+    Returns:
+        tuple: (summary, (command, response) pairs in chronological order that the summary does not cover).
+    """
+    client = client_ref(client_key).get()
+    if client.exists:
+        session_id = client.to_dict()["session_id"]
+        session_data = session_ref(session_id).get().to_dict() or {}
+        turns, _ = get_session_turns(session_id, limit)
+        # Turns already folded into the summary are not repeated
+        summarized_through = session_data.get("summarized_through", -1)
+        turns = [turn for turn in turns if turn.get("seq", 0) > summarized_through]
+        summary = session_data.get("summary", "")
+    elif include_legacy:
+        legacy_session_id = latest_legacy_session_id()
+        if legacy_session_id is None:
+            return "", []
+        turns = (session_ref(legacy_session_id).get().to_dict() or {}).get("messages", [])[-limit:]
+        summary = ""
+    else:
+        return "", []
+    turns = [(turn["command"], turn["response"]) for turn in turns if "command" in turn and "response" in turn]
+    return summary, turns
+
+
+# Save the start of a session: the client's latest session and what it was seeded with
+def save_session_start(session_id, client_key, summary, seeded_turns):
+    """
+    Writes the client mapping, the carried-over summary and the seeded turns in one batch, so the new session
+    holds the conversation on its own and the next restart resumes from it.
+    """
+    now = datetime.now()
+    batch = db.batch()
+    batch.set(client_ref(client_key), {"session_id": session_id, "updated_at": now})
+    for seq, command, response in seeded_turns:
+        batch.set(turn_ref(session_id, seq),
+                  {"seq": seq, "timestamp": now, "command": command, "response": response})
+    session_data = {"updated_at": now}
+    if seeded_turns:
+        session_data["turn_count"] = seeded_turns[-1][0] + 1
+    if summary:
+        # None of the seeded turns is in the summary yet
+        session_data.update({"summary": summary, "summarized_through": -1})
+    if len(session_data) > 1:
+        batch.set(session_ref(session_id), session_data, merge=True)
+    batch.commit()
 
 
 # GEMINI Interaction with History
 def initialize_chat_with_gemini(history):
-    model = genai.GenerativeModel("gemini-1.5-flash")
-    chat = model.start_chat(history=history)
+    chat = get_model("gemini-1.5-flash").start_chat(history=history)
     return chat
 
 
-# Save or Append to Continuous Chat in Firestore
-def save_to_chat(session_id: int, command: str, response: str):
-    chat_ref = db.collection("interaction_history").document(str(session_id))  # Use numeric ID as string
-    new_message = {"timestamp": datetime.now(), "command": command, "response": response}
-    chat_ref.set({"messages": firestore.ArrayUnion([new_message])}, merge=True)
-
-
 # Main Interaction Function
-def handle_user_command(session_id: int, command: str, response ,chat):
-    save_to_chat(session_id, command, response)
+def handle_user_command(session, command: str, response):
+    # Persisted in the background so the request does not wait on Firestore
+    seq = session.next_seq()
+    history_writer.enqueue(session.session_id, seq, command, response)
+    session.add_turn(command, response, seq)
     return response
 
 
-def interaction_history():
-    # Initialize chat history
-    session_id = get_next_session_id()
-    history = get_last_session_history()
-    chat = initialize_chat_with_gemini(history)
-    return session_id, chat
+# Function to answer a conversational message with the session's chat, which knows the earlier conversation
+def conversational_reply(session, command, parsed_reply):
+    """
+    Returns the session chat's reply to a message that selected no module. The parser's own reply is used when
+    the session has no history to add, or if the chat call fails.
+    """
+    if not session.has_history():
+        return parsed_reply
+    try:
+        return session.chat.send_message(command).text.strip()
+    except Exception as e:
+        print(f"Chat reply failed, using the parsed reply: {e}")
+        return parsed_reply
@@ -0,0 +1,230 @@
+import threading
+import time
+from collections import OrderedDict
+
+from googleapiclient.errors import HttpError
+
+from .config import MAILBOX_INDEX_MAX_MESSAGES, MAILBOX_INDEX_MAX_USERS, MAILBOX_SYNC_INTERVAL_SECONDS
+from .gmail_batch import MAX_PAGE_SIZE, get_messages_metadata, iter_message_ids
+from .gmail_cache import token_key
+
+
+def message_entry(message):
+    """Index entry for a Gmail message fetched in metadata format."""
+    headers = {header['name']: header['value'] for header in message.get('payload', {}).get('headers', [])}
+    return {
+        "id": message['id'],
+        "thread_id": message.get('threadId'),
+        "from": headers.get("From", "Unknown Sender"),
+        "to": headers.get("To", "Unknown Receiver"),
+        "subject": headers.get("Subject", "No Subject"),
+        "snippet": message.get('snippet', ''),
+        "internal_date": int(message.get('internalDate', 0)),
+    }
+
+
+def email_summary(entry):
+    """The fields of an index entry that are returned to the client."""
+    return {key: entry[key] for key in ("id", "from", "to", "subject", "snippet")}
+
+
+class MailboxIndex:
+    """
+    Local index of one user's inbox: headers, snippets, thread IDs and cached summaries of the newest
+    max_messages messages.
+
+    The first sync lists the inbox once; after that only the changes since the stored historyId are fetched
+    from Gmail's history feed. If Gmail no longer has that history (HTTP 404), the index is rebuilt.
+    """
+
+    def __init__(self, max_messages=500, sync_interval=15):
+        self.max_messages = max_messages
+        self.sync_interval = sync_interval
+        self.history_id = None
+        self._entries = {}
+        self._summaries = {}
+        self._last_sync = None
+        self._lock = threading.Lock()
+        # Serializes syncs; the Gmail calls of a sync are made holding only this lock
+        self._sync_lock = threading.Lock()
+        self._counters = {"full_syncs": 0, "incremental_syncs": 0, "added": 0, "removed": 0}
+
+    def sync(self, service, force=False):
+        """
+        Brings the index up to date. New messages are hydrated with the same batched metadata requests as
+        fetch_emails. Syncs within sync_interval seconds of the previous one are skipped unless force is set.
+        Gmail is called without holding the index lock, so reads are not held up by a sync in progress.
+        """
+        with self._sync_lock:
+            if not force and self._last_sync is not None and time.monotonic() - self._last_sync < self.sync_interval:
+                return
+            if self.history_id is None:
+                self._full_sync(service)
+            else:
+                try:
+                    self._incremental_sync(service)
+                except HttpError as error:
+                    if getattr(getattr(error, "resp", None), "status", None) != 404:
+                        raise
+                    self._full_sync(service)
+            self._last_sync = time.monotonic()
+
+    def _full_sync(self, service):
+        # Read the historyId first so changes made while listing are replayed by the next incremental sync
+        history_id = service.users().getProfile(userId='me').execute()['historyId']
+        message_ids = list(iter_message_ids(service, page_size=MAX_PAGE_SIZE, limit=self.max_messages))
+        messages = get_messages_metadata(service, message_ids)
+        with self._lock:
+            self._entries = {}
+            self._add(messages)
+            self._summaries = {key: value for key, value in self._summaries.items() if key in self._entries}
+            self.history_id = history_id
+            self._counters["full_syncs"] += 1
+
+    def _incremental_sync(self, service):
+        added = set()
+        removed = set()
+        page_token = None
+        history_id = self.history_id
+        while True:
+            # Not filtered by label: archived and deleted messages no longer carry INBOX
+            page = service.users().history().list(
+                userId='me', startHistoryId=self.history_id, pageToken=page_token,
+                maxResults=MAX_PAGE_SIZE,
+                historyTypes=['messageAdded', 'messageDeleted', 'labelAdded', 'labelRemoved']).execute()
+            for record in page.get('history', []):
+                for change in record.get('messagesAdded', []):
+                    if 'INBOX' in change['message'].get('labelIds', []):
+                        added.add(change['message']['id'])
+                        removed.discard(change['message']['id'])
+                for change in record.get('labelsAdded', []):
+                    if 'INBOX' in change.get('labelIds', []):
+                        added.add(change['message']['id'])
+                        removed.discard(change['message']['id'])
+                for change in record.get('messagesDeleted', []) + [
+                        change for change in record.get('labelsRemoved', []) if 'INBOX' in change.get('labelIds', [])]:
+                    removed.add(change['message']['id'])
+                    added.discard(change['message']['id'])
+            history_id = page.get('historyId', history_id)
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                break
+
+        with self._lock:
+            for message_id in removed:
+                if self._entries.pop(message_id, None) is not None:
+                    self._counters["removed"] += 1
+                self._summaries.pop(message_id, None)
+            new_ids = [message_id for message_id in added if message_id not in self._entries]
+        # Only syncs change the entries and they run one at a time, so new_ids stays valid while unlocked
+        messages = get_messages_metadata(service, new_ids) if new_ids else []
+        with self._lock:
+            self._add(messages)
+            self.history_id = history_id
+            self._counters["incremental_syncs"] += 1
+
+    def _add(self, messages):
+        for message in messages:
+            entry = message_entry(message)
+            self._entries[entry["id"]] = entry
+            self._counters["added"] += 1
+
+        # Keep only the newest max_messages messages
+        if len(self._entries) > self.max_messages:
+            newest = sorted(self._entries.values(), key=lambda entry: entry["internal_date"], reverse=True)
+            self._entries = {entry["id"]: entry for entry in newest[:self.max_messages]}
+
+    def recent(self, limit=10, sender=None, subject=None):
+        """
+        Returns up to limit messages, newest first, optionally only those whose From or Subject header contains
+        sender or subject (case-insensitive).
+        """
+        sender = sender.lower() if sender else None
+        subject = subject.lower() if subject else None
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda entry: entry["internal_date"], reverse=True)
+        matches = []
+        for entry in entries:
+            if sender and sender not in entry["from"].lower():
+                continue
+            if subject and subject not in entry["subject"].lower():
+                continue
+            matches.append(entry)
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def holds_whole_inbox(self):
+        """True when the inbox is smaller than the index, so a local miss is a real miss."""
+        with self._lock:
+            return len(self._entries) < self.max_messages
+
+    def get(self, message_id):
+        with self._lock:
+            return self._entries.get(message_id)
+
+    def get_summary(self, message_id):
+        with self._lock:
+            return self._summaries.get(message_id)
+
+    def store_summary(self, message_id, summary):
+        with self._lock:
+            if message_id in self._entries:
+                self._summaries[message_id] = summary
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["messages"] = len(self._entries)
+            stats["summaries"] = len(self._summaries)
+        return stats
+
+
+class MailboxIndexRegistry:
+    """
+    Keeps one MailboxIndex per Gmail address for at most max_users users, least recently used first out.
+    Access tokens are mapped to addresses once, since a user's token changes every hour but the address does not.
+    """
+
+    def __init__(self, max_users=100, max_messages=500, sync_interval=15):
+        self.max_users = max_users
+        self.max_messages = max_messages
+        self.sync_interval = sync_interval
+        self._indexes = OrderedDict()
+        self._addresses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def address(self, service, access_token):
+        """The Gmail address behind an access token, looked up once per token."""
+        key = token_key(access_token) if access_token else None
+        with self._lock:
+            address = self._addresses.get(key) if key else None
+            if address is not None:
+                self._addresses.move_to_end(key)
+        if address is None:
+            address = service.users().getProfile(userId='me').execute()['emailAddress']
+            if key:
+                with self._lock:
+                    self._addresses[key] = address
+                    while len(self._addresses) > self.max_users * 4:
+                        self._addresses.popitem(last=False)
+        return address
+
+    def get(self, service, access_token):
+        """Returns the index of the mailbox behind service, creating an empty one on first use."""
+        address = self.address(service, access_token)
+        with self._lock:
+            index = self._indexes.get(address)
+            if index is None:
+                index = self._indexes[address] = MailboxIndex(self.max_messages, self.sync_interval)
+            self._indexes.move_to_end(address)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+            return index
+
+
+mailbox_indexes = MailboxIndexRegistry(
+    max_users=MAILBOX_INDEX_MAX_USERS,
+    max_messages=MAILBOX_INDEX_MAX_MESSAGES,
+    sync_interval=MAILBOX_SYNC_INTERVAL_SECONDS,
+)
@@ -0,0 +1,122 @@
+import threading
+from datetime import timedelta
+
+from firebase_admin import firestore
+
+from .firebase_initializer import db
+
+# Bucket documents hold the IDs of the notes written on one day or in one ISO week
+BUCKET_COLLECTION = "note_buckets"
+META_DOCUMENT = "_meta"
+
+# Firestore rejects batches with more than 500 writes; every note touches two buckets
+BACKFILL_NOTES_PER_BATCH = 250
+
+_backfilled = False
+_backfill_lock = threading.Lock()
+
+
+def wall_time(timestamp):
+    """
+    Notes are stored with naive local timestamps, which Firestore hands back as UTC. Dropping the zone recovers
+    the wall-clock time the note was bucketed by.
+    """
+    return timestamp.replace(tzinfo=None) if getattr(timestamp, "tzinfo", None) else timestamp
+
+
+def day_bucket(timestamp):
+    return f"day-{timestamp:%Y-%m-%d}"
+
+
+def week_bucket(timestamp):
+    year, week, _ = timestamp.isocalendar()
+    return f"week-{year}-W{week:02d}"
+
+
+def _bucket_refs(timestamp):
+    timestamp = wall_time(timestamp)
+    collection = db.collection(BUCKET_COLLECTION)
+    return [collection.document(day_bucket(timestamp)), collection.document(week_bucket(timestamp))]
+
+
+def add_to_buckets(batch, note_id, timestamp):
+    """Adds the note's bucket updates to a write batch, so they commit together with the note."""
+    for ref in _bucket_refs(timestamp):
+        batch.set(ref, {"note_ids": firestore.ArrayUnion([note_id])}, merge=True)
+
+
+def add_many_to_buckets(batch, notes):
+    """
+    Adds the bucket updates of many (note_id, timestamp) pairs to a write batch, one write per bucket.
+    Returns the number of writes added.
+    """
+    buckets = {}
+    for note_id, timestamp in notes:
+        for ref in _bucket_refs(timestamp):
+            buckets.setdefault(ref.id, (ref, []))[1].append(note_id)
+    for ref, note_ids in buckets.values():
+        batch.set(ref, {"note_ids": firestore.ArrayUnion(note_ids)}, merge=True)
+    return len(buckets)
+
+
+def remove_from_buckets(batch, note_id, timestamp):
+    for ref in _bucket_refs(timestamp):
+        batch.set(ref, {"note_ids": firestore.ArrayRemove([note_id])}, merge=True)
+
+
+def covering_buckets(start, end):
+    """
+    The fewest bucket IDs that cover the days of [start, end): whole ISO weeks inside the range use their week
+    bucket and the remaining days their day buckets.
+    """
+    day = start.date()
+    last_day = (end - timedelta(microseconds=1)).date()
+    buckets = []
+    while day <= last_day:
+        if day.weekday() == 0 and day + timedelta(days=6) <= last_day:
+            buckets.append(week_bucket(day))
+            day += timedelta(days=7)
+        else:
+            buckets.append(day_bucket(day))
+            day += timedelta(days=1)
+    return buckets
+
+
+def backfill_buckets():
+    """
+    Adds every existing note to its buckets, once per deployment. Notes written afterwards are bucketed as they
+    are added.
+    """
+    global _backfilled
+    with _backfill_lock:
+        if _backfilled:
+            return
+        meta_ref = db.collection(BUCKET_COLLECTION).document(META_DOCUMENT)
+        if not (meta_ref.get().to_dict() or {}).get("backfilled"):
+            batch = db.batch()
+            pending = 0
+            for note in db.collection("notes").select(["note_id", "timestamp"]).stream():
+                note_data = note.to_dict()
+                if note_data.get("timestamp") is None:
+                    continue
+                add_to_buckets(batch, note_data.get("note_id"), note_data["timestamp"])
+                pending += 1
+                if pending == BACKFILL_NOTES_PER_BATCH:
+                    batch.commit()
+                    batch = db.batch()
+                    pending = 0
+            batch.set(meta_ref, {"backfilled": True}, merge=True)
+            batch.commit()
+        _backfilled = True
+
+
+def note_ids_in_range(start, end):
+    """Returns the IDs of the notes bucketed in the days of [start, end), reading only the covering buckets."""
+    backfill_buckets()
+    collection = db.collection(BUCKET_COLLECTION)
+    refs = [collection.document(bucket) for bucket in covering_buckets(start, end)]
+    note_ids = set()
+    for bucket in db.get_all(refs):
+        if bucket.exists:
+            note_ids.update(bucket.to_dict().get("note_ids", []))
+    return note_ids
@@ -0,0 +1,179 @@
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from .config import NOTE_INDEX_PATH
+
+TOKEN = re.compile(r"[^\W_]+")
+
+# Words too common to say anything about which note is meant
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "my", "of", "on", "or",
+    "that", "the", "this", "to", "was", "with",
+}
+
+# A term in the title counts as much as this many occurrences in the content
+TITLE_WEIGHT = 2.0
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    return [token for token in TOKEN.findall((text or "").casefold()) if token not in STOPWORDS]
+
+
+def _term_weights(title, content):
+    weights = Counter()
+    for token in tokenize(content):
+        weights[token] += 1.0
+    for token in tokenize(title):
+        weights[token] += TITLE_WEIGHT
+    return weights
+
+
+class NoteSearchIndex:
+    """
+    Inverted index of note titles and content in a local SQLite file, ranked with BM25.
+
+    add_note, edit_note and delete_note keep it current, so a keyword query only reads the postings of its terms
+    instead of scanning every note. An empty index is filled once from the notes collection on first use.
+    The file is local to the host, so notes written or deleted by other processes are applied by sync, which
+    reads the changes made since the time stored with the index.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._bootstrap_lock = threading.Lock()
+        self._bootstrapped = False
+        self._sync_lock = threading.Lock()
+        self._last_sync = None
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS docs (note_id TEXT PRIMARY KEY, length REAL NOT NULL)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, note_id TEXT NOT NULL, weight REAL NOT NULL, "
+                "PRIMARY KEY (term, note_id)) WITHOUT ROWID"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS postings_note ON postings (note_id)")
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._local.connection = connection
+        return connection
+
+    def _write(self, connection, note_id, title, content):
+        connection.execute("DELETE FROM postings WHERE note_id = ?", (note_id,))
+        weights = _term_weights(title, content)
+        connection.executemany("INSERT INTO postings (term, note_id, weight) VALUES (?, ?, ?)",
+                               [(term, note_id, weight) for term, weight in weights.items()])
+        connection.execute("INSERT OR REPLACE INTO docs (note_id, length) VALUES (?, ?)",
+                           (note_id, sum(weights.values())))
+
+    def add(self, note_id, title, content):
+        """Indexes a note, replacing whatever was indexed for it before."""
+        connection = self._connection()
+        with connection:
+            self._write(connection, str(note_id), title, content)
+
+    def add_many(self, notes):
+        """Indexes an iterable of note dictionaries in one transaction."""
+        connection = self._connection()
+        with connection:
+            for note in notes:
+                self._write(connection, str(note.get("note_id")), note.get("title"), note.get("content"))
+
+    def remove(self, note_id):
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM postings WHERE note_id = ?", (str(note_id),))
+            connection.execute("DELETE FROM docs WHERE note_id = ?", (str(note_id),))
+
+    def bootstrap(self, notes, synced_through=None):
+        """
+        Fills the index from an iterable of note dictionaries unless it has been filled before. synced_through
+        is a time before the notes were read, from which sync picks up later changes.
+        """
+        with self._bootstrap_lock:
+            if self._bootstrapped:
+                return
+            connection = self._connection()
+            if connection.execute("SELECT 1 FROM meta WHERE key = 'bootstrapped'").fetchone() is None:
+                with connection:
+                    for note in notes:
+                        self._write(connection, str(note.get("note_id")), note.get("title"), note.get("content"))
+                    connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('bootstrapped', '1')")
+                    if synced_through is not None:
+                        self._set_synced_through(connection, synced_through)
+            self._bootstrapped = True
+
+    def _set_synced_through(self, connection, synced_through):
+        connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('synced_through', ?)",
+                           (synced_through.isoformat(),))
+
+    def synced_through(self):
+        """The time from which changes by other processes are still to be read, or None if all of them are."""
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'synced_through'").fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def sync(self, read_changes, interval=0):
+        """
+        Applies the notes written and deleted since synced_through. read_changes(since) returns (note
+        dictionaries, deleted note IDs, time from which the next read should start). Syncs within interval seconds
+        of the previous one are skipped.
+        """
+        with self._sync_lock:
+            if self._last_sync is not None and time.monotonic() - self._last_sync < interval:
+                return
+            notes, deleted_ids, synced_through = read_changes(self.synced_through())
+            connection = self._connection()
+            with connection:
+                for note in notes:
+                    self._write(connection, str(note.get("note_id")), note.get("title"), note.get("content"))
+                for note_id in deleted_ids:
+                    connection.execute("DELETE FROM postings WHERE note_id = ?", (str(note_id),))
+                    connection.execute("DELETE FROM docs WHERE note_id = ?", (str(note_id),))
+                self._set_synced_through(connection, synced_through)
+            self._last_sync = time.monotonic()
+
+    def search(self, query, limit=20, candidates=None):
+        """
+        Returns up to limit (note_id, score) pairs for the notes containing any term of query, best first.
+        If candidates is given, only those note IDs are ranked.
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+
+        connection = self._connection()
+        count, total_length = connection.execute("SELECT COUNT(*), TOTAL(length) FROM docs").fetchone()
+        if not count:
+            return []
+        average_length = total_length / count or 1.0
+
+        placeholders = ", ".join("?" for _ in terms)
+        frequencies = dict(connection.execute(
+            f"SELECT term, COUNT(*) FROM postings WHERE term IN ({placeholders}) GROUP BY term", terms).fetchall())
+        rows = connection.execute(
+            f"SELECT postings.term, postings.note_id, postings.weight, docs.length FROM postings "
+            f"JOIN docs ON docs.note_id = postings.note_id WHERE postings.term IN ({placeholders})", terms).fetchall()
+
+        scores = Counter()
+        for term, note_id, weight, length in rows:
+            if candidates is not None and note_id not in candidates:
+                continue
+            frequency = frequencies[term]
+            idf = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            scores[note_id] += idf * weight * (K1 + 1) / (weight + K1 * (1 - B + B * length / average_length))
+        return scores.most_common(limit)
+
+
+note_search_index = NoteSearchIndex(NOTE_INDEX_PATH)
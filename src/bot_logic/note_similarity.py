@@ -0,0 +1,246 @@
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from .config import NOTE_VECTOR_DIMS, NOTE_DUPLICATE_THRESHOLD
+from .note_index import tokenize
+
+# MinHash signature length and its split into LSH bands: 16 bands of 4 rows find pairs above ~0.6 Jaccard
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+
+MERSENNE_PRIME = (1 << 61) - 1
+_random = np.random.RandomState(20240601)
+PERMUTATION_A = _random.randint(1, 1 << 31, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+PERMUTATION_B = _random.randint(0, 1 << 31, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+
+
+def _hash(feature):
+    # crc32 is stable across processes, unlike the salted built-in hash()
+    return zlib.crc32(feature.encode())
+
+
+def _features(title, content):
+    tokens = tokenize(f"{title or ''} {content or ''}")
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+
+def hashed_vector(title, content, dims):
+    """Hashed term-frequency vector of word unigrams and bigrams, with sublinear (log) scaling."""
+    vector = np.zeros(dims, dtype=np.float32)
+    hashes = np.fromiter((_hash(feature) for feature in _features(title, content)), dtype=np.uint32)
+    if hashes.size:
+        np.add.at(vector, (hashes % dims).astype(np.intp), 1.0)
+    return np.log1p(vector)
+
+
+def minhash_signature(content):
+    """MinHash signature of the word 3-gram shingles of a text; equal positions estimate Jaccard similarity."""
+    tokens = tokenize(content)
+    shingles = {" ".join(tokens[i:i + 3]) for i in range(max(len(tokens) - 2, 1))} if tokens else set()
+    if not shingles:
+        return None
+    hashes = np.fromiter((_hash(shingle) for shingle in shingles), dtype=np.uint64)
+    permuted = (np.outer(hashes, PERMUTATION_A) + PERMUTATION_B) % MERSENNE_PRIME
+    return permuted.min(axis=0)
+
+
+class NoteSimilarityIndex:
+    """
+    In-memory similarity engine over notes.
+
+    Each note is a row of a float32 matrix of hashed unigram/bigram counts. Rows are updated in place on add and
+    edit, and tombstoned on delete until enough are dead to be worth compacting. A query is IDF-weighted and
+    scored against every note with one matrix-vector product over its non-zero dimensions. A MinHash signature
+    per note, bucketed by LSH bands, finds near-duplicates without comparing against every note.
+    """
+
+    def __init__(self, dims=512, duplicate_threshold=0.8):
+        self.dims = dims
+        self.duplicate_threshold = duplicate_threshold
+        self._matrix = np.zeros((64, dims), dtype=np.float32)
+        self._alive = np.zeros(64, dtype=bool)
+        self._document_frequency = np.zeros(dims, dtype=np.float32)
+        self._row_ids = []
+        self._rows = {}
+        self._signatures = {}
+        self._buckets = {}
+        self._weighted = None
+        self._bootstrapped = False
+        self._synced_through = None
+        self._last_sync = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes()) for band in range(LSH_BANDS)]
+
+    def _remove_locked(self, note_id):
+        row = self._rows.pop(note_id, None)
+        if row is not None:
+            self._document_frequency -= self._matrix[row] > 0
+            self._alive[row] = False
+            self._weighted = None
+        signature = self._signatures.pop(note_id, None)
+        if signature is not None:
+            for key in self._band_keys(signature):
+                self._buckets.get(key, set()).discard(note_id)
+
+    def _add_locked(self, note_id, title, content):
+        self._remove_locked(note_id)
+        if len(self._row_ids) == self._matrix.shape[0]:
+            dead = len(self._row_ids) - len(self._rows)
+            if dead > len(self._row_ids) // 2:
+                self._compact()
+            else:
+                self._matrix = np.vstack([self._matrix, np.zeros_like(self._matrix)])
+                self._alive = np.concatenate([self._alive, np.zeros_like(self._alive)])
+        row = len(self._row_ids)
+        self._row_ids.append(note_id)
+        self._rows[note_id] = row
+        self._matrix[row] = hashed_vector(title, content, self.dims)
+        self._alive[row] = True
+        self._document_frequency += self._matrix[row] > 0
+        self._weighted = None
+
+        signature = minhash_signature(content)
+        if signature is not None:
+            self._signatures[note_id] = signature
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(note_id)
+
+    def _compact(self):
+        """Drops tombstoned rows."""
+        live = [row for row in range(len(self._row_ids)) if self._alive[row]]
+        capacity = self._matrix.shape[0]
+        matrix = np.zeros((capacity, self.dims), dtype=np.float32)
+        matrix[:len(live)] = self._matrix[live]
+        self._row_ids = [self._row_ids[row] for row in live]
+        self._rows = {note_id: row for row, note_id in enumerate(self._row_ids)}
+        self._matrix = matrix
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._alive[:len(live)] = True
+        self._weighted = None
+
+    def _idf(self):
+        count = max(len(self._rows), 1)
+        return np.log((1 + count) / (1 + self._document_frequency)).astype(np.float32) + 1
+
+    def _weighted_matrix(self):
+        """The IDF-weighted, L2-normalized rows, rebuilt only after the notes changed."""
+        if self._weighted is None:
+            used = len(self._row_ids)
+            weighted = self._matrix[:used] * self._idf()
+            norms = np.linalg.norm(weighted, axis=1)
+            norms[norms == 0] = 1
+            weighted /= norms[:, None]
+            weighted[~self._alive[:used]] = 0
+            # Column-major, so scoring a sparse query only reads the columns of its few non-zero dimensions
+            self._weighted = np.asfortranarray(weighted)
+        return self._weighted
+
+    def add(self, note_id, title, content):
+        with self._lock:
+            self._add_locked(str(note_id), title, content)
+
+    def remove(self, note_id):
+        with self._lock:
+            self._remove_locked(str(note_id))
+
+    def bootstrap(self, notes, synced_through=None):
+        """
+        Loads an iterable of note dictionaries once per process. synced_through is a time before the notes were
+        read, from which sync picks up later changes.
+        """
+        with self._lock:
+            if self._bootstrapped:
+                return
+            for note in notes:
+                self._add_locked(str(note.get("note_id")), note.get("title"), note.get("content"))
+            self._synced_through = synced_through
+            self._bootstrapped = True
+
+    def is_loaded(self):
+        """True once bootstrap has loaded every note, so a query sees the whole collection."""
+        return self._bootstrapped
+
+    def sync(self, read_changes, interval=0):
+        """
+        Applies the notes other processes wrote and deleted since the bootstrap or the previous sync.
+        read_changes(since) returns (note dictionaries, deleted note IDs, time from which the next read should
+        start); it is called without holding the index lock. Syncs within interval seconds of the previous one
+        are skipped.
+        """
+        with self._sync_lock:
+            if self._last_sync is not None and time.monotonic() - self._last_sync < interval:
+                return
+            notes, deleted_ids, synced_through = read_changes(self._synced_through)
+            with self._lock:
+                for note in notes:
+                    self._add_locked(str(note.get("note_id")), note.get("title"), note.get("content"))
+                for note_id in deleted_ids:
+                    self._remove_locked(str(note_id))
+                self._synced_through = synced_through
+            self._last_sync = time.monotonic()
+
+    def _scores(self, query):
+        """Cosine similarity of every note to a normalized query vector."""
+        dimensions = np.flatnonzero(query)
+        return self._weighted_matrix()[:, dimensions] @ query[dimensions]
+
+    def _top(self, scores, limit):
+        limit = min(limit, int(np.count_nonzero(scores > 0)))
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(self._row_ids[row], float(scores[row])) for row in top]
+
+    def similar(self, title="", content="", limit=5):
+        """
+        Returns up to limit (note_id, cosine similarity) pairs for the notes most similar to the given text.
+        """
+        with self._lock:
+            if not self._rows:
+                return []
+            query = hashed_vector(title, content, self.dims) * self._idf()
+            norm = np.linalg.norm(query)
+            if norm == 0:
+                return []
+            return self._top(self._scores(query / norm), limit)
+
+    def similar_to_note(self, note_id, limit=5):
+        """Notes most similar to an indexed note, or None if the note is not indexed."""
+        with self._lock:
+            row = self._rows.get(str(note_id))
+            if row is None:
+                return None
+            scores = self._scores(self._weighted_matrix()[row])
+            scores[row] = 0
+            return self._top(scores, limit)
+
+    def near_duplicates(self, content, exclude=None):
+        """
+        Returns (note_id, estimated Jaccard similarity) for indexed notes whose content nearly matches content,
+        comparing only against notes that share an LSH bucket with it.
+        """
+        signature = minhash_signature(content)
+        if signature is None:
+            return []
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates |= self._buckets.get(key, set())
+            candidates.discard(str(exclude) if exclude is not None else None)
+            matches = []
+            for note_id in candidates:
+                similarity = float(np.mean(self._signatures[note_id] == signature))
+                if similarity >= self.duplicate_threshold:
+                    matches.append((note_id, similarity))
+        return sorted(matches, key=lambda match: -match[1])
+
+
+note_similarity_index = NoteSimilarityIndex(dims=NOTE_VECTOR_DIMS, duplicate_threshold=NOTE_DUPLICATE_THRESHOLD)
@@ -1,23 +1,44 @@
-from datetime import datetime
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
-import google.generativeai as genai
+from firebase_admin import firestore
 
-from .config import GEMINI_API_KEY
+from .async_utils import run_blocking
+from .bulk_transfer import (MAX_BATCH_WRITES, ImportReport, chunked, export_collection, parse_datetime, read_ndjson,
+                            write_chunks)
+from .config import (IMPORT_MAX_PENDING_SUMMARIES, NOTE_INDEX_SYNC_INTERVAL_SECONDS, NOTE_SEARCH_LIMIT,
+                     NOTE_PRESUMMARIZE, NOTE_PRESUMMARIZE_MIN_CHARS)
+from .date_ranges import resolve_date_range
 from .firebase_initializer import db
+from .gemini import LazyModel
+from .id_allocator import note_id_allocator
+from .note_buckets import add_many_to_buckets, add_to_buckets, note_ids_in_range, remove_from_buckets, wall_time
+from .note_index import note_search_index
+from .note_similarity import note_similarity_index
+from .pagination import (DOCUMENT_ID, NOTE_LISTING_FIELDS, id_list_page, project, query_page, resolve_fields,
+                         resolve_page_size)
 
-# Configure Gemini API
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel("gemini-1.5-flash")
+# Gemini model, created on first use
+model = LazyModel("gemini-1.5-flash")
+
+# Background summaries of newly added long notes
+summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="note-summary")
+
+# Bounds the summaries imports leave queued; an import waits for a free slot instead of queueing every note
+import_summary_slots = threading.BoundedSemaphore(IMPORT_MAX_PENDING_SUMMARIES)
+
+# Deleted notes leave a tombstone here, so other processes can drop them from their indexes
+NOTE_TOMBSTONES = "note_tombstones"
+
+# Host clocks may run ahead of Firestore's; changes this close to an index's first load are read again
+INDEX_CLOCK_MARGIN = timedelta(minutes=1)
 
 
 def get_next_note_id():
-    """Retrieve and increment the note ID from a Firestore counter."""
-    counter_ref = db.collection("metadata").document("note_counter")
-    counter_doc = counter_ref.get()
-    current_id = counter_doc.to_dict().get("count", 0) if counter_doc.exists else 0
-    next_id = current_id + 1
-    counter_ref.set({"count": next_id})
-    return next_id
+    """Allocate a note ID from the block of IDs this process leased from the Firestore counter."""
+    return note_id_allocator.next_id()
 
 
 def add_note(title, content, tags=None):
@@ -30,56 +51,268 @@ def add_note(title, content, tags=None):
             "title": title,
             "content": content,
             "timestamp": datetime.now(),
-            "tags": tags or []
+            "tags": tags or [],
+            "updated_at": firestore.SERVER_TIMESTAMP,
         }
-        note_ref.set(note_data)
-        return {"message": "Note added successfully!", "note_id": note_id}
+        # Duplicates are looked for once a similar-note query or the warm-up has loaded the index, so adding a
+        # note never reads the whole collection
+        duplicates = []
+        if note_similarity_index.is_loaded():
+            load_similarity_index()
+            duplicates = note_similarity_index.near_duplicates(content)
+        # The note and its date buckets are written together
+        batch = db.batch()
+        batch.set(note_ref, note_data)
+        add_to_buckets(batch, note_id, note_data["timestamp"])
+        batch.commit()
+        index_note(note_id, title, content)
+        presummarize_note(note_id, content)
+        response = {"message": "Note added successfully!", "note_id": note_id}
+        if duplicates:
+            response["possible_duplicates"] = [{"note_id": duplicate_id, "similarity": round(similarity, 2)}
+                                               for duplicate_id, similarity in duplicates]
+        return response
     except Exception as e:
         return {"error": str(e)}
 
 
-def retrieve_notes(note_id=None, keyword=None, tag=None, date_range=None):
-    """Retrieve notes from Firestore based on criteria."""
+def _stream_indexed_fields():
+    return (note.to_dict() for note in db.collection("notes").select(["note_id", "title", "content"]).stream())
+
+
+def load_similarity_index():
+    """
+    Loads every note into this process's similarity index the first time it is needed, then applies the notes
+    other processes wrote or deleted, at most once every NOTE_INDEX_SYNC_INTERVAL_SECONDS.
+    """
+    note_similarity_index.bootstrap(_stream_indexed_fields(), datetime.now(timezone.utc) - INDEX_CLOCK_MARGIN)
+    try:
+        note_similarity_index.sync(read_note_changes, NOTE_INDEX_SYNC_INTERVAL_SECONDS)
+    except Exception as e:
+        # A stale index still answers; the next query tries again
+        print(f"Failed to sync the similarity index: {e}")
+
+
+def index_note(note_id, title, content):
+    """Updates the local indexes after a write; the note itself is already saved, so failures are only logged."""
+    try:
+        note_search_index.add(note_id, title, content)
+        note_similarity_index.add(note_id, title, content)
+    except Exception as e:
+        print(f"Failed to index note {note_id}: {e}")
+
+
+def _fetch_note_map(note_ids, fields=None):
+    refs = [db.collection("notes").document(str(note_id)) for note_id in note_ids]
+    return {note.id: note.to_dict() for note in db.get_all(refs, field_paths=fields) if note.exists}
+
+
+def fetch_notes(note_ids, fields=None):
+    """
+    Fetches notes by ID in one round-trip, in the order given, skipping any that no longer exist.
+    fields limits the fields read; None reads whole notes.
+    """
+    if not note_ids:
+        return []
+    notes = _fetch_note_map(note_ids, fields)
+    return [notes[str(note_id)] for note_id in note_ids if str(note_id) in notes]
+
+
+def read_note_changes(since):
+    """
+    Reads the notes written and the note IDs deleted at or after since, or all of them when since is None.
+    Returns (note dictionaries, deleted note IDs, time from which the next read should start).
+    """
+    started = datetime.now(timezone.utc) - INDEX_CLOCK_MARGIN
+    notes = db.collection("notes").select(["note_id", "title", "content", "updated_at"])
+    tombstones = db.collection(NOTE_TOMBSTONES)
+    if since is not None:
+        notes = notes.where("updated_at", ">=", since)
+        tombstones = tombstones.where("deleted_at", ">=", since)
+    written = [note.to_dict() for note in notes.stream()]
+    deleted = [tombstone.to_dict() for tombstone in tombstones.stream()]
+    changed_at = [note["updated_at"] for note in written if note.get("updated_at")]
+    changed_at += [tombstone["deleted_at"] for tombstone in deleted if tombstone.get("deleted_at")]
+    return written, [tombstone["note_id"] for tombstone in deleted], max(changed_at, default=since or started)
+
+
+def load_search_index():
+    """
+    Fills the keyword index on first use, then applies the notes other processes wrote or deleted, at most once
+    every NOTE_INDEX_SYNC_INTERVAL_SECONDS.
+    """
+    note_search_index.bootstrap(_stream_indexed_fields(), datetime.now(timezone.utc) - INDEX_CLOCK_MARGIN)
+    try:
+        note_search_index.sync(read_note_changes, NOTE_INDEX_SYNC_INTERVAL_SECONDS)
+    except Exception as e:
+        # A stale index still answers; the next query tries again
+        print(f"Failed to sync the note index: {e}")
+
+
+def matching_note_ids(keyword, candidates=None):
+    """
+    Finds the IDs of the notes matching keyword through the local inverted index, ranked best first.
+    If candidates is given, only those note IDs are considered.
+    """
+    load_search_index()
+    return [note_id for note_id, _ in note_search_index.search(keyword, NOTE_SEARCH_LIMIT, candidates)]
+
+
+def similar_notes(note_id=None, text=None, limit=5):
+    """
+    Finds the notes most similar to a note or to a piece of text, e.g. "notes like my meeting notes".
+    Returns the notes with their cosine similarity, most similar first.
+    """
+    try:
+        load_similarity_index()
+        if note_id:
+            ranked = note_similarity_index.similar_to_note(note_id, limit)
+            if ranked is None:
+                return {"error": "Note not found."}
+        elif text:
+            ranked = note_similarity_index.similar(content=text, limit=limit)
+        else:
+            return {"error": "A note ID or text is required to find similar notes."}
+
+        scores = dict(ranked)
+        notes = fetch_notes([similar_id for similar_id, _ in ranked], NOTE_LISTING_FIELDS)
+        for note in notes:
+            note["similarity"] = round(scores[str(note["note_id"])], 2)
+        return {"notes": notes}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def retrieve_notes(note_id=None, keyword=None, tag=None, date_range=None, page_size=None, cursor=None,
+                   fields=None):
+    """
+    Retrieve notes from Firestore based on criteria, one page at a time.
+    date_range may be a phrase such as "last week" or a (start, end) pair. Dated queries read the day/week
+    buckets of the range and fetch only the notes listed there; keyword and tag filters are applied on top.
+    Listings hold the note IDs, titles, tags and timestamps unless other fields (or "*" for all) are requested,
+    and carry a next_cursor while more notes follow.
+    """
     try:
         query = db.collection("notes")
         if note_id:
             query = query.where("note_id", "==", note_id)
             return {"notes": [note.to_dict() for note in query.stream()]}
 
-        if tag:
-            query = query.where("tags", "array_contains", tag)
+        page_size = resolve_page_size(page_size)
+        fields = resolve_fields(fields, NOTE_LISTING_FIELDS)
+
+        resolved_range = None
         if date_range:
-            start_date, end_date = date_range
-            query = query.where("timestamp", ">=", start_date).where("timestamp", "<=", end_date)
+            resolved_range = resolve_date_range(date_range)
+            if resolved_range is None:
+                return {"error": f"Could not understand the date range '{date_range}'."}
 
-        notes = [note.to_dict() for note in query.stream()]
+        if not keyword and not resolved_range:
+            # Note IDs are leased in per-process blocks, so they do not follow write order across workers
+            order_fields = ["timestamp", DOCUMENT_ID]
+            if tag:
+                query = query.where("tags", "array_contains", tag)
+                # Ordering by timestamp next to array_contains needs a composite index; the document ID does not
+                order_fields = [DOCUMENT_ID]
+            notes, next_cursor = query_page(query, order_fields, page_size, cursor, fields)
+            return _note_page(notes, next_cursor)
 
-        if keyword:
-            notes = [note for note in notes if keyword.lower() in note["content"].lower()]
+        if resolved_range:
+            start, end = resolved_range
+            in_range = note_ids_in_range(start, end)
+            if keyword:
+                # Keyword queries only touch the notes the index matched
+                note_ids = matching_note_ids(keyword, candidates={str(note_id) for note_id in in_range})
+            else:
+                # Note IDs do not follow write order, so the notes of the range are ordered by timestamp, with the
+                # document ID breaking ties
+                written = {found_id: wall_time(note["timestamp"])
+                           for found_id, note in _fetch_note_map(in_range, ["timestamp"]).items()
+                           if note.get("timestamp") is not None}
+                note_ids = sorted(written, key=lambda found_id: (written[found_id], found_id))
+        else:
+            start = end = None
+            note_ids = matching_note_ids(keyword)
 
-        return {"notes": notes}
+        # The filters need the timestamp and tags even when the caller did not ask for them
+        read_fields = None if fields is None else sorted(set(fields) | {"timestamp", "tags"})
+
+        def fetch(page_ids):
+            found = {}
+            for found_id, note in _fetch_note_map(page_ids, read_fields).items():
+                if start is not None and not start <= wall_time(note["timestamp"]) < end:
+                    continue
+                if tag and tag not in note.get("tags", []):
+                    continue
+                found[found_id] = project(note, fields)
+            return found
+
+        notes, next_cursor = id_list_page(note_ids, page_size, cursor, fetch)
+        return _note_page(notes, next_cursor)
     except Exception as e:
         return {"error": str(e)}
 
 
+def _note_page(notes, next_cursor):
+    response = {"notes": notes}
+    if next_cursor:
+        response["next_cursor"] = next_cursor
+    return response
+
+
+def content_hash(content):
+    return hashlib.sha256((content or "").encode()).hexdigest()
+
+
 def summarize_note(note_id):
-    """Summarize the content of a note using Gemini."""
+    """
+    Summarize the content of a note using Gemini.
+    The summary is stored on the note with the hash of the content it was made from, so asking again for an
+    unchanged note is a single Firestore read.
+    """
     try:
-        note = db.collection("notes").document(note_id).get()
+        note_ref = db.collection("notes").document(str(note_id))
+        note = note_ref.get()
         if not note.exists:
             return {"error": "Note not found."}
 
-        content = note.to_dict()["content"]
+        note_data = note.to_dict()
+        content = note_data["content"]
+        summary_hash = content_hash(content)
+        if note_data.get("summary_hash") == summary_hash and note_data.get("summary"):
+            return {"summary": note_data["summary"]}
+
         summary = model.generate_content("Summarize the following text: " + content).text
+        note_ref.update({"summary": summary, "summary_hash": summary_hash})
         return {"summary": summary}
     except Exception as e:
         return {"error": str(e)}
 
 
+def presummarize_note(note_id, content):
+    """Summarizes a newly added long note in the background so the first request finds it cached."""
+    if NOTE_PRESUMMARIZE and len(content or "") >= NOTE_PRESUMMARIZE_MIN_CHARS:
+        summary_executor.submit(summarize_note, note_id)
+
+
 def delete_note(note_id):
     """Delete a note by its ID."""
     try:
-        db.collection("notes").document(note_id).delete()
+        note_ref = db.collection("notes").document(str(note_id))
+        # Bucket entries store the numeric note ID, so it is read back before deleting
+        note = note_ref.get(["note_id", "timestamp"]).to_dict() or {}
+        batch = db.batch()
+        batch.delete(note_ref)
+        batch.set(db.collection(NOTE_TOMBSTONES).document(str(note_id)),
+                  {"note_id": note.get("note_id", note_id), "deleted_at": firestore.SERVER_TIMESTAMP})
+        if note.get("timestamp") is not None:
+            remove_from_buckets(batch, note.get("note_id"), note["timestamp"])
+        batch.commit()
+        try:
+            note_search_index.remove(note_id)
+            note_similarity_index.remove(note_id)
+        except Exception as e:
+            print(f"Failed to remove note {note_id} from the index: {e}")
         return {"message": "Note deleted successfully!"}
     except Exception as e:
         return {"error": str(e)}
@@ -88,29 +321,124 @@ def delete_note(note_id):
 def edit_note(note_id, new_title=None, new_content=None, new_tags=None):
     """Edit a note's title, content, or tags."""
     try:
-        note_ref = db.collection("notes").document(note_id)
+        note_ref = db.collection("notes").document(str(note_id))
         update_data = {}
         if new_title:
             update_data["title"] = new_title
         if new_content:
             update_data["content"] = new_content
+            # The stored summary belongs to the old content
+            update_data["summary"] = firestore.DELETE_FIELD
+            update_data["summary_hash"] = firestore.DELETE_FIELD
         if new_tags is not None:
             update_data["tags"] = new_tags
+        update_data["updated_at"] = firestore.SERVER_TIMESTAMP
 
         note_ref.update(update_data)
+        if new_title or new_content:
+            # Only one of the fields may have changed, so the indexed text is read back from the note
+            note = note_ref.get(["title", "content"]).to_dict()
+            index_note(note_id, note.get("title"), note.get("content"))
         return {"message": "Note updated successfully!"}
     except Exception as e:
         return {"error": str(e)}
 
 
+# Every imported note is one write plus at most two bucket writes
+NOTES_PER_IMPORT_BATCH = MAX_BATCH_WRITES // 3
+
+
+def _imported_note(record):
+    """Builds the document of an imported note, without its ID, or raises ValueError if the record cannot be one."""
+    title, content = record.get("title"), record.get("content")
+    if not isinstance(title, str) or not isinstance(content, str):
+        raise ValueError("A note needs a string title and content.")
+    tags = record.get("tags") or []
+    if not isinstance(tags, list):
+        raise ValueError("Tags must be a list.")
+    note_data = {
+        "title": title,
+        "content": content,
+        "timestamp": parse_datetime(record.get("timestamp")) or datetime.now(),
+        "tags": tags,
+    }
+    # An exported summary is only kept if it was made from this content
+    if record.get("summary") and record.get("summary_hash") == content_hash(content):
+        note_data["summary"], note_data["summary_hash"] = record["summary"], record["summary_hash"]
+    return note_data
+
+
+def queue_import_summary(note_id):
+    """Queues the background summary of an imported note, waiting while the queue is full."""
+    import_summary_slots.acquire()
+    try:
+        future = summary_executor.submit(summarize_note, note_id)
+    except Exception:
+        import_summary_slots.release()
+        raise
+    future.add_done_callback(lambda _: import_summary_slots.release())
+
+
+def import_notes(lines, summarize=False):
+    """
+    Imports notes from an NDJSON stream, one {"title", "content", "tags", "timestamp"} object per line.
+
+    Notes get new IDs, leased from the counter once per batch, and are written with their date buckets in
+    batched writes, several batches at a time. No Gemini call is made per note unless summarize is set, in which
+    case notes without a matching exported summary are summarized in the background, with at most
+    IMPORT_MAX_PENDING_SUMMARIES of them queued at a time.
+    Returns the number of notes imported and failed, with the first errors by line.
+    """
+    report = ImportReport()
+
+    def write_chunk(chunk):
+        notes = []
+        for line, record in chunk:
+            try:
+                notes.append(_imported_note(record))
+            except ValueError as e:
+                report.fail(line, e)
+        if not notes:
+            return 0
+        for note, note_id in zip(notes, note_id_allocator.next_ids(len(notes))):
+            note["note_id"] = note_id
+
+        batch = db.batch()
+        for note in notes:
+            batch.set(db.collection("notes").document(str(note["note_id"])),
+                      dict(note, updated_at=firestore.SERVER_TIMESTAMP))
+        add_many_to_buckets(batch, [(note["note_id"], note["timestamp"]) for note in notes])
+        batch.commit()
+
+        try:
+            note_search_index.add_many(notes)
+            for note in notes:
+                note_similarity_index.add(note["note_id"], note["title"], note["content"])
+        except Exception as e:
+            print(f"Failed to index imported notes: {e}")
+        if summarize:
+            for note in notes:
+                if "summary" not in note:
+                    queue_import_summary(note["note_id"])
+        return len(notes)
+
+    write_chunks(chunked(read_ndjson(lines, report), NOTES_PER_IMPORT_BATCH), write_chunk, report)
+    return report.as_dict()
+
+
+def export_notes():
+    """Yields every note as an NDJSON line, reading the notes page by page."""
+    return export_collection("notes")
+
+
 def note_voice_interaction(data):
     """
     Handle note-related requests.
-    Supports add, retrieve, summarize, delete, and edit actions.
+    Supports add, retrieve, similar, summarize, delete, and edit actions.
 
     Request Format:
         {
-            "action": "add/retrieve/summarize/delete/edit",
+            "action": "add/retrieve/similar/summarize/delete/edit",
             "payload": {
                 // parameters depending on the action
             }
@@ -129,8 +457,14 @@ def note_voice_interaction(data):
             keyword=payload.get("keyword"),
             tag=payload.get("tag"),
             date_range=payload.get("date_range"),
+            page_size=payload.get("page_size"),
+            cursor=payload.get("cursor"),
+            fields=payload.get("fields"),
         )
 
+    elif action == "similar":
+        return similar_notes(note_id=payload.get("note_id"), text=payload.get("text"))
+
     elif action == "summarize":
         return summarize_note(payload.get("note_id"))
 
@@ -147,3 +481,11 @@ def note_voice_interaction(data):
 
     else:
         return {"error": "Invalid action specified."}
+
+
+async def note_voice_interaction_async(data):
+    """
+    Async variant of note_voice_interaction.
+    The Firestore and Gemini clients are synchronous, so the call runs on the shared blocking I/O pool.
+    """
+    return await run_blocking(note_voice_interaction, data)
@@ -0,0 +1,215 @@
+import datetime
+import random
+import sqlite3
+import threading
+import time
+
+# A message claimed by a sender that then died is handed out again after this many seconds
+CLAIM_LEASE_SECONDS = 300
+
+
+class Outbox:
+    """
+    Durable queue of outgoing emails in a SQLite file.
+
+    Commands enqueue a message and return right away. A background thread claims the messages that are due, up
+    to batch_size at a time, and hands them to deliver(account, messages) grouped by account. Failed deliveries
+    are retried with exponential backoff until max_attempts. Claims happen in a write transaction, so several
+    workers can share one file. Access tokens are only kept in memory: a worker only claims messages of accounts
+    it holds a live token for.
+    """
+
+    def __init__(self, path, deliver, batch_size=20, max_attempts=5, poll_interval=1.0,
+                 backoff_base=2.0, backoff_max=300.0):
+        self.path = path
+        self.deliver = deliver
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._tokens = {}
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._local = threading.local()
+        self._counters = {"enqueued": 0, "sent": 0, "retried": 0, "failed": 0, "batches": 0}
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, account TEXT NOT NULL, kind TEXT NOT NULL, "
+                "to_email TEXT, subject TEXT, body TEXT, reply_to_id TEXT, "
+                "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL, "
+                "claimed_at REAL, last_error TEXT, gmail_id TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+            self._local.connection = connection
+        return connection
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="outbox-sender", daemon=True)
+                self._thread.start()
+
+    def register_token(self, account, token, expiry=None):
+        """Remembers the latest access token of an account so its queued messages can be delivered."""
+        with self._lock:
+            self._tokens[account] = (token, expiry)
+        self._ensure_started()
+        self._wake.set()
+
+    def token(self, account):
+        with self._lock:
+            token, _ = self._tokens.get(account, (None, None))
+        return token
+
+    def _live_accounts(self):
+        # Credential expiries are naive UTC datetimes, as in google-auth
+        now = datetime.datetime.utcnow()
+        with self._lock:
+            expired = [account for account, (_, expiry) in self._tokens.items()
+                       if expiry is not None and expiry <= now]
+            for account in expired:
+                del self._tokens[account]
+            return list(self._tokens)
+
+    def enqueue(self, account, kind, to_email=None, subject=None, body=None, reply_to_id=None):
+        """
+        Stores a message for delivery and returns its outbox ID. kind is "send" for a composed message or "reply"
+        for a reply to reply_to_id that is written at delivery time.
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO outbox (account, kind, to_email, subject, body, reply_to_id, status, next_attempt_at, "
+            "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+            (account, kind, to_email, subject, body, reply_to_id, now, now, now),
+        )
+        self._count("enqueued")
+        self._ensure_started()
+        self._wake.set()
+        return cursor.lastrowid
+
+    def set_content(self, outbox_id, to_email, subject, body):
+        """Stores the composed recipient, subject and body of a reply so a retry does not write it again."""
+        self._connection().execute(
+            "UPDATE outbox SET to_email = ?, subject = ?, body = ?, updated_at = ? WHERE id = ?",
+            (to_email, subject, body, time.time(), outbox_id))
+
+    def status(self, outbox_id, account=None):
+        """Returns the delivery state of one message, or None if there is no such message for the account."""
+        row = self._connection().execute(
+            "SELECT id, account, kind, to_email, subject, status, attempts, last_error, gmail_id, created_at, "
+            "updated_at FROM outbox WHERE id = ?", (outbox_id,)).fetchone()
+        if row is None or (account is not None and row["account"] != account):
+            return None
+        status = dict(row)
+        del status["account"]
+        return status
+
+    def recent(self, account, limit=10):
+        """Returns the delivery state of the account's latest messages, newest first."""
+        rows = self._connection().execute(
+            "SELECT id FROM outbox WHERE account = ? ORDER BY id DESC LIMIT ?", (account, limit)).fetchall()
+        return [self.status(row["id"]) for row in rows]
+
+    def _claim(self, accounts):
+        if not accounts:
+            return []
+        now = time.time()
+        connection = self._connection()
+        placeholders = ", ".join("?" for _ in accounts)
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                f"SELECT * FROM outbox WHERE account IN ({placeholders}) AND ("
+                f"(status = 'queued' AND next_attempt_at <= ?) OR (status = 'sending' AND claimed_at <= ?)) "
+                f"ORDER BY next_attempt_at LIMIT ?",
+                (*accounts, now, now - CLAIM_LEASE_SECONDS, self.batch_size)).fetchall()
+            connection.executemany(
+                "UPDATE outbox SET status = 'sending', claimed_at = ?, updated_at = ? WHERE id = ?",
+                [(now, now, row["id"]) for row in rows])
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return [dict(row) for row in rows]
+
+    def _record(self, message, result):
+        """Stores the outcome of one delivery; result is ("sent", gmail_id) or ("error", message)."""
+        now = time.time()
+        outcome, detail = result
+        attempts = message["attempts"] + 1
+        if outcome == "sent":
+            self._connection().execute(
+                "UPDATE outbox SET status = 'sent', attempts = ?, gmail_id = ?, last_error = NULL, updated_at = ? "
+                "WHERE id = ?", (attempts, detail, now, message["id"]))
+            self._count("sent")
+        elif attempts >= self.max_attempts:
+            self._connection().execute(
+                "UPDATE outbox SET status = 'failed', attempts = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                (attempts, detail, now, message["id"]))
+            self._count("failed")
+        else:
+            delay = min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max) * random.uniform(0.8, 1.2)
+            self._connection().execute(
+                "UPDATE outbox SET status = 'queued', attempts = ?, last_error = ?, next_attempt_at = ?, "
+                "updated_at = ? WHERE id = ?", (attempts, detail, now + delay, now, message["id"]))
+            self._count("retried")
+
+    def drain(self):
+        """Delivers one batch of due messages. Returns the number of messages handled."""
+        messages = self._claim(self._live_accounts())
+        if not messages:
+            return 0
+
+        by_account = {}
+        for message in messages:
+            by_account.setdefault(message["account"], []).append(message)
+        for account, account_messages in by_account.items():
+            try:
+                results = self.deliver(account, account_messages)
+            except Exception as e:
+                results = {}
+                print(f"Outbox delivery failed for {len(account_messages)} messages: {e}")
+            for message in account_messages:
+                self._record(message, results.get(message["id"], ("error", "Delivery did not complete.")))
+        self._count("batches")
+        return len(messages)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                # A full batch means more may be due, so keep draining without waiting
+                if self.drain() >= self.batch_size:
+                    continue
+            except Exception as e:
+                print(f"Outbox sender error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def stop(self, timeout=10):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def stats(self):
+        """Returns sender counters and the number of messages in each state."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["accounts"] = len(self._tokens)
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        stats["messages"] = {status: count for status, count in rows}
+        return stats
@@ -0,0 +1,141 @@
+import base64
+import json
+from datetime import datetime
+
+from .config import LIST_PAGE_SIZE, LIST_MAX_PAGE_SIZE
+
+# Field projection of listings: enough to read the items out and to ask for one by ID
+NOTE_LISTING_FIELDS = ["note_id", "title", "tags", "timestamp"]
+TASK_LISTING_FIELDS = ["title", "priority", "category", "deadline"]
+
+# Requesting this field returns whole documents
+ALL_FIELDS = "*"
+
+# Orders query pages by document ID, which needs no composite index next to an equality filter
+DOCUMENT_ID = "__name__"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "$datetime" in value:
+        return datetime.fromisoformat(value["$datetime"])
+    return value
+
+
+def encode_cursor(values):
+    """Packs the position after the last item of a page into an opaque, URL-safe string."""
+    data = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Unpacks a cursor made by encode_cursor. Raises InvalidCursor if it was not."""
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(data)
+    except (TypeError, ValueError) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}")
+    if not isinstance(values, list):
+        raise InvalidCursor("Invalid cursor.")
+    return [_decode_value(value) for value in values]
+
+
+def resolve_page_size(value):
+    """The requested page size, defaulting to LIST_PAGE_SIZE and capped at LIST_MAX_PAGE_SIZE."""
+    try:
+        size = int(value) if value is not None else LIST_PAGE_SIZE
+    except (TypeError, ValueError):
+        size = LIST_PAGE_SIZE
+    return max(1, min(size, LIST_MAX_PAGE_SIZE))
+
+
+def resolve_fields(value, listing_fields):
+    """
+    The fields to return: listing_fields by default, None (whole documents) if "*" is requested,
+    otherwise the requested fields.
+    """
+    if not value:
+        return listing_fields
+    if isinstance(value, str):
+        value = [field.strip() for field in value.split(",")]
+    if ALL_FIELDS in value:
+        return None
+    return [field for field in value if field]
+
+
+def project(item, fields):
+    """Keeps only the given fields of a document dictionary; None keeps them all."""
+    if fields is None:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def query_page(query, order_fields, page_size, cursor=None, fields=None):
+    """
+    Reads one page of a Firestore query.
+
+    Parameters:
+        query: The filtered query, without ordering or limits.
+        order_fields (list): Fields that order the results; together they must be unique per document.
+        page_size (int): Number of documents in the page.
+        cursor (str): The next_cursor of the previous page, if any.
+        fields (list): Fields to read, or None for whole documents.
+
+    Returns:
+        tuple: (documents as dictionaries, cursor of the next page or None when this is the last page).
+    """
+    for field in order_fields:
+        query = query.order_by(field)
+    if cursor:
+        query = query.start_after(decode_cursor(cursor))
+    if fields is not None:
+        query = query.select(sorted(set(fields) | {field for field in order_fields if field != DOCUMENT_ID}))
+
+    # One extra document tells whether another page follows, without a second query
+    snapshots = list(query.limit(page_size + 1).stream())
+    next_cursor = None
+    if len(snapshots) > page_size:
+        snapshots = snapshots[:page_size]
+        last = snapshots[-1]
+        next_cursor = encode_cursor([last.id if field == DOCUMENT_ID else last.get(field) for field in order_fields])
+    return [project(snapshot.to_dict(), fields) for snapshot in snapshots], next_cursor
+
+
+def id_list_page(ids, page_size, cursor, fetch):
+    """
+    Pages through an ordered list of IDs, such as keyword matches or the notes of a date range, that is
+    computed again for every page.
+
+    Parameters:
+        ids (list): The IDs in page order.
+        page_size (int): Number of items in the page.
+        cursor (str): The next_cursor of the previous page, if any.
+        fetch (callable): Takes a list of IDs and returns {id: item} for those to include; IDs it leaves out
+            (deleted, or filtered away) are skipped and the page is filled from the following IDs.
+
+    Returns:
+        tuple: (items of the page, cursor of the next page or None when this is the last page).
+    """
+    offset = decode_cursor(cursor) if cursor else [0]
+    if len(offset) != 1 or not isinstance(offset[0], int) or offset[0] < 0:
+        raise InvalidCursor("Invalid cursor.")
+    offset = offset[0]
+
+    page = []
+    while offset < len(ids) and len(page) < page_size:
+        chunk = ids[offset:offset + page_size - len(page)]
+        found = fetch(chunk)
+        for item_id in chunk:
+            offset += 1
+            if item_id in found:
+                page.append(found[item_id])
+    return page, encode_cursor([offset]) if offset < len(ids) else None
@@ -1,5 +1,7 @@
 from googletrans import Translator
 
+from .async_utils import run_blocking
+
 # Initialize the translator
 translator = Translator()
 
@@ -57,7 +59,7 @@ def translation_voice_interaction(data):
     try:
         payload = data.get("payload", {})
         text = payload.get("text", "")
-        target_language = data.get("target_language", "en")
+        target_language = payload.get("target_language", data.get("target_language", "en"))
 
         if not text:
             return {"error": "No text provided for translation."}
@@ -67,3 +69,11 @@ def translation_voice_interaction(data):
 
     except Exception as e:
         return {"error": str(e)}
+
+
+async def translation_voice_interaction_async(data):
+    """
+    Async variant of translation_voice_interaction.
+    The googletrans client is synchronous, so the call runs on the shared blocking I/O pool.
+    """
+    return await run_blocking(translation_voice_interaction, data)
@@ -0,0 +1,198 @@
+from datetime import datetime
+
+from .intent_router import LANGUAGE_CODES
+from .voice_interaction import resolve_module
+
+LANGUAGE_NAMES = {code: name.capitalize() for name, code in LANGUAGE_CODES.items()}
+
+
+def _format_date(value):
+    """Formats Firestore timestamps and parsed deadlines for reading out loud."""
+    if isinstance(value, datetime):
+        if (value.hour, value.minute) == (0, 0):
+            return value.strftime("%A, %B %d %Y")
+        return value.strftime("%A, %B %d %Y at %H:%M")
+    return str(value)
+
+
+def _numbered(lines):
+    return "\n".join(f"{index}. {line}" for index, line in enumerate(lines, start=1))
+
+
+def _plural(count, word):
+    return f"{count} {word}" if count == 1 else f"{count} {word}s"
+
+
+def _more(api_response):
+    return "\nThere are more; ask for the next page to see them." if api_response.get("next_cursor") else ""
+
+
+def _task_line(task):
+    line = task.get("title", "Untitled task")
+    if task.get("deadline"):
+        line += f" (due {_format_date(task['deadline'])})"
+    return line
+
+
+def render_task(command, payload, api_response):
+    if isinstance(api_response, str):
+        # add and delete already answer with a full sentence
+        return api_response if api_response.endswith((".", "!")) else api_response + "."
+    if not isinstance(api_response.get("tasks"), list):
+        return None
+
+    tasks = [_task_line(task) for task in api_response["tasks"]]
+    more = _more(api_response)
+    if "priority" in command:
+        priority = payload.get("priority", "medium").lower()
+        if not tasks:
+            return f"You have no {priority} priority tasks."
+        return f"Here are your {priority} priority tasks:\n{_numbered(tasks)}{more}"
+    if "category" in command:
+        category = payload.get("category", "personal").lower()
+        if not tasks:
+            return f"You have no tasks in the {category} category."
+        if more:
+            return f"Here are your tasks in the {category} category:\n{_numbered(tasks)}{more}"
+        return f"You have {_plural(len(tasks), 'task')} in the {category} category:\n{_numbered(tasks)}"
+    if "upcoming" in command:
+        deadline = payload.get("deadline") or "tomorrow"
+        if not tasks:
+            return f"You have no tasks due by {deadline}."
+        return f"The following tasks are due by {deadline}:\n{_numbered(tasks)}{more}"
+    return None
+
+
+def render_web(command, payload, api_response):
+    if "summary" in api_response:
+        return f"Summary of the search results: {api_response['summary']}"
+    if "results" in api_response:
+        results = [f"{result['title']} - [Link]({result['link']})" for result in api_response["results"]]
+        return f"Here are the top search results for '{payload.get('query', '')}':\n{_numbered(results)}"
+    return None
+
+
+def render_note(command, payload, api_response):
+    note_id = payload.get("note_id")
+    if command == "add" and "note_id" in api_response:
+        answer = f"Note '{payload.get('title', '')}' added successfully with ID {api_response['note_id']}."
+        duplicates = [str(duplicate["note_id"]) for duplicate in api_response.get("possible_duplicates", [])]
+        if duplicates:
+            answer += f" It looks very similar to note {', '.join(duplicates)}."
+        return answer
+    if command == "retrieve" and "notes" in api_response:
+        notes = [f"{note.get('title', 'Untitled')}: {note.get('content', '')}".rstrip(": ")
+                 for note in api_response["notes"]]
+        if not notes:
+            return "I couldn't find any notes matching that."
+        if payload.get("keyword"):
+            heading = f"Here are your notes containing '{payload['keyword']}':"
+        elif payload.get("tag"):
+            heading = f"Here are your notes tagged '{payload['tag']}':"
+        else:
+            heading = "Here are your notes:"
+        return f"{heading}\n{_numbered(notes)}{_more(api_response)}"
+    if command == "similar" and "notes" in api_response:
+        notes = [f"{note.get('title', 'Untitled')} (note {note.get('note_id')}, similarity {note.get('similarity')})"
+                 for note in api_response["notes"]]
+        if not notes:
+            return "I couldn't find any similar notes."
+        return f"Here are the most similar notes:\n{_numbered(notes)}"
+    if command == "summarize" and "summary" in api_response:
+        return f"Summary of note {note_id}: {api_response['summary']}"
+    if command == "delete" and "message" in api_response:
+        return f"Note {note_id} deleted successfully."
+    if command == "edit" and "message" in api_response:
+        return f"Note {note_id} has been updated successfully."
+    return None
+
+
+def render_translation(command, payload, api_response):
+    if "translated_text" not in api_response:
+        return None
+    target_language = payload.get("target_language", "en")
+    language = LANGUAGE_NAMES.get(target_language, target_language)
+    return f"The translation of '{payload.get('text', '')}' to {language} is: {api_response['translated_text']}"
+
+
+def render_weather_and_news(command, payload, api_response):
+    if "news" in api_response:
+        articles = [f"{article['title']}: {article['description']}" if article.get("description") else article["title"]
+                    for article in api_response["news"]]
+        if not articles:
+            return "I couldn't find any news headlines right now."
+        return f"Here are the top {len(articles)} news headlines:\n{_numbered(articles)}"
+    if "temperature" in api_response:
+        return (f"The weather in {api_response['location']} is {api_response['temperature']}°C, "
+                f"with {str(api_response['condition']).lower()} conditions. "
+                f"Humidity is {api_response['humidity']}% and wind speed is {api_response['wind_speed']} km/h.")
+    return None
+
+
+def render_email(command, payload, api_response):
+    if "fetch" in command and isinstance(api_response.get("emails"), list):
+        emails = api_response["emails"]
+        if not emails:
+            return "You have no new emails."
+        lines = [f"Subject: {email['subject']}\n   From: {email['from']}\n   ID: {email['id']}" for email in emails]
+        return f"You have {_plural(len(emails), 'new email')}.\n{_numbered(lines)}"
+    if "summarize" in command and "summary" in api_response:
+        return f"Summary of the email: {api_response['summary']}"
+    if "reply" in command and "outbox_id" in api_response:
+        return f"Reply to email ID {payload.get('email_id', '')} is queued for delivery (outbox ID {api_response['outbox_id']})."
+    if "reply" in command and "id" in api_response:
+        return f"Reply sent to email ID {payload.get('email_id', '')}."
+    if "send" in command and "outbox_id" in api_response:
+        return (f"Email to {payload.get('to_email', '')} with subject '{payload.get('subject', '')}' is queued for "
+                f"delivery (outbox ID {api_response['outbox_id']}).")
+    if "send" in command and "id" in api_response:
+        return f"Email sent successfully to {payload.get('to_email', '')} with subject '{payload.get('subject', '')}'."
+    if "status" in command and isinstance(api_response.get("outbox"), list):
+        entries = api_response["outbox"]
+        if not entries:
+            return "You have no queued emails."
+        lines = [f"Outbox ID {entry['id']}: {entry['kind']} to {entry['to_email'] or 'the sender'} is {entry['status']}"
+                 + (f" ({entry['last_error']})" if entry['status'] != "sent" and entry['last_error'] else "")
+                 for entry in entries]
+        return _numbered(lines)
+    return None
+
+
+RENDERERS = {
+    "task": render_task,
+    "web": render_web,
+    "note": render_note,
+    "translate": render_translation,
+    "weather": render_weather_and_news,
+    "email": render_email,
+}
+
+
+def render_response(parsed_command, api_response):
+    """
+    Converts a module response into a natural language answer using fixed templates.
+
+    Parameters:
+        parsed_command (dict): The parsed command that produced the response.
+        api_response (dict | list | str): The value returned by activate_module.
+
+    Returns:
+        str: The rendered answer, or None if the response shape has no template and Gemini should render it.
+    """
+    renderer = RENDERERS.get(resolve_module(parsed_command.get("module", "")))
+    if renderer is None:
+        return None
+
+    command = parsed_command.get("command", "")
+    payload = parsed_command.get("payload") or {}
+
+    if isinstance(api_response, dict) and "error" in api_response and len(api_response) == 1:
+        return f"Sorry, I couldn't complete that request: {api_response['error']}"
+    if isinstance(api_response, dict) and isinstance(api_response.get("emails"), dict):
+        return f"Sorry, I couldn't fetch your emails: {api_response['emails'].get('error', 'unknown error')}"
+
+    try:
+        return renderer(command, payload, api_response)
+    except (KeyError, TypeError, AttributeError):
+        # Unexpected shape within a known module
+        return None
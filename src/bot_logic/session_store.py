@@ -0,0 +1,236 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+
+from .config import (SESSION_MAX_CLIENTS, SESSION_IDLE_SECONDS, SESSION_HISTORY_TOKEN_BUDGET, HISTORY_VERBATIM_TURNS,
+                     LEGACY_HISTORY_SESSION_ID)
+from .history_compactor import history_compactor, summary_history
+from .interaction_history import (get_next_session_id, initialize_chat_with_gemini, load_client_history,
+                                  save_session_start)
+
+# Rough characters-per-token ratio used to budget history windows without calling the tokenizer
+CHARS_PER_TOKEN = 4
+
+
+# Turns kept waiting for the summary while compaction keeps failing; older ones are dropped
+MAX_UNSUMMARIZED_TURNS = 50
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def history_text(response):
+    """The text that stands for a module response in the chat history."""
+    if isinstance(response, str):
+        return response
+    return "returned dictionary of notes or tasks"
+
+
+def _client_key(raw_key):
+    return hashlib.sha256(raw_key.encode()).hexdigest()
+
+
+def get_client_key(request):
+    """
+    Identifies the client of a request: an explicit X-Session-Id header, else the bearer token, else the remote
+    address. Keys are hashed so tokens are never kept in memory as dictionary keys.
+    """
+    session_header = request.headers.get("X-Session-Id")
+    auth_header = request.headers.get("Authorization")
+    if session_header:
+        raw_key = f"session:{session_header}"
+    elif auth_header and auth_header.startswith("Bearer "):
+        raw_key = f"token:{auth_header[7:]}"
+    else:
+        raw_key = f"address:{request.remote_addr}"
+    return _client_key(raw_key)
+
+
+# Only this client picks up the legacy shared session; every other new client starts with an empty history
+LEGACY_CLIENT_KEY = _client_key(f"session:{LEGACY_HISTORY_SESSION_ID}") if LEGACY_HISTORY_SESSION_ID else None
+
+
+class Session:
+    """
+    One client's conversation: its Firestore session ID, a rolling summary of older turns and a window of the
+    most recent turns, kept verbatim and bounded both by turn count and by a token budget. Turns that leave the
+    window are folded into the summary in the background, so the history sent to Gemini stays a fixed size.
+    The Gemini chat that answers conversational messages is only created when one arrives.
+    """
+
+    def __init__(self, session_id, token_budget, verbatim_turns=6):
+        self.session_id = session_id
+        self.token_budget = token_budget
+        self.verbatim_turns = verbatim_turns
+        self.last_used = time.monotonic()
+        self.turn_count = 0
+        self.summary = ""
+        self._turns = deque()
+        self._tokens = 0
+        self._unsummarized = deque(maxlen=MAX_UNSUMMARIZED_TURNS)
+        self._compacting = False
+        self._chat = None
+        self._lock = threading.Lock()
+
+    def next_seq(self):
+        """Reserves the sequence number of the next turn persisted for this session."""
+        with self._lock:
+            seq = self.turn_count
+            self.turn_count += 1
+            return seq
+
+    def add_turn(self, command, response, seq=None):
+        """
+        Appends an exchange to the window. Once the window holds more than verbatim_turns turns or exceeds the
+        token budget, the oldest turns move out of it and are queued for the rolling summary.
+        """
+        text = history_text(response)
+        turn = (seq, command, text, estimate_tokens(command) + estimate_tokens(text))
+        with self._lock:
+            self._turns.append(turn)
+            self._tokens += turn[3]
+            # The newest turn is always kept, even if it alone is over budget
+            while len(self._turns) > 1 and (len(self._turns) > self.verbatim_turns
+                                            or self._tokens > self.token_budget):
+                seq, command, text, tokens = self._turns.popleft()
+                self._tokens -= tokens
+                self._unsummarized.append((seq, command, text))
+            self._chat = None
+            needs_compaction = bool(self._unsummarized) and not self._compacting
+
+        if needs_compaction:
+            history_compactor.schedule(self)
+
+    def seed(self, summary, turns):
+        """
+        Starts the session with the rolling summary and (command, response) turns carried over from an earlier
+        session. Returns the turns as (seq, command, response) with the sequence numbers they were given here.
+        """
+        with self._lock:
+            self.summary = summary
+        seeded = []
+        for command, response in turns:
+            seq = self.next_seq()
+            self.add_turn(command, response, seq)
+            seeded.append((seq, command, response))
+        return seeded
+
+    def has_history(self):
+        with self._lock:
+            return bool(self.summary or self._turns)
+
+    def begin_compaction(self):
+        """Hands the turns waiting to be summarized to the compactor, or None if there are none or it is busy."""
+        with self._lock:
+            if self._compacting or not self._unsummarized:
+                return None
+            self._compacting = True
+            turns = list(self._unsummarized)
+            self._unsummarized.clear()
+            return self.summary, turns
+
+    def finish_compaction(self, summary):
+        with self._lock:
+            self.summary = summary
+            self._compacting = False
+            self._chat = None
+
+    def abort_compaction(self, turns):
+        """
+        Puts the turns back so the next compaction retries them. If that is more than MAX_UNSUMMARIZED_TURNS,
+        the oldest are dropped.
+        """
+        with self._lock:
+            pending = list(turns) + list(self._unsummarized)
+            self._unsummarized = deque(pending[-MAX_UNSUMMARIZED_TURNS:], maxlen=MAX_UNSUMMARIZED_TURNS)
+            self._compacting = False
+
+    def history(self):
+        """Returns the summary and the window in the role/parts format expected by Gemini."""
+        with self._lock:
+            history = summary_history(self.summary)
+            for _, command, response, _ in self._turns:
+                history.append({"role": "user", "parts": command})
+                history.append({"role": "model", "parts": response})
+            return history
+
+    @property
+    def chat(self):
+        """The Gemini chat seeded with the current window."""
+        if self._chat is None:
+            self._chat = initialize_chat_with_gemini(self.history())
+        return self._chat
+
+
+class SessionStore:
+    """
+    LRU store of per-client sessions. It holds at most max_sessions sessions and evicts those idle for longer
+    than idle_seconds, so memory stays bounded no matter how many clients connect.
+    """
+
+    def __init__(self, max_sessions=1000, idle_seconds=1800, token_budget=2000, verbatim_turns=6):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.token_budget = token_budget
+        self.verbatim_turns = verbatim_turns
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        while self._sessions:
+            oldest_key, oldest = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or now - oldest.last_used > self.idle_seconds:
+                del self._sessions[oldest_key]
+            else:
+                break
+
+    def get(self, client_key):
+        """
+        Returns the client's session, starting a new one if it has none or it was evicted. A new session is
+        seeded with the summary and latest turns of the client's previous session, so a restart keeps the
+        conversation. A client without a previous session starts empty, unless it is the LEGACY_HISTORY_SESSION_ID
+        client, which continues the legacy shared session once.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(client_key)
+            if session is not None:
+                session.last_used = now
+                self._sessions.move_to_end(client_key)
+                return session
+
+        # Allocate and load outside the lock; both may need a Firestore round-trip
+        session = Session(get_next_session_id(), self.token_budget, self.verbatim_turns)
+        try:
+            summary, turns = load_client_history(client_key, self.verbatim_turns,
+                                                 include_legacy=client_key == LEGACY_CLIENT_KEY)
+            seeded = session.seed(summary, turns)
+        except Exception as e:
+            print(f"Failed to load the previous session of a client: {e}")
+            summary, seeded = "", []
+        with self._lock:
+            existing = self._sessions.get(client_key)
+            if existing is not None:
+                return existing
+            self._sessions[client_key] = session
+            self._evict(now)
+
+        try:
+            save_session_start(session.session_id, client_key, summary, seeded)
+        except Exception as e:
+            print(f"Failed to save the start of session {session.session_id}: {e}")
+        return session
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+session_store = SessionStore(
+    max_sessions=SESSION_MAX_CLIENTS,
+    idle_seconds=SESSION_IDLE_SECONDS,
+    token_budget=SESSION_HISTORY_TOKEN_BUDGET,
+    verbatim_turns=HISTORY_VERBATIM_TURNS,
+)
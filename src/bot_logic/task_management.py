@@ -1,15 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import dateparser
-import google.generativeai as genai
 from google.cloud.firestore_v1.base_query import FieldFilter
 
-from .config import GEMINI_API_KEY
+from .async_utils import run_blocking
+from .bulk_transfer import (MAX_BATCH_WRITES, ImportReport, chunked, export_collection, parse_datetime, read_ndjson,
+                            write_chunks)
+from .config import IMPORT_INFERENCE_WORKERS
 from .firebase_initializer import db
+from .gemini import LazyModel
+from .pagination import DOCUMENT_ID, TASK_LISTING_FIELDS, query_page, resolve_fields, resolve_page_size
 
-# Configure Gemini API
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel("gemini-1.5-flash")
+# Gemini model, created on first use
+model = LazyModel("gemini-1.5-flash")
+
+TASK_PRIORITIES = ("high", "medium", "low")
+TASK_CATEGORIES = ("work", "personal")
+
+# Bounds the Gemini calls an import with inference makes at a time
+inference_executor = ThreadPoolExecutor(max_workers=IMPORT_INFERENCE_WORKERS, thread_name_prefix="task-inference")
 
 
 # Function to infer priority and category using Gemini
@@ -22,14 +32,19 @@ def infer_task_details(task_description):
     return response.text.lower()
 
 
-def add_task_from_input(task_description, deadline):
-    inferred_details = infer_task_details(task_description)
+# Function to read the priority and category out of Gemini's answer, falling back to medium and personal
+def parse_task_details(inferred_details):
     priority = "medium"
     category = "personal"
 
     if "priority" in inferred_details and "category" in inferred_details:
         priority = "high" if "high" in inferred_details else "low" if "low" in inferred_details else "medium"
         category = "work" if "work" in inferred_details else "personal"
+    return priority, category
+
+
+def add_task_from_input(task_description, deadline):
+    priority, category = parse_task_details(infer_task_details(task_description))
 
     task_data = {
         "title": task_description,
@@ -44,22 +59,33 @@ def add_task_from_input(task_description, deadline):
     return f"Task '{task_description}' added with priority: {priority} and category: {category}"
 
 
-def get_tasks_by_priority(priority):
-    tasks = db.collection("tasks").where(filter=FieldFilter("priority", "==", priority)).stream()
-    task_list = [task.to_dict() for task in tasks]
-    return task_list
+def _task_page(query, order_fields, page_size=None, cursor=None, fields=None):
+    """
+    Reads one page of tasks. Listings hold the task titles, priorities, categories and deadlines unless other
+    fields (or "*" for all) are requested, and carry a next_cursor while more tasks follow.
+    """
+    tasks, next_cursor = query_page(query, order_fields, resolve_page_size(page_size), cursor,
+                                    resolve_fields(fields, TASK_LISTING_FIELDS))
+    response = {"tasks": tasks}
+    if next_cursor:
+        response["next_cursor"] = next_cursor
+    return response
+
 
+def get_tasks_by_priority(priority, page_size=None, cursor=None, fields=None):
+    query = db.collection("tasks").where(filter=FieldFilter("priority", "==", priority))
+    return _task_page(query, [DOCUMENT_ID], page_size, cursor, fields)
 
-def get_tasks_by_category(category):
-    tasks = db.collection("tasks").where(filter=FieldFilter("category", "==", category)).stream()
-    task_list = [task.to_dict() for task in tasks]
-    return task_list
 
+def get_tasks_by_category(category, page_size=None, cursor=None, fields=None):
+    query = db.collection("tasks").where(filter=FieldFilter("category", "==", category))
+    return _task_page(query, [DOCUMENT_ID], page_size, cursor, fields)
 
-def get_upcoming_tasks(deadline_date):
-    tasks = db.collection("tasks").where(filter=FieldFilter("deadline", "<=", deadline_date)).order_by(
-        "deadline").stream()
-    return [task.to_dict() for task in tasks]
+
+def get_upcoming_tasks(deadline_date, page_size=None, cursor=None, fields=None):
+    query = db.collection("tasks").where(filter=FieldFilter("deadline", "<=", deadline_date))
+    # Tasks sharing a deadline are told apart by their document ID
+    return _task_page(query, ["deadline", DOCUMENT_ID], page_size, cursor, fields)
 
 
 def delete_task(task_title):
@@ -67,6 +93,83 @@ def delete_task(task_title):
     return f"Task '{task_title}' deleted successfully!"
 
 
+def _imported_task(record):
+    """
+    Builds the document of an imported task, or raises ValueError if the record cannot be one.
+    The priority and category are left out when the record has no valid value for them.
+    """
+    title = record.get("title") or record.get("description")
+    if not isinstance(title, str) or not title.strip() or "/" in title:
+        raise ValueError("A task needs a title without slashes.")
+    deadline = record.get("deadline")
+    if isinstance(deadline, str):
+        deadline = parse_datetime(deadline) or dateparser.parse(deadline)
+    task_data = {
+        "title": title,
+        "deadline": deadline if isinstance(deadline, datetime) else None,
+        "created_at": parse_datetime(record.get("created_at")) or datetime.now(),
+    }
+    if record.get("priority") in TASK_PRIORITIES:
+        task_data["priority"] = record["priority"]
+    if record.get("category") in TASK_CATEGORIES:
+        task_data["category"] = record["category"]
+    return task_data
+
+
+def _infer_missing_details(task_data):
+    priority, category = parse_task_details(infer_task_details(task_data["title"]))
+    task_data.setdefault("priority", priority)
+    task_data.setdefault("category", category)
+
+
+def import_tasks(lines, infer=False):
+    """
+    Imports tasks from an NDJSON stream, one {"title", "deadline", "priority", "category"} object per line.
+
+    Tasks are written in batched writes, several batches at a time. A task without a valid priority or category
+    gets medium and personal, unless infer is set, in which case Gemini infers them as add does, with at most
+    IMPORT_INFERENCE_WORKERS calls at a time. As with add, a task replaces any task with the same title.
+    Returns the number of tasks imported and failed, with the first errors by line.
+    """
+    report = ImportReport()
+
+    def write_chunk(chunk):
+        tasks = []
+        for line, record in chunk:
+            try:
+                tasks.append((line, _imported_task(record)))
+            except ValueError as e:
+                report.fail(line, e)
+
+        if infer:
+            pending = [(line, task) for line, task in tasks if "priority" not in task or "category" not in task]
+            futures = [(line, inference_executor.submit(_infer_missing_details, task)) for line, task in pending]
+            for line, future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Failed to infer details of the task on line {line}: {e}")
+        for _, task in tasks:
+            task.setdefault("priority", "medium")
+            task.setdefault("category", "personal")
+
+        if not tasks:
+            return 0
+        batch = db.batch()
+        for _, task in tasks:
+            batch.set(db.collection("tasks").document(task["title"]), task)
+        batch.commit()
+        return len(tasks)
+
+    write_chunks(chunked(read_ndjson(lines, report), MAX_BATCH_WRITES), write_chunk, report)
+    return report.as_dict()
+
+
+def export_tasks():
+    """Yields every task as an NDJSON line, reading the tasks page by page."""
+    return export_collection("tasks")
+
+
 def task_voice_interaction(data):
     """
     Handle task-related commands. Payload should include additional data like task description or deadlines.
@@ -74,6 +177,8 @@ def task_voice_interaction(data):
 
     command = data.get("command", "")
     payload = data.get("payload", {})
+    page_options = {"page_size": payload.get("page_size"), "cursor": payload.get("cursor"),
+                    "fields": payload.get("fields")}
 
     if "add" in command:
         task_description = payload.get("description")
@@ -83,18 +188,18 @@ def task_voice_interaction(data):
 
     elif "priority" in command:
         priority = payload.get("priority", "medium").lower()
-        return get_tasks_by_priority(priority)
+        return get_tasks_by_priority(priority, **page_options)
 
     elif "category" in command:
         category = payload.get("category", "personal").lower()
-        return get_tasks_by_category(category)
+        return get_tasks_by_category(category, **page_options)
 
     elif "upcoming" in command:
         deadline_input = payload.get("deadline")
         if deadline_input == None:
             deadline_input = "tomorrow"
         deadline_date = dateparser.parse(deadline_input) if deadline_input else None
-        return get_upcoming_tasks(deadline_date)
+        return get_upcoming_tasks(deadline_date, **page_options)
 
     elif "delete" in command:
         task_title = payload.get("title")
@@ -102,3 +207,11 @@ def task_voice_interaction(data):
 
     else:
         return "Sorry, I didn't understand that command."
+
+
+async def task_voice_interaction_async(data):
+    """
+    Async variant of task_voice_interaction.
+    The Firestore and Gemini clients are synchronous, so the call runs on the shared blocking I/O pool.
+    """
+    return await run_blocking(task_voice_interaction, data)
@@ -1,32 +1,80 @@
 # Import all the modules as needed
-from .email_management import email_voice_interaction
-from .note_taking import note_voice_interaction
-from .realtime_translation import translation_voice_interaction
-from .task_management import task_voice_interaction
-from .weather_and_news import weather_and_news_voice_interaction
-from .web_browsing import web_browsing_voice_interaction
+from .email_management import email_voice_interaction, email_voice_interaction_async
+from .note_taking import note_voice_interaction, note_voice_interaction_async
+from .realtime_translation import translation_voice_interaction, translation_voice_interaction_async
+from .task_management import task_voice_interaction, task_voice_interaction_async
+from .weather_and_news import weather_and_news_voice_interaction, weather_and_news_voice_interaction_async
+from .web_browsing import web_browsing_voice_interaction, web_browsing_voice_interaction_async
+
+
+def resolve_module(module):
+    """
+    Map the module name chosen by the parser to one of the canonical module names:
+    "task", "web", "note", "translate", "email" or "weather" (which also serves news).
+    Returns None if no module matches.
+    """
+    module = module or ""
+
+    # Determine the module based on keywords in the name
+    if "task" in module or "reminder" in module or "schedule" in module:
+        return "task"
+    elif "web" in module or "search" in module or "browse" in module or "website" in module:
+        return "web"
+    elif "note" in module or "record" in module or "write" in module:
+        return "note"
+    elif "translation" in module or "translate" in module or "language" in module or "interpret" in module:
+        return "translate"
+    elif "email" in module or "mail" in module or "inbox" in module:
+        return "email"
+    elif "weather" in module or "news" in module or "headline" in module or "article" in module or "forecast" in module or "temperature" in module:
+        return "weather"
+    return None
 
 
 def activate_module(data, token=None):
     """
     Activate the appropriate module based on the user's data and return the response.
     """
-    # Default response from data history handling
-    module = data.get("module", "")
+    module = resolve_module(data.get("module", ""))
 
-    # Determine the module to activate based on keywords in the data
-    if "task" in module or "reminder" in module or "schedule" in module:
+    if module == "task":
         response = task_voice_interaction(data)
-    elif "web" in module or "search" in module or "browse" in module or "website" in module:
+    elif module == "web":
         response = web_browsing_voice_interaction(data)
-    elif "note" in module or "record" in module or "write" in module:
+    elif module == "note":
         response = note_voice_interaction(data)
-    elif "translation" in module or "translate" in module or "language" in module or "interpret" in module:
+    elif module == "translate":
         response = translation_voice_interaction(data)
-    elif "email" in module or "mail" in module or "inbox" in module:
+    elif module == "email":
         response = email_voice_interaction(data, token)
-    elif "weather" in module or "news" in module or "headline" in module or "article" in module or "forecast" in module or "temperature" in module:
+    elif module == "weather":
         response = weather_and_news_voice_interaction(data)
+    else:
+        # Fallback response if no modules are triggered
+        response = {"error": f"Module '{data.get('module', '')}' is not recognized."}
+
+    return response
+
+
+async def activate_module_async(data, token=None):
+    """
+    Async variant of activate_module, dispatching to the async module entry points.
+    """
+    module = resolve_module(data.get("module", ""))
+
+    if module == "task":
+        response = await task_voice_interaction_async(data)
+    elif module == "web":
+        response = await web_browsing_voice_interaction_async(data)
+    elif module == "note":
+        response = await note_voice_interaction_async(data)
+    elif module == "translate":
+        response = await translation_voice_interaction_async(data)
+    elif module == "email":
+        response = await email_voice_interaction_async(data, token)
+    elif module == "weather":
+        response = await weather_and_news_voice_interaction_async(data)
+    else:
+        response = {"error": f"Module '{data.get('module', '')}' is not recognized."}
 
-    # Fallback to the default response if no modules are triggered
     return response
@@ -0,0 +1,30 @@
+import time
+
+from .command_pipeline import parse_model, render_model
+from .firebase_initializer import get_db
+from .note_taking import load_search_index, load_similarity_index
+
+
+def warm_up():
+    """
+    Initializes the clients that are otherwise created on first use: Firebase, the Gemini models of the
+    command pipeline and the note indexes.
+
+    Returns:
+        dict: The time each step took in milliseconds, or the error that stopped it.
+    """
+    steps = [
+        ("firestore", get_db),
+        ("gemini", lambda: (parse_model.get(), render_model.get())),
+        ("note_indexes", lambda: (load_search_index(), load_similarity_index())),
+    ]
+    report = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+            report[name] = {"ms": round((time.perf_counter() - started) * 1000, 1)}
+        except Exception as e:
+            print(f"Warm-up step '{name}' failed: {e}")
+            report[name] = {"error": str(e)}
+    return report
@@ -1,5 +1,7 @@
+import httpx
 import requests
 
+from .async_utils import get_http_client
 from .config import WEATHER_API_KEY, WEATHER_API_HOST, NEWS_API_KEY
 
 # Weather API setup
@@ -9,6 +11,32 @@ WEATHER_API_URL = "https://weatherapi-com.p.rapidapi.com/current.json"
 NEWS_API_URL = "https://newsapi.org/v2/top-headlines"
 
 
+def _weather_request(location):
+    querystring = {"q": location}
+    headers = {
+        "x-rapidapi-key": WEATHER_API_KEY,
+        "x-rapidapi-host": WEATHER_API_HOST
+    }
+    return querystring, headers
+
+
+def _parse_weather(data):
+    location_name = data['location']['name']
+    country = data['location']['country']
+    temp_c = data['current']['temp_c']
+    condition = data['current']['condition']['text']
+    humidity = data['current']['humidity']
+    wind_kph = data['current']['wind_kph']
+
+    return {
+        "location": f"{location_name}, {country}",
+        "temperature": temp_c,
+        "condition": condition,
+        "humidity": humidity,
+        "wind_speed": wind_kph
+    }
+
+
 # Weather fetching function
 def get_weather(location):
     """
@@ -20,37 +48,52 @@ def get_weather(location):
     Returns:
         dict: A dictionary with weather data or None if an error occurs.
     """
-    querystring = {"q": location}
-    headers = {
-        "x-rapidapi-key": WEATHER_API_KEY,
-        "x-rapidapi-host": WEATHER_API_HOST
-    }
+    querystring, headers = _weather_request(location)
 
     try:
         response = requests.get(WEATHER_API_URL, headers=headers, params=querystring)
         response.raise_for_status()
-        data = response.json()
-
-        location_name = data['location']['name']
-        country = data['location']['country']
-        temp_c = data['current']['temp_c']
-        condition = data['current']['condition']['text']
-        humidity = data['current']['humidity']
-        wind_kph = data['current']['wind_kph']
-
-        return {
-            "location": f"{location_name}, {country}",
-            "temperature": temp_c,
-            "condition": condition,
-            "humidity": humidity,
-            "wind_speed": wind_kph
-        }
+        return _parse_weather(response.json())
 
     except requests.RequestException as e:
         print(f"Error fetching weather data: {e}")
         return {"error": str(e)}
 
 
+async def get_weather_async(location):
+    """
+    Async variant of get_weather using the shared HTTP client.
+    """
+    querystring, headers = _weather_request(location)
+
+    try:
+        response = await get_http_client().get(WEATHER_API_URL, headers=headers, params=querystring)
+        response.raise_for_status()
+        return _parse_weather(response.json())
+
+    except httpx.HTTPError as e:
+        print(f"Error fetching weather data: {e}")
+        return {"error": str(e)}
+
+
+def _news_params(country, category, num_articles):
+    return {
+        "country": country,
+        "category": category,
+        "pageSize": num_articles,
+        "apiKey": NEWS_API_KEY
+    }
+
+
+def _parse_news(news_data):
+    articles = news_data.get('articles', [])
+    news_summaries = []
+    for article in articles:
+        news_summaries.append({"title": article['title'], "description": article['description']})
+
+    return news_summaries
+
+
 # News fetching function
 def get_news(country="us", category="general", num_articles=5):
     """
@@ -64,30 +107,46 @@ def get_news(country="us", category="general", num_articles=5):
     Returns:
         list: A list of news articles or None if an error occurs.
     """
-    params = {
-        "country": country,
-        "category": category,
-        "pageSize": num_articles,
-        "apiKey": NEWS_API_KEY
-    }
+    params = _news_params(country, category, num_articles)
 
     try:
         response = requests.get(NEWS_API_URL, params=params)
         response.raise_for_status()
-        news_data = response.json()
+        return _parse_news(response.json())
 
-        articles = news_data.get('articles', [])
-        news_summaries = []
-        for article in articles:
-            news_summaries.append({"title": article['title'], "description": article['description']})
+    except requests.RequestException as e:
+        print(f"Error fetching news data: {e}")
+        return {"error": str(e)}
 
-        return news_summaries
 
-    except requests.RequestException as e:
+async def get_news_async(country="us", category="general", num_articles=5):
+    """
+    Async variant of get_news using the shared HTTP client.
+    """
+    params = _news_params(country, category, num_articles)
+
+    try:
+        response = await get_http_client().get(NEWS_API_URL, params=params)
+        response.raise_for_status()
+        return _parse_news(response.json())
+
+    except httpx.HTTPError as e:
         print(f"Error fetching news data: {e}")
         return {"error": str(e)}
 
 
+def _weather_response(weather_info):
+    if "error" in weather_info:
+        return {"error": "Unable to fetch weather data."}
+    return weather_info
+
+
+def _news_response(news_headlines):
+    if "error" in news_headlines:
+        return {"error": "Unable to fetch news data."}
+    return {"news": news_headlines}
+
+
 # Function to handle voice commands for Weather and News (Refactored for Flask)
 def weather_and_news_voice_interaction(data):
     """
@@ -104,19 +163,32 @@ def weather_and_news_voice_interaction(data):
 
     if "weather" in command:
         location = payload.get("location", "Zurich").strip()  # Default location if none provided
-        weather_info = get_weather(location)
-        if "error" in weather_info:
-            response = {"error": "Unable to fetch weather data."}
-        else:
-            response = weather_info
+        response = _weather_response(get_weather(location))
 
     elif "news" in command:
         category = payload.get("category", "general").strip()  # Default category if none provided
-        news_headlines = get_news(category=category, num_articles=5)
-        if "error" in news_headlines:
-            response = {"error": "Unable to fetch news data."}
-        else:
-            response = {"news": news_headlines}
+        response = _news_response(get_news(category=category, num_articles=5))
+
+    else:
+        response = {"error": "Command not recognized. Please use 'weather' or 'news'."}
+
+    return response
+
+
+async def weather_and_news_voice_interaction_async(data):
+    """
+    Async variant of weather_and_news_voice_interaction.
+    """
+    command = data.get("command", "")
+    payload = data.get("payload", {})
+
+    if "weather" in command:
+        location = payload.get("location", "Zurich").strip()
+        response = _weather_response(await get_weather_async(location))
+
+    elif "news" in command:
+        category = payload.get("category", "general").strip()
+        response = _news_response(await get_news_async(category=category, num_articles=5))
 
     else:
         response = {"error": "Command not recognized. Please use 'weather' or 'news'."}
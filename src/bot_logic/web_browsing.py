@@ -1,11 +1,38 @@
-import google.generativeai as genai
+import httpx
 import requests
 
-from .config import GOOGLE_API_KEY, GOOGLE_CSE_ID, GEMINI_API_KEY
+from .async_utils import get_http_client
+from .config import GOOGLE_API_KEY, GOOGLE_CSE_ID
+from .gemini import LazyModel
 
-# Configure Gemini API
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel("gemini-1.5-flash")
+# Gemini model, created on first use
+model = LazyModel("gemini-1.5-flash")
+
+SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+
+
+def _search_params(query, num_results):
+    return {
+        "key": GOOGLE_API_KEY,
+        "cx": GOOGLE_CSE_ID,
+        "q": query,
+        "num": num_results
+    }
+
+
+def _parse_search_results(results):
+    if "items" not in results:
+        return {"error": "No results found."}
+
+    search_results = [
+        {
+            "title": item["title"],
+            "link": item["link"],
+            "snippet": item.get("snippet", "No description available.")
+        }
+        for item in results["items"]
+    ]
+    return {"results": search_results}
 
 
 def search_web(query, num_results=5):
@@ -19,35 +46,26 @@ def search_web(query, num_results=5):
     Returns:
         list: A list of dictionaries containing titles, links, and snippets of search results.
     """
-    search_url = "https://www.googleapis.com/customsearch/v1"
-    params = {
-        "key": GOOGLE_API_KEY,
-        "cx": GOOGLE_CSE_ID,
-        "q": query,
-        "num": num_results
-    }
-
     try:
-        response = requests.get(search_url, params=params)
+        response = requests.get(SEARCH_URL, params=_search_params(query, num_results))
         response.raise_for_status()  # Raise an error for unsuccessful status codes
-        results = response.json()
-
-        if "items" not in results:
-            return {"error": "No results found."}
-
-        search_results = [
-            {
-                "title": item["title"],
-                "link": item["link"],
-                "snippet": item.get("snippet", "No description available.")
-            }
-            for item in results["items"]
-        ]
-        return {"results": search_results}
+        return _parse_search_results(response.json())
     except requests.exceptions.RequestException as e:
         return {"error": f"An error occurred while performing the search: {str(e)}"}
 
 
+async def search_web_async(query, num_results=5):
+    """
+    Async variant of search_web using the shared HTTP client.
+    """
+    try:
+        response = await get_http_client().get(SEARCH_URL, params=_search_params(query, num_results))
+        response.raise_for_status()
+        return _parse_search_results(response.json())
+    except httpx.HTTPError as e:
+        return {"error": f"An error occurred while performing the search: {str(e)}"}
+
+
 def summarize_results_with_gemini(results):
     """
     Summarizes the snippets from search results using Gemini API.
@@ -67,6 +85,18 @@ def summarize_results_with_gemini(results):
     return "No content available for summarization."
 
 
+async def summarize_results_with_gemini_async(results):
+    """
+    Async variant of summarize_results_with_gemini.
+    """
+    snippets = " ".join([result["snippet"] for result in results])
+
+    if snippets:
+        response = await model.generate_content_async("Summarize the following text: " + snippets)
+        return response.text
+    return "No content available for summarization."
+
+
 def web_browsing_voice_interaction(data):
     """
     Web browsing interaction logic for the API.
@@ -97,3 +127,25 @@ def web_browsing_voice_interaction(data):
 
     # Default action is to return the search results
     return results
+
+
+async def web_browsing_voice_interaction_async(data):
+    """
+    Async variant of web_browsing_voice_interaction.
+    """
+    payload = data.get("payload", {})
+    query = payload.get("query", "")
+    action = payload.get("action", "")
+
+    if not query:
+        return {"error": "Query is required for web browsing."}
+
+    results = await search_web_async(query)
+    if "error" in results:
+        return results
+
+    if action == "summarize":
+        summary = await summarize_results_with_gemini_async(results["results"])
+        return {"summary": summary}
+
+    return results
@@ -0,0 +1,93 @@
+import json
+import os
+import time
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from bot_logic import bulk_transfer
+from bot_logic.note_buckets import day_bucket, week_bucket
+from bot_logic.note_taking import _imported_note
+from bot_logic.task_management import _imported_task
+
+
+class FakeSnapshot:
+    def __init__(self, record):
+        self.record = record
+
+    def to_dict(self):
+        return dict(self.record)
+
+
+class FakeCollection:
+    """A single page of documents, read the way export_collection reads a collection."""
+
+    def __init__(self, records):
+        self.records = records
+
+    def collection(self, name):
+        return self
+
+    def order_by(self, field):
+        return self
+
+    def limit(self, count):
+        return self
+
+    def stream(self):
+        return [FakeSnapshot(record) for record in self.records]
+
+
+def as_stored(wall_time):
+    """A naive local timestamp as Firestore hands it back: the same wall-clock time, labelled UTC."""
+    return wall_time.replace(tzinfo=timezone.utc)
+
+
+class ExportImportRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        # A host far from UTC, so converting instead of dropping the zone would move the day
+        self.original_tz = os.environ.get("TZ")
+        os.environ["TZ"] = "America/Los_Angeles"
+        time.tzset()
+
+    def tearDown(self):
+        if self.original_tz is None:
+            os.environ.pop("TZ", None)
+        else:
+            os.environ["TZ"] = self.original_tz
+        time.tzset()
+
+    def export(self, records):
+        with mock.patch.object(bulk_transfer, "db", FakeCollection(records)):
+            return [json.loads(line) for line in bulk_transfer.export_collection("notes")]
+
+    def test_note_timestamp_and_buckets_survive_the_round_trip(self):
+        taken = datetime(2026, 3, 1, 2, 30)
+        [record] = self.export([{"note_id": 1, "title": "Late", "content": "Written after midnight",
+                                 "tags": [], "timestamp": as_stored(taken)}])
+
+        note = _imported_note(record)
+
+        self.assertEqual(note["timestamp"], taken)
+        self.assertEqual(day_bucket(note["timestamp"]), day_bucket(taken))
+        self.assertEqual(week_bucket(note["timestamp"]), week_bucket(taken))
+
+    def test_task_deadline_and_creation_time_survive_the_round_trip(self):
+        deadline = datetime(2026, 3, 2, 9, 0)
+        created = datetime(2026, 3, 1, 23, 45)
+        [record] = self.export([{"title": "Call mom", "priority": "high", "category": "personal",
+                                 "deadline": as_stored(deadline), "created_at": as_stored(created)}])
+
+        task = _imported_task(record)
+
+        self.assertEqual(task["deadline"], deadline)
+        self.assertEqual(task["created_at"], created)
+
+    def test_naive_and_invalid_timestamps(self):
+        self.assertEqual(bulk_transfer.parse_datetime("2026-03-01T02:30:00"), datetime(2026, 3, 1, 2, 30))
+        self.assertIsNone(bulk_transfer.parse_datetime("tomorrow"))
+        self.assertIsNone(bulk_transfer.parse_datetime(5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+import google.generativeai as genai
+from google.generativeai import protos
+
+from bot_logic.gemini import chunk_text
+
+
+def streamed_chunk(*texts, candidates=True):
+    response = protos.GenerateContentResponse()
+    if candidates:
+        response = protos.GenerateContentResponse(candidates=[protos.Candidate(
+            content=protos.Content(parts=[protos.Part(text=text) for text in texts], role="model"),
+            finish_reason=protos.Candidate.FinishReason.STOP if not texts else None)])
+    return genai.types.GenerateContentResponse.from_response(response)
+
+
+class ChunkTextTest(unittest.TestCase):
+    def test_text_chunk(self):
+        self.assertEqual(chunk_text(streamed_chunk("Hello, ", "world")), "Hello, world")
+
+    def test_final_chunk_without_parts(self):
+        chunk = streamed_chunk()
+        with self.assertRaises(ValueError):
+            chunk.text
+        self.assertEqual(chunk_text(chunk), "")
+
+    def test_chunk_without_candidates(self):
+        chunk = streamed_chunk(candidates=False)
+        with self.assertRaises(ValueError):
+            chunk.text
+        self.assertEqual(chunk_text(chunk), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
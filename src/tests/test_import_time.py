@@ -0,0 +1,100 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importing the app must stay within this many seconds
+IMPORT_TIME_BUDGET_SECONDS = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", "2.0"))
+
+# Runs in a fresh interpreter. SDKs that are not installed are replaced by inert stand-ins, and the calls that
+# set up Firebase and Gemini are replaced by recorders, so the import is timed without any network access and
+# any client set up at import time shows up in "calls".
+IMPORT_SCRIPT = r"""
+import importlib
+import importlib.abc
+import importlib.machinery
+import json
+import sys
+import time
+import types
+
+SDK_ROOTS = {"dateparser", "dotenv", "firebase_admin", "flask", "google", "googleapiclient", "googletrans",
+             "httpx", "numpy", "quart", "requests"}
+
+
+class Stub:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        # Decorators get the decorated function back
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return Stub()
+
+    def __getattr__(self, name):
+        return Stub()
+
+
+class StubModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return Stub()
+
+
+class StubFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    # Consulted last, so only SDK modules that are not installed are stubbed
+    def find_spec(self, fullname, path, target=None):
+        if fullname.split(".")[0] in SDK_ROOTS:
+            return importlib.machinery.ModuleSpec(fullname, self, is_package=True)
+        return None
+
+    def create_module(self, spec):
+        module = StubModule(spec.name)
+        module.__path__ = []
+        return module
+
+    def exec_module(self, module):
+        pass
+
+
+sys.meta_path.append(StubFinder())
+
+calls = []
+
+
+def recorder(name):
+    def record(*args, **kwargs):
+        calls.append(name)
+        return Stub()
+    return record
+
+
+for module_name, attribute in [("firebase_admin", "initialize_app"), ("firebase_admin.firestore", "client"),
+                               ("google.generativeai", "configure"), ("google.generativeai", "GenerativeModel")]:
+    setattr(importlib.import_module(module_name), attribute, recorder(f"{module_name}.{attribute}"))
+
+started = time.perf_counter()
+import app
+seconds = time.perf_counter() - started
+print(json.dumps({"seconds": seconds, "calls": calls}))
+"""
+
+
+class ImportTimeTest(unittest.TestCase):
+    def test_app_import_is_fast_and_offline(self):
+        result = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=SRC_DIR, capture_output=True, text=True,
+                                env={**os.environ, "WARM_UP_ON_START": "false"}, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+
+        self.assertEqual(report["calls"], [], "Firebase or Gemini was set up while importing the app")
+        self.assertLess(report["seconds"], IMPORT_TIME_BUDGET_SECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+
+from bot_logic.intent_router import normalize_command, route_command
+
+
+def parsed(module, command, **payload):
+    return {"module": module, "command": command, "payload": payload}
+
+
+class RouterTestCase(unittest.TestCase):
+    def assertRoutes(self, cases):
+        for command, expected in cases:
+            with self.subTest(command=command):
+                self.assertEqual(route_command(command), expected)
+
+    def assertFallsBack(self, commands):
+        for command in commands:
+            with self.subTest(command=command):
+                self.assertIsNone(route_command(command))
+
+
+class NormalizeCommandTest(unittest.TestCase):
+    def test_fillers_and_punctuation_are_stripped(self):
+        self.assertEqual(normalize_command("Hey Samigo, could you please show me note #12, please?"),
+                         "show me note #12")
+
+    def test_curly_quotes_become_ascii(self):
+        self.assertEqual(normalize_command("translate “hola” to english"), 'translate "hola" to english')
+
+
+class EmailRoutesTest(RouterTestCase):
+    def test_email_commands(self):
+        self.assertRoutes([
+            ('send an email to bob@example.com with subject "Lunch" and message "See you at noon"',
+             parsed("email", "send", to_email="bob@example.com", subject="Lunch", message_text="See you at noon")),
+            ("fetch my emails", parsed("email", "fetch")),
+            ("show me 5 unread emails from alice@example.com this week",
+             parsed("email", "fetch", sender="alice@example.com", date_range="this week", limit=5)),
+            ("summarize email 18c2f3a9b", parsed("email", "summarize", email_id="18c2f3a9b")),
+            ("reply to email 18c2f3a9b", parsed("email", "reply", email_id="18c2f3a9b")),
+            ("check the status of email 42", parsed("email", "status", outbox_id=42)),
+        ])
+
+
+class NoteRoutesTest(RouterTestCase):
+    def test_note_commands(self):
+        self.assertRoutes([
+            ('add a note titled "Groceries" with content "milk, eggs" tagged shopping, home',
+             parsed("note", "add", title="Groceries", content="milk, eggs", tags=["shopping", "home"])),
+            ("Hey Samigo, could you please show me note #12?", parsed("note", "retrieve", note_id=12)),
+            ("show my notes from last week", parsed("note", "retrieve", date_range="last week")),
+            ("show notes about budget", parsed("note", "retrieve", keyword="budget")),
+            ("show notes tagged work", parsed("note", "retrieve", tag="work")),
+            ("show notes similar to note 4", parsed("note", "similar", note_id=4)),
+            ("summarize note 5", parsed("note", "summarize", note_id=5)),
+            ("delete note 3", parsed("note", "delete", note_id=3)),
+        ])
+
+    def test_similar_to_a_reference_goes_to_the_model(self):
+        self.assertFallsBack(["show notes similar to this", "find notes like that one"])
+
+
+class TaskRoutesTest(RouterTestCase):
+    def test_task_commands(self):
+        self.assertRoutes([
+            ("show high priority tasks", parsed("task", "priority", priority="high")),
+            ("show my work tasks", parsed("task", "category", category="work")),
+            ("what tasks are due by friday", parsed("task", "upcoming", deadline="friday")),
+            ("delete task buy milk", parsed("task", "delete", title="buy milk")),
+            ('add task with description "file taxes" and set the deadline to april 15',
+             parsed("task", "add", description="file taxes", deadline="april 15")),
+        ])
+
+    def test_deadlines_are_split_from_the_description(self):
+        self.assertRoutes([
+            ("add task buy milk by tomorrow", parsed("task", "add", description="buy milk", deadline="tomorrow")),
+            ("remind me to call mom tomorrow", parsed("task", "add", description="call mom", deadline="tomorrow")),
+            ("remind me to call mom tomorrow at 5pm",
+             parsed("task", "add", description="call mom", deadline="tomorrow at 5pm")),
+            ("remind me to pay rent next friday", parsed("task", "add", description="pay rent", deadline="next friday")),
+            ("remind me to call mom on Monday", parsed("task", "add", description="call mom", deadline="Monday")),
+        ])
+
+    def test_date_words_inside_the_description_stay_there(self):
+        self.assertRoutes([
+            ("add task go by the bank", parsed("task", "add", description="go by the bank")),
+            ("add task plan next week's menu", parsed("task", "add", description="plan next week's menu")),
+        ])
+
+
+class WebRoutesTest(RouterTestCase):
+    def test_web_commands(self):
+        self.assertRoutes([
+            ("search the web for best hiking trails", parsed("web", "search", query="best hiking trails")),
+            ("search for python decorators and summarize them",
+             parsed("web", "summarize", query="python decorators", action="summarize")),
+            ("summarize search results about mars rovers",
+             parsed("web", "summarize", query="mars rovers", action="summarize")),
+        ])
+
+    def test_reference_only_queries_go_to_the_model(self):
+        self.assertFallsBack([
+            "Google it",
+            "search for that",
+            "look up them",
+            "google it and summarize it",
+            "summarize search results about it",
+        ])
+
+
+class OtherRoutesTest(RouterTestCase):
+    def test_weather_news_and_translation(self):
+        self.assertRoutes([
+            ("what is the weather in Paris", parsed("weather", "weather", location="Paris")),
+            ("show me the latest tech news", parsed("news", "news", category="technology")),
+            ('translate "good morning" to spanish',
+             parsed("translate", "translate", text="good morning", target_language="es")),
+            ("how do you say thank you in japanese",
+             parsed("translate", "translate", text="thank you", target_language="ja")),
+        ])
+
+    def test_unknown_shapes_go_to_the_model(self):
+        self.assertFallsBack(["translate hello to klingon", "translate it to french", "what is the meaning of life"])
+
+
+if __name__ == "__main__":
+    unittest.main()
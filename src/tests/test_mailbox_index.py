@@ -0,0 +1,194 @@
+import unittest
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from bot_logic.mailbox_index import MailboxIndex, MailboxIndexRegistry
+
+
+def gmail_message(message_id, internal_date, subject="Hello"):
+    return {
+        "id": message_id,
+        "threadId": f"thread-{message_id}",
+        "snippet": f"Snippet of {message_id}",
+        "internalDate": str(internal_date),
+        "payload": {"headers": [{"name": "From", "value": "sender@example.com"},
+                                {"name": "To", "value": "me@example.com"},
+                                {"name": "Subject", "value": subject}]},
+    }
+
+
+class FakeRequest:
+    def __init__(self, gmail, response):
+        self.gmail = gmail
+        self.response = response
+
+    def execute(self):
+        self.gmail.calls += 1
+        self.gmail.check_unlocked()
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+class FakeBatch:
+    def __init__(self, gmail, callback):
+        self.gmail = gmail
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.gmail.calls += 1
+        self.gmail.check_unlocked()
+        for request_id, request in self.requests:
+            self.callback(request_id, request.response, None)
+
+
+class FakeGmail:
+    """
+    Just enough of the Gmail service for the mailbox index: a profile, an inbox, a history feed and batch
+    requests. Fails the test if the index lock is held while Gmail is called.
+    """
+
+    def __init__(self, inbox, history_id="100", address="me@example.com"):
+        self.inbox = {message["id"]: message for message in inbox}
+        self.history_id = history_id
+        self.address = address
+        self.changes = []
+        self.history_error = None
+        self.index = None
+        self.calls = 0
+
+    def check_unlocked(self):
+        if self.index is not None and self.index._lock.locked():
+            raise AssertionError("Gmail was called while the index lock was held")
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return self
+
+    def getProfile(self, userId):
+        return FakeRequest(self, {"historyId": self.history_id, "emailAddress": self.address})
+
+    def list(self, userId, startHistoryId=None, pageToken=None, maxResults=None, q=None, labelIds=None,
+             historyTypes=None, fields=None):
+        if startHistoryId is not None:
+            return FakeRequest(self, self.history_error or {"history": self.changes, "historyId": self.history_id})
+        newest = sorted(self.inbox.values(), key=lambda message: int(message["internalDate"]), reverse=True)
+        return FakeRequest(self, {"messages": [{"id": message["id"]} for message in newest[:maxResults]]})
+
+    def get(self, userId, id, format=None, metadataHeaders=None, fields=None):
+        return FakeRequest(self, self.inbox[id])
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def receive(self, message):
+        self.inbox[message["id"]] = message
+        self.changes.append({"messagesAdded": [{"message": {"id": message["id"], "labelIds": ["INBOX"]}}]})
+
+    def archive(self, message_id):
+        self.inbox.pop(message_id)
+        self.changes.append({"labelsRemoved": [{"message": {"id": message_id}, "labelIds": ["INBOX"]}]})
+
+
+class MailboxIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.gmail = FakeGmail([gmail_message("a", 1000), gmail_message("b", 2000), gmail_message("c", 3000)])
+        self.index = MailboxIndex(max_messages=10, sync_interval=0)
+        self.gmail.index = self.index
+
+    def test_full_sync_lists_the_inbox_newest_first(self):
+        self.index.sync(self.gmail)
+
+        self.assertEqual([entry["id"] for entry in self.index.recent()], ["c", "b", "a"])
+        self.assertEqual(self.index.get("b")["subject"], "Hello")
+        self.assertEqual(self.index.history_id, "100")
+        self.assertEqual(self.index.stats()["full_syncs"], 1)
+
+    def test_incremental_sync_applies_history_changes(self):
+        self.index.sync(self.gmail)
+        self.index.store_summary("a", "Summary of a")
+        self.gmail.receive(gmail_message("d", 4000, subject="New"))
+        self.gmail.archive("a")
+        self.gmail.history_id = "101"
+
+        self.index.sync(self.gmail)
+
+        self.assertEqual([entry["id"] for entry in self.index.recent()], ["d", "c", "b"])
+        self.assertIsNone(self.index.get_summary("a"))
+        self.assertEqual(self.index.history_id, "101")
+        self.assertEqual(self.index.stats()["incremental_syncs"], 1)
+
+    def test_expired_history_rebuilds_the_index(self):
+        self.index.sync(self.gmail)
+        self.gmail.inbox.pop("a")
+        self.gmail.history_error = HttpError(httplib2.Response({"status": "404"}), b"")
+
+        self.index.sync(self.gmail)
+
+        self.assertEqual([entry["id"] for entry in self.index.recent()], ["c", "b"])
+        self.assertEqual(self.index.stats()["full_syncs"], 2)
+
+    def test_sync_within_the_interval_is_skipped(self):
+        index = MailboxIndex(max_messages=10, sync_interval=60)
+        index.sync(self.gmail)
+        calls = self.gmail.calls
+
+        index.sync(self.gmail)
+        self.assertEqual(self.gmail.calls, calls)
+        index.sync(self.gmail, force=True)
+        self.assertGreater(self.gmail.calls, calls)
+
+    def test_index_keeps_only_the_newest_messages(self):
+        index = MailboxIndex(max_messages=2, sync_interval=0)
+        index.sync(self.gmail)
+        self.gmail.receive(gmail_message("d", 4000))
+
+        index.sync(self.gmail)
+
+        self.assertEqual([entry["id"] for entry in index.recent()], ["d", "c"])
+
+
+class MailboxIndexRegistryTest(unittest.TestCase):
+    def test_address_is_looked_up_once_per_token(self):
+        registry = MailboxIndexRegistry(max_users=1)
+        gmail = FakeGmail([])
+
+        self.assertEqual(registry.address(gmail, "token"), "me@example.com")
+        self.assertEqual(registry.address(gmail, "token"), "me@example.com")
+        self.assertEqual(gmail.calls, 1)
+
+    def test_recently_used_addresses_are_kept(self):
+        # max_users=1 keeps the addresses of four tokens
+        registry = MailboxIndexRegistry(max_users=1)
+        gmail = FakeGmail([])
+        for token in ["t0", "t1", "t2", "t3"]:
+            registry.address(gmail, token)
+
+        registry.address(gmail, "t0")
+        registry.address(gmail, "t4")
+        calls = gmail.calls
+        registry.address(gmail, "t0")
+        self.assertEqual(gmail.calls, calls)
+        registry.address(gmail, "t1")
+        self.assertEqual(gmail.calls, calls + 1)
+
+    def test_one_index_per_address(self):
+        registry = MailboxIndexRegistry(max_users=2)
+        first = registry.get(FakeGmail([], address="one@example.com"), "token-1")
+
+        self.assertIs(registry.get(FakeGmail([], address="one@example.com"), "token-2"), first)
+        self.assertIsNot(registry.get(FakeGmail([], address="two@example.com"), "token-3"), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from bot_logic.note_index import NoteSearchIndex
+
+START = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+class ChangeFeed:
+    """The notes collection and its tombstones as read_note_changes sees them."""
+
+    def __init__(self):
+        self.notes = {}
+        self.deleted = {}
+        self.clock = START
+        self.reads = []
+
+    def tick(self):
+        self.clock += timedelta(seconds=1)
+        return self.clock
+
+    def write(self, note_id, title, content):
+        self.notes[note_id] = {"note_id": note_id, "title": title, "content": content, "updated_at": self.tick()}
+
+    def delete(self, note_id):
+        self.notes.pop(note_id)
+        self.deleted[note_id] = self.tick()
+
+    def read_changes(self, since):
+        self.reads.append(since)
+        notes = [note for note in self.notes.values() if since is None or note["updated_at"] >= since]
+        deleted = [note_id for note_id, at in self.deleted.items() if since is None or at >= since]
+        times = [note["updated_at"] for note in notes] + [self.deleted[note_id] for note_id in deleted]
+        return notes, deleted, max(times, default=since or self.clock)
+
+
+class NoteSearchIndexSyncTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.feed = ChangeFeed()
+        self.feed.write(1, "Groceries", "milk and eggs")
+        # Two hosts, each with its own index file
+        self.this_host = NoteSearchIndex(os.path.join(directory.name, "this.sqlite3"))
+        self.other_host = NoteSearchIndex(os.path.join(directory.name, "other.sqlite3"))
+        for index in (self.this_host, self.other_host):
+            index.bootstrap(list(self.feed.notes.values()), self.feed.clock)
+
+    def matches(self, index, keyword):
+        index.sync(self.feed.read_changes)
+        return [note_id for note_id, _ in index.search(keyword)]
+
+    def test_notes_written_elsewhere_are_found(self):
+        self.feed.write(2, "Garden", "plant the tomatoes")
+        self.other_host.add(2, "Garden", "plant the tomatoes")
+
+        self.assertEqual(self.matches(self.this_host, "tomatoes"), ["2"])
+
+    def test_notes_edited_elsewhere_match_their_new_text(self):
+        self.feed.write(1, "Groceries", "bread and butter")
+
+        self.assertEqual(self.matches(self.this_host, "milk"), [])
+        self.assertEqual(self.matches(self.this_host, "bread"), ["1"])
+
+    def test_notes_deleted_elsewhere_stop_matching(self):
+        self.feed.delete(1)
+
+        self.assertEqual(self.matches(self.this_host, "milk"), [])
+
+    def test_sync_reads_only_changes_since_the_last_one(self):
+        self.this_host.sync(self.feed.read_changes)
+        self.feed.write(2, "Garden", "plant the tomatoes")
+        self.this_host.sync(self.feed.read_changes)
+
+        self.assertEqual(self.feed.reads, [START + timedelta(seconds=1)] * 2)
+        self.assertEqual(self.this_host.synced_through(), START + timedelta(seconds=2))
+
+    def test_sync_within_the_interval_is_skipped(self):
+        self.this_host.sync(self.feed.read_changes, interval=60)
+        self.feed.write(2, "Garden", "plant the tomatoes")
+        self.this_host.sync(self.feed.read_changes, interval=60)
+
+        self.assertEqual(len(self.feed.reads), 1)
+
+    def test_index_without_a_sync_time_reads_every_change_once(self):
+        index = NoteSearchIndex(self.this_host.path + ".old")
+        index.bootstrap([{"note_id": 3, "title": "Gone", "content": "deleted long ago"}])
+        self.feed.deleted[3] = START
+
+        self.assertEqual(self.matches(index, "deleted"), [])
+        self.assertEqual(self.feed.reads, [None])
+        self.assertIsNotNone(index.synced_through())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from bot_logic import note_taking
+from bot_logic.note_similarity import NoteSimilarityIndex
+
+SYNCED = datetime(2026, 3, 1, tzinfo=timezone.utc)
+LATER = datetime(2026, 3, 2, tzinfo=timezone.utc)
+
+GARDEN = "plant the tomatoes and water the basil every morning before work"
+
+
+class NoteSimilarityIndexSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.index = NoteSimilarityIndex(dims=256)
+        self.index.bootstrap([{"note_id": 1, "title": "Garden", "content": GARDEN}], SYNCED)
+
+    def test_sync_applies_notes_written_and_deleted_elsewhere(self):
+        read_changes = mock.Mock(return_value=(
+            [{"note_id": 2, "title": "Garden again", "content": GARDEN}], [1], LATER))
+
+        self.index.sync(read_changes)
+
+        read_changes.assert_called_once_with(SYNCED)
+        self.assertEqual([note_id for note_id, _ in self.index.near_duplicates(GARDEN)], ["2"])
+        self.assertIsNone(self.index.similar_to_note(1))
+
+    def test_next_sync_starts_where_the_last_one_ended(self):
+        read_changes = mock.Mock(return_value=([], [], LATER))
+
+        self.index.sync(read_changes)
+        self.index.sync(read_changes)
+
+        self.assertEqual([call.args[0] for call in read_changes.call_args_list], [SYNCED, LATER])
+
+    def test_sync_within_the_interval_is_skipped(self):
+        read_changes = mock.Mock(return_value=([], [], LATER))
+
+        self.index.sync(read_changes, interval=60)
+        self.index.sync(read_changes, interval=60)
+
+        read_changes.assert_called_once()
+
+
+class AddNoteTest(unittest.TestCase):
+    def setUp(self):
+        self.index = NoteSimilarityIndex(dims=256)
+        self.streamed = 0
+        patches = [
+            mock.patch.object(note_taking, "db", mock.MagicMock()),
+            mock.patch.object(note_taking, "note_similarity_index", self.index),
+            mock.patch.object(note_taking, "_stream_indexed_fields", self.stream_notes),
+            mock.patch.object(note_taking, "read_note_changes", mock.Mock(return_value=([], [], LATER))),
+            mock.patch.object(note_taking, "get_next_note_id", mock.Mock(return_value=2)),
+            mock.patch.object(note_taking, "index_note"),
+            mock.patch.object(note_taking, "add_to_buckets"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def stream_notes(self):
+        # Counts reads of the collection, not generators that bootstrap never consumes
+        self.streamed += 1
+        yield {"note_id": 1, "title": "Garden", "content": GARDEN}
+
+    def test_adding_a_note_does_not_load_the_index(self):
+        response = note_taking.add_note("Garden", GARDEN)
+
+        self.assertEqual(response["note_id"], 2)
+        self.assertNotIn("possible_duplicates", response)
+        self.assertEqual(self.streamed, 0)
+        self.assertFalse(self.index.is_loaded())
+
+    def test_duplicates_are_reported_once_the_index_is_loaded(self):
+        note_taking.load_similarity_index()
+
+        response = note_taking.add_note("Garden", GARDEN)
+
+        self.assertEqual([duplicate["note_id"] for duplicate in response["possible_duplicates"]], ["1"])
+        self.assertEqual(self.streamed, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
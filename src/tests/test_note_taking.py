@@ -0,0 +1,62 @@
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from bot_logic import note_taking
+from bot_logic.pagination import DOCUMENT_ID
+
+
+def stored(wall_time):
+    return wall_time.replace(tzinfo=timezone.utc)
+
+
+# Two workers leasing blocks 101-200 and 201-300 write their notes interleaved
+NOTES = {
+    "101": {"note_id": 101, "title": "First", "tags": [], "timestamp": stored(datetime(2026, 3, 2, 9, 0))},
+    "201": {"note_id": 201, "title": "Second", "tags": [], "timestamp": stored(datetime(2026, 3, 2, 9, 5))},
+    "102": {"note_id": 102, "title": "Third", "tags": [], "timestamp": stored(datetime(2026, 3, 2, 9, 10))},
+}
+
+
+def fetch_note_map(note_ids, fields=None):
+    return {str(note_id): dict(NOTES[str(note_id)]) for note_id in note_ids if str(note_id) in NOTES}
+
+
+class RetrieveNotesOrderTest(unittest.TestCase):
+    def setUp(self):
+        patches = [
+            mock.patch.object(note_taking, "db", mock.MagicMock()),
+            mock.patch.object(note_taking, "_fetch_note_map", fetch_note_map),
+            mock.patch.object(note_taking, "note_ids_in_range", lambda start, end: {101, 102, 201}),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def titles(self, response):
+        self.assertNotIn("error", response)
+        return [note["title"] for note in response["notes"]]
+
+    def test_date_range_lists_notes_in_write_order(self):
+        range_ = (datetime(2026, 3, 2), datetime(2026, 3, 3))
+
+        self.assertEqual(self.titles(note_taking.retrieve_notes(date_range=range_)), ["First", "Second", "Third"])
+
+    def test_date_range_pages_follow_write_order(self):
+        range_ = (datetime(2026, 3, 2), datetime(2026, 3, 3))
+
+        first = note_taking.retrieve_notes(date_range=range_, page_size=2)
+        second = note_taking.retrieve_notes(date_range=range_, page_size=2, cursor=first["next_cursor"])
+
+        self.assertEqual(self.titles(first) + self.titles(second), ["First", "Second", "Third"])
+        self.assertNotIn("next_cursor", second)
+
+    def test_listing_is_ordered_by_timestamp_then_document_id(self):
+        with mock.patch.object(note_taking, "query_page", return_value=([], None)) as query_page:
+            note_taking.retrieve_notes()
+
+        self.assertEqual(query_page.call_args.args[1], ["timestamp", DOCUMENT_ID])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from unittest import mock
+
+from bot_logic import interaction_history, session_store
+from bot_logic.session_store import SessionStore, _client_key
+
+
+class FakeDocument:
+    def __init__(self, data=None):
+        self.data = data
+
+    def get(self):
+        return self
+
+    @property
+    def exists(self):
+        return self.data is not None
+
+    def to_dict(self):
+        return self.data
+
+
+class LegacyHistoryTest(unittest.TestCase):
+    def setUp(self):
+        legacy = FakeDocument({"messages": [{"command": "hello", "response": "hi"}]})
+        patches = [
+            mock.patch.object(interaction_history, "client_ref", lambda client_key: FakeDocument()),
+            mock.patch.object(interaction_history, "session_ref", lambda session_id: legacy),
+            mock.patch.object(interaction_history, "latest_legacy_session_id", mock.Mock(return_value=7)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_new_client_starts_with_an_empty_history(self):
+        self.assertEqual(interaction_history.load_client_history("new-client"), ("", []))
+        interaction_history.latest_legacy_session_id.assert_not_called()
+
+    def test_legacy_client_continues_the_legacy_session(self):
+        self.assertEqual(interaction_history.load_client_history("legacy-client", include_legacy=True),
+                         ("", [("hello", "hi")]))
+
+    def test_only_the_configured_client_reads_the_legacy_session(self):
+        store = SessionStore()
+        load = mock.Mock(return_value=("", []))
+        with mock.patch.object(session_store, "LEGACY_CLIENT_KEY", _client_key("session:owner")), \
+                mock.patch.object(session_store, "load_client_history", load), \
+                mock.patch.object(session_store, "get_next_session_id", side_effect=[1, 2]), \
+                mock.patch.object(session_store, "save_session_start"):
+            store.get(_client_key("session:someone-else"))
+            store.get(_client_key("session:owner"))
+
+        self.assertEqual([call.kwargs["include_legacy"] for call in load.call_args_list], [False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()